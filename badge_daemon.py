@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Badge Daemon - keeps the badge's serial ports open and shares them
+
+Only one process can hold a serial port, and every script used to open it
+itself, toggle DTR (which can reset the badge) and wake the menu before
+sending anything. The daemon opens each processor's port once, never touches
+DTR again and tracks where the menu is. Clients send requests over a Unix
+socket. The daemon queues them per port, so scripts can run side by side.
+
+With --telemetry it also polls battery and sensor readings on the main port
+(telemetry.py). Those queries only run when no client request is waiting,
+and the history is served from memory without touching the port. If the
+first query gets no reply (stock menu firmware), polling stops, and a
+failed query never closes the port or resets the menu state.
+
+Each request is a JSON line; each reply is a JSON line:
+    {"op": "text", "text": "Hello"}               show text, wrapped to fit one screen
+    {"op": "send", "data": "g", "expect": "..."}   raw menu keys
+    {"op": "status"}                                ports, menu state, queue depth
+    {"op": "series", "field": "battery", "seconds": 600, "points": 20}
+                                                    telemetry history, downsampled
+Add "role": "main" to talk to the main processor (default: display).
+
+Usage:
+    python3 badge_daemon.py serve [--port-main PORT] [--port-display PORT] [--telemetry]
+    python3 badge_daemon.py text "MVP Summit 2026"
+    python3 badge_daemon.py send g --expect "Display Functions"
+    python3 badge_daemon.py status
+    python3 badge_daemon.py series battery --seconds 600 --points 20
+"""
+
+import argparse
+import itertools
+import json
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+
+SOCKET_PATH = os.environ.get("BADGE_DAEMON_SOCKET", "/tmp/badge-daemon.sock")
+MENU_PROMPT = "Enter Letter:"
+
+# Queue order on a port: client requests first, telemetry when nothing else waits
+CLIENT = 0
+BACKGROUND = 1
+
+# Menu screens, the text that identifies each one, and the keys between them
+# ("q" backs out one level, as freewili's show_text_display does)
+MENU_TITLES = [
+    ("text", "Enter Text To Display"),
+    ("gui", "GUI Functions"),
+    ("display", "Display Functions"),
+]
+MENU_KEYS = {
+    "main": {"g": "display"},
+    "display": {"g": "gui", "q": "main"},
+    "gui": {"p": "text", "q": "display"},
+}
+
+
+def menu_path(start, goal):
+    """Keys that lead from one menu screen to another (breadth-first)"""
+    paths = {start: []}
+    frontier = [start]
+    while frontier:
+        screen = frontier.pop(0)
+        if screen == goal:
+            return paths[screen]
+        for key, target in MENU_KEYS.get(screen, {}).items():
+            if target not in paths:
+                paths[target] = paths[screen] + [key]
+                frontier.append(target)
+    return None
+
+
+class Channel:
+    """One processor's port, owned by a single worker thread that runs queued requests in order"""
+
+    def __init__(self, role, port):
+        from badge_link_profile import load_profile
+
+        self.role = role
+        self.port = port
+        self.profile = load_profile(port)
+        self.menu = None
+        self.ser = None
+        self.layout = None
+        # Whether the firmware answers ESC 'T' (None until the first query)
+        self.telemetry = None
+        self.queue = queue.PriorityQueue()
+        self._order = itertools.count()
+        threading.Thread(target=self._worker, daemon=True).start()
+
+    def submit(self, request, priority=CLIENT):
+        """Queue a request and wait for its reply"""
+        done = threading.Event()
+        slot = {}
+        self.queue.put((priority, next(self._order), request, slot, done))
+        done.wait()
+        return slot["reply"]
+
+    def _open(self):
+        import serial
+
+        # Set DTR/RTS before opening so the port never pulses them (a pulse can reset the badge)
+        ser = serial.Serial()
+        ser.port = self.port
+        ser.baudrate = self.profile.baudrate
+        ser.timeout = self.profile.idle_gap
+        ser.dtr = True
+        ser.rts = True
+        ser.open()
+        self.ser = ser
+        self.menu = None
+
+    def _worker(self):
+        while True:
+            _, _, request, slot, done = self.queue.get()
+            start = time.perf_counter()
+            try:
+                if self.ser is None:
+                    self._open()
+                reply = self._handle(request)
+                reply["ok"] = True
+            except Exception as e:
+                # Drop the port; the next request reopens it (the badge may have been replugged)
+                if self.ser is not None:
+                    try:
+                        self.ser.close()
+                    except Exception:
+                        pass
+                self.ser = None
+                reply = {"ok": False, "error": str(e)}
+            reply["ms"] = round((time.perf_counter() - start) * 1000, 1)
+            slot["reply"] = reply
+            done.set()
+
+    def _exchange(self, data, expect=MENU_PROMPT):
+        from badge_link_profile import read_response
+
+        self.ser.write(data.encode())
+        response = read_response(self.ser, self.profile, expect=expect).decode('utf-8', errors='ignore')
+        self._track(response)
+        return response
+
+    def _track(self, response):
+        """Update the menu state from whatever screen the badge just drew"""
+        latest, screen = -1, None
+        for name, title in MENU_TITLES:
+            at = response.rfind(title)
+            if at > latest:
+                latest, screen = at, name
+        if screen:
+            self.menu = screen
+        elif MENU_PROMPT in response and self.menu is None:
+            self.menu = "main"
+
+    def _telemetry(self, mask):
+        """One telemetry query. Failures are the query's, not the port's, so both stay as they are."""
+        from telemetry import SerialQuery, fields_in
+
+        # Stock menu firmware has no ESC 'T' handler; its fields all come back unsupported
+        # (NaN), so the poller stops instead of typing more queries into the menu
+        unsupported = {field.name: float("nan") for field in fields_in(mask)}
+        if self.telemetry is False:
+            return {"values": unsupported}
+        try:
+            # Answered by the firmware's frame stream receiver, not the menu
+            values = SerialQuery(self.ser)(mask)
+        except (TimeoutError, ValueError) as e:
+            self._drain()
+            if self.telemetry is None:
+                self.telemetry = False
+                return {"values": unsupported, "error": f"no telemetry handler ({e}); polling off"}
+            return {"values": None, "error": str(e)}
+        self.telemetry = True
+        return {"values": values}
+
+    def _drain(self):
+        """Drop a late reply, or whatever the menu printed for the query's bytes"""
+        from badge_link_profile import read_response
+
+        read_response(self.ser, self.profile, timeout=max(0.1, self.profile.idle_gap))
+        self.ser.reset_input_buffer()
+
+    def _goto(self, goal):
+        if self.menu is None:
+            self._exchange("\n")
+        path = menu_path(self.menu or "main", goal)
+        if path is None:
+            raise RuntimeError(f"no route from menu '{self.menu}' to '{goal}'")
+        for key in path:
+            expect = "Enter Text To Display" if MENU_KEYS[self.menu][key] == "text" else MENU_PROMPT
+            self._exchange(key, expect)
+        if self.menu != goal:
+            self.menu = None
+            raise RuntimeError(f"menu did not reach '{goal}'")
+
+    def _layout(self):
+        from text_layout import Layout
+
+        if self.layout is None:
+            self.layout = Layout()
+        return self.layout
+
+    def _handle(self, request):
+        op = request.get("op")
+        if op == "text":
+            try:
+                self._goto("text")
+            except RuntimeError:
+                # State was stale (someone pressed a button); wake the menu and retry once
+                self.menu = None
+                self._goto("text")
+            # Laid out to fit one screen, as the single input line the firmware reads
+            response = self._exchange(self._layout().truncate(request["text"]) + "\n")
+            return {"response": response, "menu": self.menu}
+        if op == "send":
+            response = self._exchange(request["data"], request.get("expect") or MENU_PROMPT)
+            return {"response": response, "menu": self.menu}
+        if op == "telemetry":
+            return self._telemetry(request["mask"])
+        raise ValueError(f"unknown op '{op}'")
+
+
+class BadgeDaemon:
+    def __init__(self, ports, telemetry=None):
+        """telemetry: {field: seconds} to poll on the main port, or None"""
+        self.channels = {role: Channel(role, port) for role, port in ports.items()}
+        self.telemetry = None
+        self.poller = None
+        channel = self.channels.get("main")
+        if telemetry and channel:
+            from telemetry import TelemetryPoller, TelemetryStore
+
+            self.telemetry = TelemetryStore()
+            self.poller = TelemetryPoller(self._telemetry_query(channel), channel.port, self.telemetry,
+                                          telemetry, link_rate=channel.profile.link_rate).start()
+
+    @staticmethod
+    def _telemetry_query(channel):
+        def query(mask):
+            reply = channel.submit({"op": "telemetry", "mask": mask}, priority=BACKGROUND)
+            if not reply["ok"] or reply["values"] is None:
+                raise RuntimeError(reply["error"])
+            if reply.get("error"):
+                print(f"  telemetry: {reply['error']}", file=sys.stderr)
+            return reply["values"]
+        return query
+
+    def status(self):
+        reply = {"ok": True, "ports": {
+            role: {"port": ch.port, "open": ch.ser is not None, "menu": ch.menu, "queued": ch.queue.qsize(),
+                   "telemetry": ch.telemetry}
+            for role, ch in self.channels.items()}}
+        if self.poller:
+            stats = self.poller.stats()
+            reply["telemetry"] = {"polls": stats.polls, "failures": stats.failures,
+                                  "link_share": round(stats.link_share, 4),
+                                  "unsupported": sorted(self.poller.unsupported)}
+        return reply
+
+    def series(self, request):
+        if not self.telemetry:
+            return {"ok": False, "error": "telemetry is off (serve --telemetry)"}
+        badge = request.get("badge") or self.poller.badge
+        points = self.telemetry.series(badge, request["field"], request.get("seconds"),
+                                       int(request.get("points", 60)))
+        return {"ok": True, "badge": badge, "field": request["field"],
+                "points": [[round(value, 4) for value in point] for point in points]}
+
+    def handle(self, request):
+        if request.get("op") == "status":
+            return self.status()
+        if request.get("op") == "series":
+            return self.series(request)
+        channel = self.channels.get(request.get("role", "display"))
+        if channel is None:
+            return {"ok": False, "error": f"no port for role '{request.get('role')}'"}
+        return channel.submit(request)
+
+    def _client(self, conn):
+        with conn, conn.makefile('rwb') as stream:
+            for line in stream:
+                try:
+                    reply = self.handle(json.loads(line))
+                except (ValueError, KeyError) as e:
+                    reply = {"ok": False, "error": f"bad request: {e}"}
+                stream.write(json.dumps(reply).encode() + b"\n")
+                stream.flush()
+
+    def serve(self, path=SOCKET_PATH):
+        if os.path.exists(path):
+            os.unlink(path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        os.chmod(path, 0o600)
+        server.listen()
+        print(f"Listening on {path}")
+        for role, ch in self.channels.items():
+            print(f"  {role:<8} {ch.port}")
+        try:
+            while True:
+                conn, _ = server.accept()
+                threading.Thread(target=self._client, args=(conn,), daemon=True).start()
+        finally:
+            server.close()
+            os.unlink(path)
+
+
+def request(op, path=SOCKET_PATH, **fields):
+    """Send one request to the daemon and return its reply (a dict)"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall(json.dumps(dict(fields, op=op)).encode() + b"\n")
+        with sock.makefile('rb') as stream:
+            return json.loads(stream.readline())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Badge port daemon and client")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="Own the badge ports and serve requests")
+    serve.add_argument("--port-main", help="Main processor port (default: discovered)")
+    serve.add_argument("--port-display", help="Display processor port (default: discovered)")
+    serve.add_argument("--telemetry", action="store_true", help="Poll battery and sensors on the main port")
+    serve.add_argument("--every", nargs="*", metavar="FIELD=SECONDS", help="Telemetry intervals (0 turns a field off)")
+    text = sub.add_parser("text", help="Show text on the badge display (wrapped to one screen)")
+    text.add_argument("text")
+    send = sub.add_parser("send", help="Send raw menu keys")
+    send.add_argument("data")
+    send.add_argument("--expect")
+    send.add_argument("--role", default="display")
+    sub.add_parser("status", help="Show ports, menu state and queue depth")
+    series = sub.add_parser("series", help="Show telemetry history for one field")
+    series.add_argument("field")
+    series.add_argument("--seconds", type=float)
+    series.add_argument("--points", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        from badge_ports import DISPLAY, MAIN, find_port
+
+        ports = {MAIN: args.port_main or find_port(MAIN), DISPLAY: args.port_display or find_port(DISPLAY)}
+        ports = {role: port for role, port in ports.items() if port}
+        if not ports:
+            print("✗ No badge ports found")
+            return 1
+        telemetry = None
+        if args.telemetry:
+            from telemetry import parse_intervals
+
+            try:
+                telemetry = parse_intervals(args.every)
+            except ValueError as e:
+                print(f"✗ {e}")
+                return 1
+        BadgeDaemon(ports, telemetry).serve()
+        return 0
+
+    fields = {k: v for k, v in vars(args).items() if k not in ("command",) and v is not None}
+    try:
+        reply = request(args.command, **fields)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"✗ Daemon not running ({SOCKET_PATH}); start it with: python3 badge_daemon.py serve")
+        return 1
+    if not reply.get("ok"):
+        print(f"✗ {reply.get('error')}")
+        return 1
+    if args.command == "status":
+        for role, info in reply["ports"].items():
+            print(f"{role:<8} {info['port']:<28} {'open' if info['open'] else 'closed':<7} "
+                  f"menu {info['menu'] or '?':<8} queued {info['queued']}")
+        if "telemetry" in reply:
+            info = reply["telemetry"]
+            print(f"telemetry {info['polls']} polls, {info['failures']} failed, "
+                  f"{info['link_share']:.2%} of the link")
+    elif args.command == "series":
+        for t, mean, low, high in reply["points"]:
+            print(f"{time.strftime('%H:%M:%S', time.localtime(t))}  {mean:9.3f}  ({low:.3f} - {high:.3f})")
+    else:
+        print(f"✓ {reply['ms']:.0f} ms (menu: {reply.get('menu')})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
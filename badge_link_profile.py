@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Serial Link Profiler
+
+Measures the badge link instead of guessing at it: round-trip latency of a
+menu command, the longest pause inside a response, how long the port takes
+to answer after opening, how fast the host can write and with which write
+size (write_chunk), and how fast the badge actually takes bytes in
+(link_rate). write_rate only measures the host
+filling its USB buffers, so budgets for traffic on the link use link_rate.
+The results are saved as a per-device profile that the other tools load in
+place of fixed sleeps.
+
+Also reports which of the repo's fixed waits are mostly sleep rather than
+time spent waiting on the device.
+
+Usage:
+    python3 badge_link_profile.py [--port PORT] [--samples 20]
+    python3 badge_link_profile.py --show
+
+Other tools:
+    from badge_link_profile import load_profile, read_response
+    profile = load_profile(port)
+    ser.write(b"g")
+    data = read_response(ser, profile, expect="Display Functions")
+    data, match = read_match(ser, profile, {"menu": "Display Functions", "error": "Invalid"})
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import sys
+import time
+from collections import namedtuple
+
+import serial
+import serial.tools.list_ports
+
+from badge_ports import find_port
+from prompt_match import PromptMatcher
+
+PROFILE_FILE = pathlib.Path(os.environ.get("BADGE_LINK_PROFILE", pathlib.Path.home() / ".badge_link_profiles.json"))
+MENU_PROMPT = "Enter Letter:"
+CHUNK_SIZES = (16, 64, 256, 1024, 4096, 16384)
+
+LinkProfile = namedtuple("LinkProfile",
+                         "device port baudrate rtt rtt_p95 idle_gap settle write_rate write_chunk link_rate measured")
+
+# What the scripts assumed before there was a profile
+DEFAULT_PROFILE = LinkProfile(
+    device=None, port=None, baudrate=115200, rtt=0.2, rtt_p95=0.5, idle_gap=0.1, settle=1.0,
+    write_rate=11520.0, write_chunk=0, link_rate=11520.0, measured=None)
+# write_chunk 0: never measured, so writers keep their own sizes (send_file picks its default)
+
+# Fixed waits in this repo: seconds slept, the measured value it stands in for,
+# and how many of those it covers
+FIXED_WAITS = [
+    ("test_serial_menu.py", "DTR/RTS wake toggle", 1.0, "settle", 1),
+    ("test_serial_menu.py", "stabilize after open", 1.0, "settle", 1),
+    ("test_serial_menu.py", "wake newlines (3 x 0.3 s)", 0.9, "response", 3),
+    ("test_serial_menu.py", "send_command first wait", 0.2, "response", 1),
+    ("test_serial_reset.py", "reset toggle", 0.7, "settle", 1),
+    ("test_serial_raw.py", "banner wait", 1.0, "settle", 1),
+    ("test_pexpect.py", "wake pause", 1.0, "response", 1),
+    ("display_text.expect", "boot wait", 1.0, "settle", 1),
+    ("freewili_presenter.py", "badge scan (0.5 + 0.5 + 1.0 s)", 2.0, "response", 3),
+]
+
+
+def device_key(port):
+    """Stable key for a port: the USB serial number when there is one"""
+    for info in serial.tools.list_ports.comports():
+        if info.device == port and info.serial_number:
+            return info.serial_number
+    return port
+
+
+def load_profiles():
+    if PROFILE_FILE.exists():
+        try:
+            return json.loads(PROFILE_FILE.read_text())
+        except (OSError, ValueError):
+            pass
+    return {}
+
+
+def load_profile(port=None):
+    """Saved profile for this port's device, or DEFAULT_PROFILE if it was never measured"""
+    profiles = load_profiles()
+    if port is not None:
+        saved = profiles.get(device_key(port)) or profiles.get(port)
+        if saved:
+            return saved_profile(saved)._replace(port=port)
+    return DEFAULT_PROFILE._replace(port=port)
+
+
+def saved_profile(saved):
+    """LinkProfile from a saved dict; fields older versions didn't save come from DEFAULT_PROFILE"""
+    fields = {key: value for key, value in saved.items() if key in LinkProfile._fields}
+    if "best_chunk" in saved and "write_chunk" not in saved:
+        fields["write_chunk"] = saved["best_chunk"]
+    return DEFAULT_PROFILE._replace(**fields)
+
+
+def save_profile(profile):
+    profiles = load_profiles()
+    profiles[profile.device] = profile._asdict()
+    PROFILE_FILE.write_text(json.dumps(profiles, indent=2))
+
+
+def response_timeout(profile):
+    """How long to wait for a reply before deciding none is coming"""
+    return max(0.5, profile.rtt_p95 * 4)
+
+
+def read_response(ser, profile, expect=None, timeout=None):
+    """Read until expect is seen, or until the link goes quiet after the first byte.
+
+    Returns as soon as the device is done instead of sleeping a fixed time.
+    Without expect, "done" means no byte for profile.idle_gap.
+    """
+    return read_match(ser, profile, expect, timeout)[0]
+
+
+def read_match(ser, profile, expect=None, timeout=None):
+    """read_response that can wait for several strings; returns (response, Match or None).
+
+    expect is anything PromptMatcher takes, e.g. {"prompt": MENU_PROMPT,
+    "error": "Invalid"}; reading stops at the first of them.
+    """
+    timeout = response_timeout(profile) if timeout is None else timeout
+    matcher = PromptMatcher(expect) if expect else None
+    deadline = time.perf_counter() + timeout
+    old_timeout = ser.timeout
+    ser.timeout = profile.idle_gap
+    # bytearray: appending in place keeps a long listing linear
+    response = bytearray()
+    try:
+        while time.perf_counter() < deadline:
+            chunk = ser.read(max(1, ser.in_waiting))
+            if chunk:
+                response += chunk
+                if matcher:
+                    matches = matcher.feed(chunk)
+                    if matches:
+                        return bytes(response), matches[0]
+            elif response and not expect:
+                break
+    finally:
+        ser.timeout = old_timeout
+    return bytes(response), None
+
+
+def timed_exchange(ser, data, expect, timeout=3.0):
+    """Send data and time it: (first byte latency, total time, longest gap between bytes)"""
+    ser.reset_input_buffer()
+    ser.timeout = 0.001
+    start = time.perf_counter()
+    ser.write(data)
+    first = last = None
+    gap = 0.0
+    matcher = PromptMatcher(expect)
+    while time.perf_counter() - start < timeout:
+        chunk = ser.read(max(1, ser.in_waiting))
+        now = time.perf_counter()
+        if not chunk:
+            continue
+        if first is None:
+            first = now
+        elif last is not None:
+            gap = max(gap, now - last)
+        last = now
+        if matcher.feed(chunk):
+            return first - start, now - start, gap
+    return None
+
+
+def measure_settle(port, baudrate):
+    """Time from opening the port to the menu answering a newline"""
+    start = time.perf_counter()
+    ser = serial.Serial(port, baudrate, timeout=0.001, rtscts=False, dsrdtr=False)
+    while time.perf_counter() - start < 5.0:
+        ser.write(b"\n")
+        poll_end = time.perf_counter() + 0.05
+        response = b""
+        while time.perf_counter() < poll_end:
+            response += ser.read(max(1, ser.in_waiting))
+            if MENU_PROMPT.encode() in response:
+                return ser, time.perf_counter() - start
+    ser.close()
+    raise RuntimeError("menu never answered; is the badge on its main menu?")
+
+
+def measure_rtt(ser, samples):
+    firsts, totals, gaps = [], [], []
+    for _ in range(samples):
+        sample = timed_exchange(ser, b"\n", MENU_PROMPT)
+        if sample:
+            firsts.append(sample[0])
+            totals.append(sample[1])
+            gaps.append(sample[2])
+    if not totals:
+        raise RuntimeError("no menu responses while measuring round trips")
+    totals.sort()
+    p95 = totals[min(len(totals) - 1, int(len(totals) * 0.95))]
+    return statistics.median(firsts), statistics.median(totals), p95, max(gaps)
+
+
+def measure_throughput(ser, total=32768):
+    """Write rate for each chunk size, using spaces at the main menu prompt"""
+    rates = {}
+    echoed = 0
+    ser.write_timeout = 10
+    for size in CHUNK_SIZES:
+        chunk = b" " * size
+        count = max(1, total // size)
+        ser.reset_input_buffer()
+        start = time.perf_counter()
+        for _ in range(count):
+            ser.write(chunk)
+        ser.flush()
+        rates[size] = size * count / (time.perf_counter() - start)
+        # Let the menu catch up before the next size, and count what it echoed
+        echoed += len(read_response(ser, DEFAULT_PROFILE, timeout=1.0))
+    return rates, echoed
+
+
+def best_chunk(rates):
+    """Smallest chunk within 5% of the best rate: same speed, less to resend"""
+    top = max(rates.values())
+    return min(size for size, rate in rates.items() if rate >= top * 0.95)
+
+
+def write_chunk_for(role):
+    """Measured write chunk for the badge port with this role ("main", "display"), 0 if none"""
+    port = find_port(role)
+    return load_profile(port).write_chunk if port else 0
+
+
+def write_chunks(ser, data, chunk):
+    """ser.write data in pieces of chunk bytes (all at once when chunk is 0)"""
+    if not chunk:
+        ser.write(data)
+        return
+    for offset in range(0, len(data), chunk):
+        ser.write(data[offset:offset + chunk])
+
+
+def measure_link_rate(ser, rtt, gap, total=16384):
+    """Bytes/s the badge takes in: spaces then a newline, timed until its answer stops.
+
+    The menu has to get through every space before it answers the newline,
+    so this counts the device's side, not the host's write buffers. None
+    when the answer never came or was too quick to time.
+    """
+    ser.reset_input_buffer()
+    old_timeout = ser.timeout
+    ser.timeout = max(0.05, gap * 2)
+    start = time.perf_counter()
+    try:
+        ser.write(b" " * total + b"\n")
+        last = None
+        while time.perf_counter() - start < 30.0:
+            if ser.read(max(1, ser.in_waiting)):
+                last = time.perf_counter()
+            elif last is not None:
+                break
+    finally:
+        ser.timeout = old_timeout
+    if last is None or last - start <= rtt:
+        return None
+    return total / (last - start - rtt)
+
+
+def legacy_exchange(ser):
+    """The old send_command pattern: fixed 0.2 s wait, then 0.1 s polls"""
+    ser.reset_input_buffer()
+    start = time.perf_counter()
+    ser.write(b"\n")
+    time.sleep(0.2)
+    response = b""
+    while time.perf_counter() - start < 2.2:
+        if ser.in_waiting:
+            response += ser.read(ser.in_waiting)
+            if MENU_PROMPT.encode() in response:
+                break
+        time.sleep(0.1)
+    return time.perf_counter() - start
+
+
+def sleep_report(profile, legacy=None):
+    """Print which fixed waits are mostly sleep rather than device time"""
+    print(f"\n{'where':<24} {'wait':<32} {'fixed':>7} {'device':>8}  verdict")
+    for script, what, fixed, stands_for, count in FIXED_WAITS:
+        device = (profile.settle if stands_for == "settle" else profile.rtt_p95) * count
+        share = max(0.0, 1 - device / fixed)
+        verdict = f"sleep-dominated ({share:.0%} idle)" if device * 2 < fixed else "ok"
+        print(f"{script:<24} {what:<32} {fixed:>6.2f}s {device * 1000:>6.0f}ms  {verdict}")
+
+    if legacy is not None:
+        share = max(0.0, 1 - profile.rtt / legacy)
+        print(f"\nLive check: one menu command took {legacy * 1000:.0f} ms with fixed sleeps, "
+              f"{profile.rtt * 1000:.0f} ms reading until the prompt ({share:.0%} of the old wait was sleep)")
+
+
+def show_profiles():
+    profiles = load_profiles()
+    if not profiles:
+        print(f"No profiles in {PROFILE_FILE}")
+        return 0
+    for key, saved in profiles.items():
+        p = saved_profile(saved)
+        print(f"{key}: {p.port}  rtt {p.rtt * 1000:.1f} ms (p95 {p.rtt_p95 * 1000:.1f})  "
+              f"idle gap {p.idle_gap * 1000:.1f} ms  settle {p.settle * 1000:.0f} ms  "
+              f"write {p.write_rate / 1024:.0f} KB/s @ {p.write_chunk or '?'} B, link {p.link_rate / 1024:.1f} KB/s"
+              f"  ({p.measured})")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the badge serial link and save a profile")
+    parser.add_argument("--port", help="Serial port (default: first badge port)")
+    parser.add_argument("--baud", type=int, default=115200)
+    parser.add_argument("--samples", type=int, default=20, help="Round trips to time")
+    parser.add_argument("--no-save", action="store_true", help="Measure and report only")
+    parser.add_argument("--show", action="store_true", help="List saved profiles and exit")
+    args = parser.parse_args()
+
+    if args.show:
+        return show_profiles()
+
+    port = args.port or find_port()
+    if not port:
+        print("✗ No badge found on USB")
+        return 1
+    print(f"Profiling {port} ({device_key(port)})...")
+
+    try:
+        ser, settle = measure_settle(port, args.baud)
+    except (serial.SerialException, RuntimeError) as e:
+        print(f"✗ {e}")
+        return 1
+
+    try:
+        first, rtt, p95, gap = measure_rtt(ser, args.samples)
+        print(f"  round trip : first byte {first * 1000:.1f} ms, prompt {rtt * 1000:.1f} ms (p95 {p95 * 1000:.1f} ms)")
+        print(f"  idle gap   : {gap * 1000:.1f} ms longest pause inside a response")
+        print(f"  settle     : {settle * 1000:.0f} ms from open to first prompt")
+
+        rates, echoed = measure_throughput(ser)
+        for size, rate in rates.items():
+            print(f"  write {size:>6} B chunks: {rate / 1024:8.1f} KB/s")
+        if echoed:
+            print(f"  (badge echoed {echoed} bytes during the write test)")
+        write_chunk = best_chunk(rates)
+        write_rate = rates[write_chunk]
+        print(f"  best chunk : {write_chunk} bytes ({write_rate / 1024:.1f} KB/s)")
+        link_rate = measure_link_rate(ser, rtt, gap)
+        if link_rate:
+            print(f"  link rate  : {link_rate / 1024:.1f} KB/s taken in by the badge")
+        else:
+            link_rate = min(write_rate, DEFAULT_PROFILE.link_rate)
+            print(f"  link rate  : not measurable, assuming {link_rate / 1024:.1f} KB/s")
+
+        legacy = legacy_exchange(ser)
+    finally:
+        ser.close()
+
+    profile = LinkProfile(
+        device=device_key(port), port=port, baudrate=args.baud,
+        rtt=rtt, rtt_p95=p95,
+        # Margin over the worst pause seen, never below a couple of USB frames
+        idle_gap=max(0.005, gap * 2),
+        settle=settle, write_rate=write_rate, write_chunk=write_chunk, link_rate=link_rate,
+        measured=time.strftime("%Y-%m-%d %H:%M:%S"))
+
+    sleep_report(profile, legacy)
+
+    if not args.no_save:
+        save_profile(profile)
+        print(f"\n✓ Profile saved to {PROFILE_FILE}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Badge Port Discovery
+
+Finds the badge's serial ports and works out which processor each one
+belongs to (main RP2350 or display RP2040) from its USB descriptors. Ports
+are grouped per badge by their USB hub location and the mapping is cached
+per USB serial number. The next run looks only at the cached device nodes
+and checks each still carries its serial number (from sysfs on Linux),
+without enumerating. Device numbers get reused, so a node that now belongs
+to something else sends discovery back to a full scan. A port
+that can't be told apart by its descriptors (Windows names every CDC port
+"USB Serial Device") is taken as the main processor when it's the only one.
+
+PortWatcher reports ports being plugged in and removed as they happen, with
+no polling on Linux (kernel uevents) or macOS (kqueue on /dev). Windows
+falls back to rescanning once a second.
+
+Usage:
+    python3 badge_ports.py            # list badge ports and their roles
+    python3 badge_ports.py --watch    # print hot-plug events as they happen
+
+Other tools:
+    from badge_ports import find_port
+    port = find_port("display")
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import select
+import socket
+import sys
+import threading
+import time
+from collections import namedtuple
+
+import serial.tools.list_ports
+
+SYS_TTY = pathlib.Path("/sys/class/tty")
+PORT_CACHE = pathlib.Path(os.environ.get("BADGE_PORT_CACHE", pathlib.Path.home() / ".badge_ports.json"))
+
+MAIN = "main"
+DISPLAY = "display"
+FPGA = "fpga"
+UNKNOWN = "unknown"
+
+# Descriptor text that gives a port's role away, checked in order
+ROLE_HINTS = [
+    (DISPLAY, ("display", "rp2040")),
+    (MAIN, ("main", "rp2350")),
+    (FPGA, ("fpga", "ftdi")),
+]
+
+# Raspberry Pi (RP2040/RP2350 bootrom and SDK) and Intrepid Control Systems (FREE-WILi)
+BADGE_VIDS = (0x2E8A, 0x093C)
+
+BadgePort = namedtuple("BadgePort", "device role serial_number badge description")
+
+NETLINK_KOBJECT_UEVENT = 15
+
+
+def identify_role(info):
+    """Processor role of a pyserial ListPortInfo from its USB descriptors"""
+    text = " ".join(filter(None, [info.description, info.product, info.interface, info.manufacturer])).lower()
+    for role, hints in ROLE_HINTS:
+        if any(hint in text for hint in hints):
+            return role
+    return UNKNOWN
+
+
+def is_badge_port(info):
+    if info.vid in BADGE_VIDS:
+        return True
+    return identify_role(info) in (MAIN, DISPLAY) or 'usbmodem' in info.device
+
+
+def badge_id(info):
+    """Ports on the same badge share a hub: strip the interface and last port number"""
+    if info.location:
+        hub = info.location.split(":")[0]
+        return hub.rsplit(".", 1)[0] if "." in hub else hub
+    return info.serial_number or info.device
+
+
+def scan():
+    """Enumerate badge ports now (the slow path)"""
+    ports = []
+    for info in serial.tools.list_ports.comports():
+        if is_badge_port(info):
+            ports.append(BadgePort(info.device, identify_role(info), info.serial_number,
+                                   badge_id(info), info.description))
+    ports.sort(key=lambda p: (p.badge, p.role, p.device))
+    return ports
+
+
+def load_cache():
+    if PORT_CACHE.exists():
+        try:
+            return [BadgePort(**entry) for entry in json.loads(PORT_CACHE.read_text())]
+        except (OSError, ValueError, TypeError):
+            pass
+    return []
+
+
+def save_cache(ports):
+    # Keep entries for badges that are unplugged right now; they'll be back. An
+    # entry whose device node now belongs to another port is stale and goes.
+    taken = {p.device for p in ports}
+    current = {p.serial_number or p.device: p for p in load_cache() if p.device not in taken}
+    current.update({p.serial_number or p.device: p for p in ports})
+    PORT_CACHE.write_text(json.dumps([p._asdict() for p in current.values()], indent=2))
+
+
+def node_serial(device):
+    """USB serial number behind a tty node, read from sysfs without enumerating; None where there is no sysfs"""
+    try:
+        return (SYS_TTY / os.path.basename(device) / "device" / ".." / "serial").read_text().strip()
+    except OSError:
+        return None
+
+
+def cached_ports():
+    """Cached ports that are plugged in now, or None when the cache can't be trusted.
+
+    Only the cached nodes are looked at. Device numbers get reused: a
+    cached node that now carries a different USB serial number (another
+    badge, or this badge's other processor) means the roles are stale. On
+    Linux that is read from sysfs. Elsewhere the node existing is all there
+    is to check (macOS names nodes after the USB location). Windows COM
+    names can't be checked without enumerating, so there it always scans.
+    """
+    if os.name == "nt":
+        return None
+    ports = []
+    for p in load_cache():
+        if not os.path.exists(p.device):
+            continue  # unplugged
+        live = node_serial(p.device)
+        if live is not None and live != p.serial_number:
+            return None
+        ports.append(p)
+    return ports or None
+
+
+def discover(use_cache=True):
+    """Badge ports, from the cache when every cached port that is plugged in still has its serial number"""
+    if use_cache:
+        cached = cached_ports()
+        if cached:
+            return cached
+    ports = scan()
+    if ports:
+        save_cache(ports)
+    return ports
+
+
+def pick_port(ports, role=None):
+    """First port with role; for MAIN, a lone port of unknown role (e.g. Windows "USB Serial Device")"""
+    if not role:
+        return ports[0] if ports else None
+    matches = [p for p in ports if p.role == role]
+    if matches:
+        return matches[0]
+    unknown = [p for p in ports if p.role == UNKNOWN]
+    if role == MAIN and len(unknown) == 1:
+        return unknown[0]
+    return None
+
+
+def find_port(role=None, badge=None):
+    """Device path for a role ("main", "display"), or the first badge port if role is None"""
+    def pick(ports):
+        port = pick_port([p for p in ports if badge is None or p.badge == badge], role)
+        return port.device if port else None
+
+    # At most one enumeration: the cache, and a scan only if it has no answer
+    cached = cached_ports()
+    return (pick(cached) if cached else None) or pick(discover(use_cache=False))
+
+
+class PortWatcher:
+    """Calls on_event(kind, port) with kind "add" or "remove" when badge ports come and go.
+
+    The ports already plugged in are scanned on the watcher's thread and
+    report no events.
+    """
+
+    def __init__(self, on_event, interval=1.0):
+        self.on_event = on_event
+        self.interval = interval
+        self.ports = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        if sys.platform.startswith("linux"):
+            wait = self._uevent_waiter()
+        elif hasattr(select, "kqueue"):
+            wait = self._kqueue_waiter()
+        else:
+            wait = None
+        # After the waiter is set up, so nothing plugged in meanwhile is missed
+        self.ports = {p.device: p for p in scan()}
+        while not self._stop.is_set():
+            if wait:
+                if not wait():
+                    continue
+            else:
+                self._stop.wait(self.interval)
+            self._rescan()
+
+    def _uevent_waiter(self):
+        """Wait for a tty add/remove uevent from the kernel"""
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+            sock.bind((0, 1))
+        except OSError:
+            return None
+        sock.settimeout(0.5)
+
+        def wait():
+            try:
+                message = sock.recv(8192)
+            except socket.timeout:
+                return False
+            header = message.split(b"\0", 1)[0]
+            return header.startswith((b"add@", b"remove@")) and b"/tty/" in header
+        return wait
+
+    def _kqueue_waiter(self):
+        """Wait for /dev to change (device nodes created or removed)"""
+        try:
+            fd = os.open("/dev", os.O_RDONLY)
+        except OSError:
+            return None
+        kq = select.kqueue()
+        event = select.kevent(fd, filter=select.KQ_FILTER_VNODE,
+                              flags=select.KQ_EV_ADD | select.KQ_EV_CLEAR, fflags=select.KQ_NOTE_WRITE)
+        kq.control([event], 0)
+
+        def wait():
+            return bool(kq.control(None, 1, 0.5))
+        return wait
+
+    def _rescan(self):
+        current = {p.device: p for p in scan()}
+        for device in self.ports.keys() - current.keys():
+            self.on_event("remove", self.ports[device])
+        added = [current[d] for d in current.keys() - self.ports.keys()]
+        self.ports = current
+        if added:
+            save_cache(added)
+        for port in added:
+            self.on_event("add", port)
+
+
+def print_ports(ports):
+    if not ports:
+        print("✗ No badge ports found")
+        return
+    for port in ports:
+        print(f"{port.device:<28} {port.role:<8} badge {port.badge:<12} sn {port.serial_number or '-':<18} {port.description}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find badge serial ports and watch for hot-plug")
+    parser.add_argument("--rescan", action="store_true", help="Ignore the cache and enumerate ports")
+    parser.add_argument("--role", choices=[MAIN, DISPLAY, FPGA], help="Print only the port for this role")
+    parser.add_argument("--watch", action="store_true", help="Print add/remove events until Ctrl+C")
+    args = parser.parse_args()
+
+    if args.role:
+        port = find_port(args.role)
+        if not port:
+            return 1
+        print(port)
+        return 0
+
+    start = time.perf_counter()
+    ports = discover(use_cache=not args.rescan)
+    print_ports(ports)
+    print(f"({(time.perf_counter() - start) * 1000:.1f} ms)")
+
+    if args.watch:
+        def on_event(kind, port):
+            print(f"{time.strftime('%H:%M:%S')} {kind:<6} {port.device} ({port.role})", flush=True)
+
+        PortWatcher(on_event).start()
+        print("Watching for badge ports (Ctrl+C to stop)...")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
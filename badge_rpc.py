@@ -0,0 +1,755 @@
+#!/usr/bin/env python3
+"""
+Framed Command Protocol
+
+The other tools drive the badge by typing menu letters and scraping the text
+that comes back (up to "Enter Letter:"). That costs a menu redraw per
+command, breaks when the wording changes, and only one command can be in
+flight. This is a binary fast path for the file commands: each request is a
+frame with a request id, a length and a CRC, and up to WINDOW requests are
+sent before their replies are read, so the link never idles between them.
+
+The badge side is scripts/rpc_handler.py, run on the badge as rpc.py. While
+it runs it answers frames on the USB console; QUIT hands the console back to
+the menu. Frames contain letters, and the menu takes any letter as a
+choice, so list_files() only probes ports where start_handler() (or an
+earlier probe) found the handler running; the rest go straight to the text
+menu. If a probe goes unanswered the port is forgotten and the menu is
+backed out to the top with 'q' before it is used, so callers don't need to
+know which one they got.
+
+Request (little-endian):
+    ESC 'R', uint16 id, uint8 op, uint16 length, payload, uint32 CRC32 of id..payload
+Reply:
+    ESC 'r', uint16 id, uint8 status, uint16 length, payload, uint32 CRC32 of id..payload
+Ops: PING (echo), LIST dir ("name\\tsize" lines), STAT path (uint32 size),
+READ uint32 offset + uint16 count + path, CRC path (uint32 CRC32), QUIT.
+A request that fails its CRC is answered BAD_CRC and sent again.
+
+Usage:
+    python3 badge_rpc.py --bench                 # stand-in badge, no hardware needed
+    python3 badge_rpc.py --bench --latency 0.01 --command-ms 5 --count 200
+    python3 badge_rpc.py --start [--port PORT]   # run rpc.py on the badge, then list its files
+    python3 badge_rpc.py --list [--port PORT]    # list files, framed if rpc.py was started, else the menu
+
+Other tools:
+    from badge_rpc import BadgeRPC, list_files
+    listing = list_files(ser, profile)           # framed when rpc.py is known to run, else the menu
+    rpc = BadgeRPC(ser)
+    if rpc.probe():
+        sizes = rpc.pipeline([(STAT, b"images/a.fwi"), (STAT, b"images/b.fwi")])
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import deque, namedtuple
+
+REQUEST_MAGIC = b"\x1bR"
+REPLY_MAGIC = b"\x1br"
+HEADER = struct.Struct("<HBH")
+CRC = struct.Struct("<I")
+MAX_PAYLOAD = 4096
+
+PING, LIST, STAT, READ, CRC32, QUIT = 0, 1, 2, 3, 4, 5
+OK, BAD_CRC, UNKNOWN_OP, NOT_FOUND, FAILED = 0, 1, 2, 3, 4
+STATUS_NAMES = {BAD_CRC: "bad CRC", UNKNOWN_OP: "unknown op", NOT_FOUND: "not found", FAILED: "failed"}
+
+# Requests in flight before waiting for the oldest reply
+WINDOW = 8
+REPLY_TIMEOUT = 1.0
+RETRIES = 2
+# Directories the presenter uploads into
+IMAGE_DIR = "images"
+AUDIO_DIR = "sounds"
+HANDLER_NAME = "rpc.py"
+# Ports where the handler was started or last answered a probe
+HANDLER_CACHE = pathlib.Path(os.environ.get("BADGE_RPC_CACHE", pathlib.Path.home() / ".badge_rpc.json"))
+PROBE_PAYLOAD = b"\x00\x01"
+
+MENU_PROMPT = "Enter Letter:"
+
+Listing = namedtuple("Listing", "images audio via")
+
+
+class RPCError(Exception):
+    """The badge answered a request with an error status"""
+
+    def __init__(self, status, detail=b""):
+        self.status = status
+        detail = detail.decode("utf-8", errors="replace")
+        super().__init__(f"{STATUS_NAMES.get(status, status)}{': ' + detail if detail else ''}")
+
+
+def pack_request(request_id, op, payload=b""):
+    if len(payload) > MAX_PAYLOAD:
+        raise ValueError(f"payload of {len(payload)} bytes is over {MAX_PAYLOAD}")
+    body = HEADER.pack(request_id, op, len(payload)) + payload
+    return REQUEST_MAGIC + body + CRC.pack(zlib.crc32(body))
+
+
+class BadgeRPC:
+    """Framed requests on an open serial port, pipelined WINDOW deep"""
+
+    def __init__(self, ser, window=WINDOW, timeout=REPLY_TIMEOUT):
+        self.ser = ser
+        self.window = window
+        self.timeout = timeout
+        self._next_id = 0
+        self.retries = RETRIES
+        self._buffer = b""
+        self.resent = 0
+
+    def _new_id(self):
+        self._next_id = (self._next_id + 1) & 0xFFFF
+        return self._next_id
+
+    def _read_reply(self, deadline):
+        """(id, status, payload) of the next intact reply frame, skipping text and damaged frames"""
+        old_timeout = self.ser.timeout
+        try:
+            while True:
+                start = self._buffer.find(REPLY_MAGIC)
+                if start < 0:
+                    self._buffer = self._buffer[-1:]
+                else:
+                    self._buffer = self._buffer[start:]
+                    if len(self._buffer) >= 2 + HEADER.size:
+                        request_id, status, length = HEADER.unpack_from(self._buffer, 2)
+                        end = 2 + HEADER.size + length + CRC.size
+                        if length > MAX_PAYLOAD:
+                            self._buffer = self._buffer[2:]
+                            continue
+                        if len(self._buffer) >= end:
+                            frame, self._buffer = self._buffer[:end], self._buffer[end:]
+                            (crc,) = CRC.unpack_from(frame, end - CRC.size)
+                            if crc == zlib.crc32(frame[2:end - CRC.size]):
+                                return request_id, status, frame[2 + HEADER.size:end - CRC.size]
+                            # Damaged: its request times out and is sent again
+                            self._buffer = frame[2:] + self._buffer
+                            continue
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    raise TimeoutError("no reply from the badge")
+                self.ser.timeout = remaining
+                self._buffer += self.ser.read(max(1, self.ser.in_waiting))
+        finally:
+            self.ser.timeout = old_timeout
+
+    def pipeline(self, requests, on_reply=None):
+        """Send (op, payload) requests WINDOW at a time; returns the reply payloads in order.
+
+        on_reply(index) runs as each reply arrives. Every reply is read
+        before an error is raised, so the stream stays in step.
+        """
+        results = [None] * len(requests)
+        pending = {}
+        queue = deque(enumerate(requests))
+        tries = {}
+        failed = None
+        deadline = None
+        while queue or pending:
+            while queue and len(pending) < self.window:
+                index, (op, payload) = queue.popleft()
+                request_id = self._new_id()
+                pending[request_id] = index
+                self.ser.write(pack_request(request_id, op, payload))
+                deadline = time.perf_counter() + self.timeout
+            try:
+                request_id, status, payload = self._read_reply(deadline)
+            except TimeoutError:
+                # Lost or damaged somewhere: send everything still outstanding again
+                for index in pending.values():
+                    tries[index] = tries.get(index, 0) + 1
+                    if tries[index] > self.retries:
+                        raise
+                queue.extendleft(sorted(((index, requests[index]) for index in pending.values()), reverse=True))
+                self.resent += len(pending)
+                pending.clear()
+                continue
+            deadline = time.perf_counter() + self.timeout
+            index = pending.pop(request_id, None)
+            if index is None:
+                continue  # a reply to a request already sent again
+            if status == BAD_CRC and tries.get(index, 0) < self.retries:
+                tries[index] = tries.get(index, 0) + 1
+                self.resent += 1
+                queue.appendleft((index, requests[index]))
+                continue
+            if status != OK:
+                failed = failed or RPCError(status, payload)
+                payload = None
+            results[index] = payload
+            if on_reply:
+                on_reply(index)
+        if failed:
+            raise failed
+        return results
+
+    def call(self, op, payload=b""):
+        return self.pipeline([(op, payload)])[0]
+
+    def probe(self, timeout=None):
+        """True if a handler answers a single PING (no retries)"""
+        old = self.timeout, self.retries
+        self.timeout, self.retries = timeout or self.timeout, 0
+        try:
+            return self.pipeline([(PING, PROBE_PAYLOAD)]) == [PROBE_PAYLOAD]
+        except (TimeoutError, RPCError):
+            # The menu may have echoed the probe; drop whatever it printed
+            self.ser.reset_input_buffer()
+            self._buffer = b""
+            return False
+        finally:
+            self.timeout, self.retries = old
+
+    def list_dir(self, path):
+        """[(name, size)] in a badge directory; directories end in '/' with size -1"""
+        return parse_dir(self.call(LIST, path.encode()))
+
+    def list_dirs(self, paths):
+        """{path: [(name, size)]} for several directories in one pipeline; missing ones are empty"""
+        try:
+            replies = self.pipeline([(LIST, path.encode()) for path in paths])
+        except RPCError as e:
+            if e.status != NOT_FOUND:
+                raise
+            replies = [self._list_or_empty(path) for path in paths]
+        return {path: parse_dir(reply) for path, reply in zip(paths, replies)}
+
+    def _list_or_empty(self, path):
+        try:
+            return self.call(LIST, path.encode())
+        except RPCError as e:
+            if e.status != NOT_FOUND:
+                raise
+            return b""
+
+    def stat(self, path):
+        return CRC.unpack(self.call(STAT, path.encode()))[0]
+
+    def file_crc(self, path):
+        return CRC.unpack(self.call(CRC32, path.encode()))[0]
+
+    def read_file(self, path):
+        """A whole file, read as pipelined MAX_PAYLOAD pieces"""
+        size = self.stat(path)
+        requests = [(READ, struct.pack("<IH", offset, MAX_PAYLOAD) + path.encode())
+                    for offset in range(0, size, MAX_PAYLOAD)]
+        return b"".join(self.pipeline(requests))
+
+    def quit(self):
+        """Stop the handler; the console goes back to the menu"""
+        self.call(QUIT)
+        mark_handler(getattr(self.ser, "port", None), False)
+
+
+def parse_dir(data):
+    entries = []
+    for line in data.decode("utf-8", errors="replace").splitlines():
+        name, _, size = line.rpartition("\t")
+        if name:
+            entries.append((name, int(size)))
+    return entries
+
+
+def parse_file_list(text):
+    """(images, audio) file names from the badge's file menu listing"""
+    images = []
+    audio = []
+    for line in text.split('\n'):
+        if '.fwi' in line.lower():
+            found, suffix = images, '.fwi'
+        elif '.wav' in line.lower():
+            found, suffix = audio, '.wav'
+        else:
+            continue
+        for part in line.strip().split():
+            if suffix in part.lower():
+                found.append(part)
+                break
+    return images, audio
+
+
+def menu_listing(ser, profile):
+    """The file menu's listing as text ('f', then 'l', read up to the prompt), back at the main menu"""
+    from badge_link_profile import read_response
+
+    ser.write(b'f\n')  # File menu
+    read_response(ser, profile, expect=MENU_PROMPT)  # Clear response
+
+    ser.write(b'l\n')  # List files
+
+    # Read file list up to the next prompt; the listing itself can take a while
+    listing = read_response(ser, profile, expect=MENU_PROMPT, timeout=max(1.0, profile.settle))
+
+    ser.write(b'q\n')  # Back to the main menu
+    read_response(ser, profile, expect=MENU_PROMPT)
+    return listing.decode('ascii', errors='ignore')
+
+
+def probe_timeout(profile):
+    """How long a probe waits: a few menu round trips, since the handler answers no slower"""
+    return max(0.1, profile.rtt * 2)
+
+
+def load_handler_ports():
+    if HANDLER_CACHE.exists():
+        try:
+            return set(json.loads(HANDLER_CACHE.read_text()))
+        except (OSError, ValueError, TypeError):
+            pass
+    return set()
+
+
+def mark_handler(port, running):
+    """Remember whether the handler runs on a port, for the next list_files()"""
+    ports = load_handler_ports()
+    if (port in ports) == running:
+        return
+    if running:
+        ports.add(port)
+    else:
+        ports.discard(port)
+    try:
+        HANDLER_CACHE.write_text(json.dumps(sorted(ports)))
+    except OSError:
+        pass
+
+
+def _drain(ser, profile):
+    """Read and drop whatever the menu is still sending, until it goes quiet"""
+    old_timeout = ser.timeout
+    ser.timeout = max(profile.idle_gap, profile.rtt)
+    try:
+        while ser.read(max(1, ser.in_waiting)):
+            pass
+    finally:
+        ser.timeout = old_timeout
+
+
+def back_to_menu(ser, profile):
+    """Leave whatever submenu stray keystrokes opened: end the line, then 'q' twice"""
+    from badge_link_profile import read_response
+
+    # A key may or may not redraw a prompt, so wait for each one briefly, then drop the rest
+    _drain(ser, profile)
+    for keys in (b"\n", b"q\n", b"q\n"):
+        ser.write(keys)
+        read_response(ser, profile, expect=MENU_PROMPT, timeout=probe_timeout(profile))
+    _drain(ser, profile)
+
+
+def list_files(ser, profile=None, rpc=None, handler=None):
+    """(images, audio, via) on the badge: framed if rpc.py is running, else through the file menu.
+
+    handler=None probes only ports remembered from start_handler() or an
+    earlier probe; True probes anyway, False never does.
+    """
+    from badge_link_profile import DEFAULT_PROFILE
+
+    profile = profile or DEFAULT_PROFILE
+    port = getattr(ser, "port", None)
+    if handler is None:
+        handler = port in load_handler_ports()
+    if handler:
+        rpc = rpc or BadgeRPC(ser)
+        if rpc.probe(probe_timeout(profile)):
+            mark_handler(port, True)
+            listings = rpc.list_dirs([IMAGE_DIR, AUDIO_DIR])
+            images = [name for name, size in listings[IMAGE_DIR] if name.lower().endswith(".fwi")]
+            audio = [name for name, size in listings[AUDIO_DIR] if name.lower().endswith(".wav")]
+            return Listing(images, audio, "rpc")
+        # The handler has gone and the frame reached the menu as keystrokes
+        mark_handler(port, False)
+        back_to_menu(ser, profile)
+    images, audio = parse_file_list(menu_listing(ser, profile))
+    return Listing(images, audio, "menu")
+
+
+def start_handler(port=None):
+    """Run rpc.py on the badge's main processor (upload it with scripts/build_bundle.py --upload).
+
+    port is the main processor's serial port; None finds it. Returns the port.
+    """
+    from freewili.fw import FreeWili
+    from freewili.types import FreeWiliProcessorType
+
+    from badge_ports import MAIN, find_port
+
+    port = port or find_port(MAIN)
+    if not port:
+        raise RuntimeError("main processor port not found")
+    badges = [badge for badge in FreeWili.find_all() if badge.main and badge.main.port == port]
+    if not badges:
+        raise RuntimeError(f"no badge with its main processor on {port}")
+    result = badges[0].run_script(HANDLER_NAME, False, FreeWiliProcessorType.Main)
+    if result.is_err():
+        raise RuntimeError(f"could not start {HANDLER_NAME}: {result.unwrap_err()}")
+    mark_handler(port, True)
+    return port
+
+
+# Benchmark: a stand-in badge on a pty that runs the reference handler, then a text menu
+
+class _DelayedLink:
+    """One direction of a link: bytes take len/rate to serialize and arrive `latency` later"""
+
+    def __init__(self, rate, latency, deliver):
+        self.rate = rate
+        self.latency = latency
+        self.deliver = deliver
+        self._queue = deque()
+        self._ready = threading.Condition()
+        self._busy_until = 0.0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def send(self, data):
+        with self._ready:
+            now = time.perf_counter()
+            self._busy_until = max(self._busy_until, now) + len(data) / self.rate
+            self._queue.append((self._busy_until + self.latency, data))
+            self._ready.notify()
+
+    def close(self):
+        with self._ready:
+            self._closed = True
+            self._ready.notify()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._ready:
+                while not self._queue and not self._closed:
+                    self._ready.wait()
+                if self._closed:
+                    return
+                due, data = self._queue.popleft()
+            wait = due - time.perf_counter()
+            if wait > 0:
+                time.sleep(wait)
+            self.deliver(data)
+
+
+class StandInBadge:
+    """Local stand-in: a pty running rpc_handler.serve() over a files tree, then a text menu.
+
+    rate and latency shape the link both ways; each command (a frame or
+    a menu line) takes command_time on the badge. With handler=False only
+    the menu runs, as on a badge without rpc.py. While the handler runs,
+    a 0x03 byte is Ctrl-C unless it turned that off, as on the REPL console.
+    """
+
+    def __init__(self, root, rate=11520, latency=0.005, command_time=0.005, handler=True):
+        import pty
+        import tty
+
+        self.root = str(root)
+        self.command_time = command_time
+        self.commands = 0
+        self._master, self._slave = pty.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._inbox = deque()
+        self._interrupt = None
+        self._arrived = threading.Condition()
+        self._stop = threading.Event()
+        self._to_host = _DelayedLink(rate, latency, lambda data: os.write(self._master, data))
+        self._to_badge = _DelayedLink(rate, latency, self._arrive)
+        self._threads = [threading.Thread(target=self._pump, daemon=True),
+                         threading.Thread(target=self._run, args=(handler,), daemon=True)]
+        for thread in self._threads:
+            thread.start()
+
+    def close(self):
+        self._stop.set()
+        with self._arrived:
+            self._arrived.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._to_badge.close()
+        self._to_host.close()
+        os.close(self._master)
+        os.close(self._slave)
+
+    # The pty's far end is the host; bytes go through the delayed links both ways
+    def _pump(self):
+        import select
+
+        while not self._stop.is_set():
+            if select.select([self._master], [], [], 0.05)[0]:
+                self._to_badge.send(os.read(self._master, 4096))
+
+    def _arrive(self, data):
+        with self._arrived:
+            self._inbox.append(data)
+            self._arrived.notify_all()
+
+    # File-like console for the handler
+    def read(self, count):
+        with self._arrived:
+            while not self._inbox:
+                if self._stop.is_set():
+                    return b""
+                self._arrived.wait(0.05)
+            data = self._inbox.popleft()
+            if len(data) > count:
+                self._inbox.appendleft(data[count:])
+                data = data[:count]
+            if self._interrupt is not None and bytes([self._interrupt]) in data:
+                raise KeyboardInterrupt(f"0x{self._interrupt:02x} on the console")
+            return data
+
+    def kbd_intr(self, char):
+        """micropython.kbd_intr() for the handler: -1 turns Ctrl-C off"""
+        self._interrupt = None if char < 0 else char
+
+    def write(self, data):
+        time.sleep(self.command_time)
+        self.commands += 1
+        self._to_host.send(bytes(data))
+
+    def _files(self):
+        for folder in (IMAGE_DIR, AUDIO_DIR):
+            path = pathlib.Path(self.root) / folder
+            for entry in sorted(path.iterdir()) if path.is_dir() else ():
+                yield entry.name, entry.stat().st_size
+
+    def _run(self, handler):
+        sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent / "scripts"))
+        import rpc_handler
+
+        if handler:
+            # The REPL console starts with Ctrl-C on; the menu after it is firmware, not the REPL
+            self._interrupt = 3
+            try:
+                rpc_handler.run(self, self, self.root, console=self)
+            except KeyboardInterrupt:
+                return
+            self._interrupt = None
+        menus = {
+            "main": "\r\nMain Menu\r\n f) File Functions\r\n g) Display Functions\r\n"
+                    " i) I/O Functions\r\n s) Settings\r\nEnter Letter: ",
+            "file": "\r\nFile Functions\r\n l) List Files\r\n u) Upload File\r\n d) Delete File\r\n"
+                    " q) Back\r\nEnter Letter: ",
+            "other": "\r\nSubmenu\r\n q) Back\r\nEnter Letter: ",
+        }
+        # Like the firmware, each letter is a choice as soon as it arrives; a bare newline redraws
+        menu = "main"
+        after_key = False
+        while True:
+            data = self.read(1)
+            if not data:
+                return
+            key = data.decode("ascii", errors="ignore")
+            if key in ("\n", "\r"):
+                if after_key:
+                    after_key = key == "\r"
+                    continue
+            elif not key.isalpha():
+                continue
+            else:
+                after_key = True
+                key = key.lower()
+            if menu == "main" and key == "f":
+                menu = "file"
+            elif menu == "main" and key.isalpha() and key != "q":
+                menu = "other"
+            elif menu != "main" and key == "q":
+                menu = "main"
+            elif menu == "file" and key == "l":
+                listing = "".join(f"  {name:<32} {size:>8}\r\n" for name, size in self._files())
+                time.sleep(self.command_time)
+                self.commands += 1
+                self._to_host.send(f"\r\nFiles:\r\n{listing}\r\nEnter Letter: ".encode())
+                continue
+            time.sleep(self.command_time)
+            self.commands += 1
+            self._to_host.send(menus[menu].encode())
+
+
+def _summary(name, latencies, elapsed):
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    return (f"{name:<24} {len(latencies) / elapsed:7.1f}/s   median {statistics.median(latencies) * 1000:6.1f} ms"
+            f"   p95 {p95 * 1000:6.1f} ms")
+
+
+def benchmark(rate, latency, command_time, count):
+    import tempfile
+
+    global HANDLER_CACHE
+
+    import serial
+
+    from badge_link_profile import DEFAULT_PROFILE, read_response
+
+    # What badge_link_profile.py would measure on the stand-in
+    profile = DEFAULT_PROFILE._replace(rtt=2 * latency + command_time, idle_gap=max(0.02, latency * 4))
+    print(f"Stand-in link {rate} B/s, {latency * 1000:.0f} ms each way, {command_time * 1000:.0f} ms per command, "
+          f"{count} commands per run")
+    with tempfile.TemporaryDirectory() as tmp:
+        root = pathlib.Path(tmp)
+        (root / IMAGE_DIR).mkdir()
+        (root / AUDIO_DIR).mkdir()
+        for i in range(24):
+            (root / IMAGE_DIR / f"slide{i:02d}.fwi").write_bytes(os.urandom(512 + i))
+        for i in range(6):
+            (root / AUDIO_DIR / f"clip{i}.wav").write_bytes(os.urandom(256 + i))
+        HANDLER_CACHE = root / "handler_ports.json"
+
+        # One command each way: the menu's cheapest (a redraw) and PING
+        badge = StandInBadge(root, rate, latency, command_time)
+        ser = serial.Serial(badge.port, timeout=REPLY_TIMEOUT)
+        rpc = BadgeRPC(ser)
+        if not rpc.probe():
+            print("✗ stand-in handler did not answer")
+            return 1
+        # 0x03 is Ctrl-C on the console; the handler has to take it as data
+        try:
+            echoed = rpc.call(PING, b"\x03\x03") == b"\x03\x03"
+        except TimeoutError:
+            echoed = False
+        if not echoed:
+            print("✗ stand-in handler stopped at 0x03 (Ctrl-C)")
+            return 1
+
+        latencies = []
+        start = time.perf_counter()
+        for i in range(count):
+            sent = time.perf_counter()
+            rpc.call(PING, b"%d" % i)
+            latencies.append(time.perf_counter() - sent)
+        rpc_sequential = _summary("framed, one at a time", latencies, time.perf_counter() - start)
+
+        sent_at = {}
+        latencies = []
+        requests = [(PING, b"%d" % i) for i in range(count)]
+        start = time.perf_counter()
+        original_write = ser.write
+
+        def timed_write(data):
+            sent_at[len(sent_at)] = time.perf_counter()
+            return original_write(data)
+
+        ser.write = timed_write
+        rpc.pipeline(requests, on_reply=lambda index: latencies.append(time.perf_counter() - sent_at[index]))
+        ser.write = original_write
+        rpc_pipelined = _summary(f"framed, {rpc.window} in flight", latencies, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        listing = list_files(ser, profile, rpc, handler=True)
+        rpc_list = time.perf_counter() - start
+
+        rpc.quit()
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(count):
+            sent = time.perf_counter()
+            ser.write(b"\n")
+            read_response(ser, profile, expect=MENU_PROMPT)
+            latencies.append(time.perf_counter() - sent)
+        menu = _summary("menu (redraw)", latencies, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        menu_images, menu_audio = parse_file_list(menu_listing(ser, profile))
+        menu_list = time.perf_counter() - start
+        ser.close()
+        badge.close()
+
+        # A badge without the handler: nothing probes it, the menu answers
+        badge = StandInBadge(root, rate, latency, command_time, handler=False)
+        ser = serial.Serial(badge.port, timeout=REPLY_TIMEOUT)
+        start = time.perf_counter()
+        fallback = list_files(ser, profile)
+        fallback_list = time.perf_counter() - start
+        commands = badge.commands
+
+        # The handler remembered but gone: the probe's bytes hit the menu as letters
+        mark_handler(badge.port, True)
+        start = time.perf_counter()
+        stale = list_files(ser, profile)
+        stale_list = time.perf_counter() - start
+        forgotten = badge.port not in load_handler_ports()
+        ser.close()
+        badge.close()
+
+    print(menu)
+    print(rpc_sequential)
+    print(rpc_pipelined)
+    print(f"list files, menu         {menu_list * 1000:7.1f} ms  ({len(menu_images)} images, {len(menu_audio)} audio)")
+    print(f"list files, framed       {rpc_list * 1000:7.1f} ms  ({len(listing.images)} images, "
+          f"{len(listing.audio)} audio)")
+    print(f"list files, no handler   {fallback_list * 1000:7.1f} ms  (via {fallback.via}, {commands} menu answers)")
+    print(f"list files, stale flag   {stale_list * 1000:7.1f} ms  (probe, back out, then via {stale.via})")
+    same = (sorted(listing.images) == sorted(menu_images) == sorted(fallback.images) == sorted(stale.images)
+            and sorted(listing.audio) == sorted(menu_audio) == sorted(fallback.audio) == sorted(stale.audio))
+    ok = same and fallback.via == stale.via == "menu" and forgotten
+    print(f"{'✓' if ok else '✗'} all four listings agree{'' if forgotten else '; stale port not forgotten'}")
+    return 0 if ok else 1
+
+
+def open_port(port):
+    import serial
+
+    from badge_link_profile import load_profile
+    from badge_ports import MAIN, find_port
+
+    port = port or find_port(MAIN)
+    if not port:
+        raise RuntimeError("main processor port not found")
+    profile = load_profile(port)
+    return serial.Serial(port, profile.baudrate, timeout=1), profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Framed binary commands to the badge, with a text-menu fallback")
+    parser.add_argument("--bench", action="store_true", help="Compare with the menu on a local stand-in badge")
+    parser.add_argument("--start", action="store_true", help=f"Run {HANDLER_NAME} on the badge, then list files")
+    parser.add_argument("--list", action="store_true", help="List the badge's images and audio")
+    parser.add_argument("--port", help="Serial port (default: main processor)")
+    parser.add_argument("--rate", type=int, default=11520, help="Stand-in link rate in bytes/s")
+    parser.add_argument("--latency", type=float, default=0.005, help="Stand-in one-way latency in seconds")
+    parser.add_argument("--command-ms", type=float, default=5.0, help="Stand-in time per command")
+    parser.add_argument("--count", type=int, default=200, help="Commands per benchmark run")
+    args = parser.parse_args()
+
+    if args.bench:
+        return benchmark(args.rate, args.latency, args.command_ms / 1000, args.count)
+    if not (args.start or args.list):
+        parser.print_help()
+        return 1
+    try:
+        if args.start:
+            start_handler(args.port)
+            print(f"✓ Started {HANDLER_NAME}")
+        ser, profile = open_port(args.port)
+    except RuntimeError as e:
+        print(f"✗ {e}")
+        return 1
+    try:
+        start = time.perf_counter()
+        listing = list_files(ser, profile)
+        elapsed = time.perf_counter() - start
+    except (TimeoutError, RPCError) as e:
+        print(f"✗ {e}")
+        return 1
+    finally:
+        ser.close()
+    for name in listing.images + listing.audio:
+        print(f"  {name}")
+    print(f"✓ {len(listing.images)} images, {len(listing.audio)} audio via {listing.via} in {elapsed * 1000:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,474 @@
+#!/usr/bin/env python3
+"""
+Live Frame Streaming to the Badge Display
+
+Uploading an FWI file and calling show_gui_image costs about a second per
+frame. This streams frames straight to the screen instead: the badge firmware
+(include/frame_stream.h, built into src/main.cpp) draws each packet as it
+arrives and acknowledges it.
+
+The host side is double buffered. push() only swaps the new frame into the
+back buffer and never blocks. A sender thread takes whatever is newest, so
+when the link falls behind the frames in between are dropped, not queued.
+Two frames may be in flight: the badge draws one while the next arrives.
+Only what changed since the last frame is sent, as one rectangle per band
+of changed rows.
+
+Packet (little-endian header, big-endian RGB565 pixels as in FWI files):
+    ESC 'F', uint16 seq, x, y, w, h, w*h pixels, uint32 CRC32 of the rest
+Reply:
+    ESC 'K', uint16 seq, uint8 status (0 drawn, 1 bad CRC)
+
+Usage:
+    python3 frame_stream.py --bench              # stand-in device, no badge needed
+    python3 frame_stream.py --bench --rate 500000 --seconds 5
+    python3 frame_stream.py --demo [--port PORT] [--fps 20]
+
+Other tools:
+    from frame_stream import FrameStreamer
+    streamer = FrameStreamer(ser).start()
+    streamer.push(pil_image_or_array)     # as often as you like
+    stats = streamer.stop()
+"""
+
+import argparse
+import os
+import pathlib
+import select
+import statistics
+import struct
+import sys
+import threading
+import time
+import zlib
+from collections import namedtuple
+
+import numpy as np
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent / "presenter"))
+from fwi_encoder import fit, letterbox, rgb565  # noqa: E402
+
+# The TFT on the main processor, portrait (src/main.cpp)
+STREAM_SIZE = (240, 320)
+FRAME_MAGIC = b"\x1bF"
+ACK_MAGIC = b"\x1bK"
+HEADER = struct.Struct("<2sHHHHH")
+ACK = struct.Struct("<2sHB")
+ACK_OK, ACK_BAD_CRC = 0, 1
+IN_FLIGHT = 2
+ACK_TIMEOUT = 2.0
+BAND_GAP = 8
+
+StreamStats = namedtuple(
+    "StreamStats", "pushed presented dropped unchanged failed bytes elapsed fps utilization latency_ms")
+
+
+def to_words(frame, size=STREAM_SIZE):
+    """Frame (PIL image or RGB array) as an (h, w) array of big-endian RGB565 words"""
+    return rgb565(letterbox(fit(frame, size), size))
+
+
+def dirty_boxes(words, previous, gap=BAND_GAP):
+    """(x, y, w, h) rectangles covering the pixels that differ from previous.
+
+    Changed rows closer than gap are kept in one band, since each rectangle
+    costs a packet header and a reply.
+    """
+    if previous is None:
+        return [(0, 0, words.shape[1], words.shape[0])]
+    changed = words != previous
+    rows = np.flatnonzero(changed.any(axis=1))
+    if not len(rows):
+        return []
+    breaks = np.flatnonzero(np.diff(rows) > gap)
+    boxes = []
+    for band in np.split(rows, breaks + 1):
+        top, bottom = int(band[0]), int(band[-1])
+        cols = np.flatnonzero(changed[top:bottom + 1].any(axis=0))
+        boxes.append((int(cols[0]), top, int(cols[-1] - cols[0] + 1), bottom - top + 1))
+    return boxes
+
+
+def pack_frame(seq, words, box):
+    x, y, w, h = box
+    packet = HEADER.pack(FRAME_MAGIC, seq, x, y, w, h) + words[y:y + h, x:x + w].tobytes()
+    return packet + struct.pack("<I", zlib.crc32(packet))
+
+
+class FrameStreamer:
+    """Streams frames over an open serial port, dropping stale ones when the link is busy"""
+
+    def __init__(self, ser, size=STREAM_SIZE, link_rate=None, delta=True, in_flight=IN_FLIGHT, write_chunk=0):
+        self.ser = ser
+        self.size = size
+        self.link_rate = link_rate
+        # Measured by badge_link_profile.py; 0 writes each packet in one go
+        self.write_chunk = write_chunk
+        self.delta = delta
+        self._back = None
+        self._cond = threading.Condition()
+        self._slots = threading.Semaphore(in_flight)
+        self._sent_at = {}
+        self._previous = None
+        self._seq = 0
+        self._stop = threading.Event()
+        self._done = threading.Event()
+        self._threads = []
+        self._counts = dict(pushed=0, presented=0, dropped=0, unchanged=0, failed=0, bytes=0)
+        self._latencies = []
+        self._started = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        for target in (self._send_loop, self._ack_loop):
+            thread = threading.Thread(target=target, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def push(self, frame):
+        """Make frame the next one to send; an unsent frame already waiting is dropped"""
+        with self._cond:
+            self._counts["pushed"] += 1
+            if self._back is not None:
+                self._counts["dropped"] += 1
+            self._back = (frame, time.perf_counter())
+            self._cond.notify()
+
+    def stop(self, timeout=ACK_TIMEOUT):
+        """Stop after the frame being sent, wait for outstanding replies, return the stats"""
+        with self._cond:
+            self._stop.set()
+            self._cond.notify()
+        self._threads[0].join()
+        deadline = time.perf_counter() + timeout
+        while self._sent_at and time.perf_counter() < deadline:
+            time.sleep(0.005)
+        elapsed = time.perf_counter() - self._started
+        self._done.set()
+        self._threads[1].join()
+        return self.stats(elapsed)
+
+    def stats(self, elapsed=None):
+        elapsed = elapsed if elapsed is not None else time.perf_counter() - self._started
+        with self._cond:
+            counts = dict(self._counts)
+        rate = counts["bytes"] / elapsed if elapsed else 0.0
+        return StreamStats(
+            elapsed=elapsed,
+            fps=counts["presented"] / elapsed if elapsed else 0.0,
+            utilization=rate / self.link_rate if self.link_rate else None,
+            latency_ms=statistics.median(self._latencies) * 1000 if self._latencies else None,
+            **counts)
+
+    def _send_loop(self):
+        while True:
+            with self._cond:
+                while self._back is None and not self._stop.is_set():
+                    self._cond.wait()
+                if self._back is None:
+                    return
+                frame, pushed_at = self._back
+                self._back = None
+
+            words = to_words(frame, self.size)
+            boxes = dirty_boxes(words, self._previous if self.delta else None)
+            if not boxes:
+                with self._cond:
+                    self._counts["unchanged"] += 1
+                    self._counts["presented"] += 1
+                    self._latencies.append(time.perf_counter() - pushed_at)
+                continue
+
+            # One slot per frame; a frame pushed while waiting replaces this one
+            while not self._slots.acquire(timeout=0.05):
+                if self._stop.is_set():
+                    return
+            with self._cond:
+                if self._back is not None:
+                    self._counts["dropped"] += 1
+                    self._slots.release()
+                    continue
+
+            self._previous = words
+            for index, box in enumerate(boxes):
+                self._seq = (self._seq + 1) & 0xFFFF
+                packet = pack_frame(self._seq, words, box)
+                with self._cond:
+                    # Only the reply to a frame's last packet frees its slot
+                    self._sent_at[self._seq] = (pushed_at, time.perf_counter(), index == len(boxes) - 1)
+                    self._counts["bytes"] += len(packet)
+                self._write(packet)
+
+    def _write(self, packet):
+        if not self.write_chunk:
+            self.ser.write(packet)
+            return
+        for offset in range(0, len(packet), self.write_chunk):
+            self.ser.write(packet[offset:offset + self.write_chunk])
+
+    def _ack_loop(self):
+        buffer = b""
+        while not self._done.is_set():
+            self._expire()
+            chunk = self.ser.read(max(1, self.ser.in_waiting))
+            if not chunk:
+                continue
+            buffer += chunk
+            while True:
+                start = buffer.find(ACK_MAGIC)
+                if start < 0:
+                    buffer = buffer[-1:]
+                    break
+                if len(buffer) - start < ACK.size:
+                    buffer = buffer[start:]
+                    break
+                _, seq, status = ACK.unpack_from(buffer, start)
+                if seq not in self._sent_at or status not in (ACK_OK, ACK_BAD_CRC):
+                    # Log text that happened to contain the magic; skip past it
+                    buffer = buffer[start + 1:]
+                    continue
+                buffer = buffer[start + ACK.size:]
+                self._acked(seq, status)
+
+    def _acked(self, seq, status):
+        with self._cond:
+            if seq not in self._sent_at:
+                return
+            pushed_at, _, last = self._sent_at.pop(seq)
+            if status != ACK_OK:
+                # The badge may have drawn part of it; resend everything next time
+                self._counts["failed"] += 1
+                self._previous = None
+            elif last:
+                self._counts["presented"] += 1
+                self._latencies.append(time.perf_counter() - pushed_at)
+        if last:
+            self._slots.release()
+
+    def _expire(self):
+        """Give up on frames the badge never answered, so a lost reply can't stall the stream"""
+        now = time.perf_counter()
+        with self._cond:
+            expired = [seq for seq, (_, sent_at, _) in self._sent_at.items() if now - sent_at > ACK_TIMEOUT]
+            freed = 0
+            for seq in expired:
+                freed += self._sent_at.pop(seq)[2]
+                self._counts["failed"] += 1
+                self._previous = None
+        for _ in range(freed):
+            self._slots.release()
+
+
+class StandInScreen:
+    """Local stand-in for the badge: a pty that drains at link speed, draws and replies.
+
+    rate is the link's byte rate and pixel_rate how fast the panel takes
+    pixels (an ST7789 on 40 MHz SPI manages about 2.5 million a second).
+    """
+
+    def __init__(self, size=STREAM_SIZE, rate=1_000_000, pixel_rate=2_500_000):
+        import pty
+        import tty
+
+        self.rate = rate
+        self.pixel_rate = pixel_rate
+        self.framebuffer = np.zeros((size[1], size[0]), dtype='>u2')
+        self.frames = 0
+        self.bad = 0
+        self._master, self._slave = pty.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        os.close(self._master)
+        os.close(self._slave)
+
+    def _run(self):
+        buffer = b""
+        clock = time.perf_counter()
+        while not self._stop.is_set():
+            if not select.select([self._master], [], [], 0.05)[0]:
+                clock = time.perf_counter()
+                continue
+            chunk = os.read(self._master, 4096)
+            buffer += chunk
+            clock = self._pace(clock, len(chunk) / self.rate)
+            while True:
+                start = buffer.find(FRAME_MAGIC)
+                if start < 0:
+                    buffer = buffer[-1:]
+                    break
+                if len(buffer) - start < HEADER.size:
+                    break
+                _, seq, x, y, w, h = HEADER.unpack_from(buffer, start)
+                if not w or not h or x + w > self.framebuffer.shape[1] or y + h > self.framebuffer.shape[0]:
+                    buffer = buffer[start + 1:]
+                    continue
+                end = start + HEADER.size + w * h * 2 + 4
+                if len(buffer) < end:
+                    break
+                packet = buffer[start:end - 4]
+                (crc,) = struct.unpack_from("<I", buffer, end - 4)
+                buffer = buffer[end:]
+                if crc == zlib.crc32(packet):
+                    self.framebuffer[y:y + h, x:x + w] = np.frombuffer(
+                        packet, dtype='>u2', offset=HEADER.size).reshape(h, w)
+                    self.frames += 1
+                    status = ACK_OK
+                else:
+                    self.bad += 1
+                    status = ACK_BAD_CRC
+                clock = self._pace(clock, w * h / self.pixel_rate)
+                os.write(self._master, ACK.pack(ACK_MAGIC, seq, status))
+
+    @staticmethod
+    def _pace(clock, seconds):
+        clock += seconds
+        delay = clock - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        return max(clock, time.perf_counter() - 0.01)
+
+
+# --- Scenes for the benchmark and demo ---------------------------------------
+
+def animation_scene(size=STREAM_SIZE):
+    """Full-screen moving gradient: every pixel changes every frame"""
+    w, h = size
+    xs = np.arange(w, dtype=np.int32)[None, :]
+    ys = np.arange(h, dtype=np.int32)[:, None]
+
+    def render(t):
+        phase = int(t * 120)
+        frame = np.empty((h, w, 3), dtype=np.uint8)
+        frame[:, :, 0] = (xs + phase) & 0xFF
+        frame[:, :, 1] = (ys + phase // 2) & 0xFF
+        frame[:, :, 2] = ((xs + ys) // 2 + phase) & 0xFF
+        return frame
+    return render
+
+
+def dashboard_scene(size=STREAM_SIZE):
+    """Static panel with a bar graph and a counter that change each frame"""
+    w, h = size
+    background = np.zeros((h, w, 3), dtype=np.uint8)
+    background[::20, :, 2] = 80
+    background[:, ::20, 2] = 80
+
+    def render(t):
+        frame = background.copy()
+        level = int((np.sin(t * 3) + 1) / 2 * (w - 40))
+        frame[h // 2:h // 2 + 16, 20:20 + level] = (0, 164, 239)
+        # A blocky 16-bit counter: one 8x8 cell per bit
+        value = int(t * 30) & 0xFFFF
+        for bit in range(16):
+            if value >> bit & 1:
+                frame[20:28, 20 + bit * 10:28 + bit * 10] = (255, 255, 255)
+        return frame
+    return render
+
+
+SCENES = {"animation": animation_scene, "dashboard": dashboard_scene}
+
+
+def run_scene(streamer, render, fps, seconds):
+    """Push frames at fps for seconds; returns the streamer's stats"""
+    streamer.start()
+    start = time.perf_counter()
+    tick = 0
+    while True:
+        now = time.perf_counter() - start
+        if now >= seconds:
+            break
+        streamer.push(render(now))
+        tick += 1
+        delay = tick / fps - (time.perf_counter() - start)
+        if delay > 0:
+            time.sleep(delay)
+    return streamer.stop()
+
+
+def benchmark(rate, seconds, fps):
+    import serial
+
+    full_frame = HEADER.size + STREAM_SIZE[0] * STREAM_SIZE[1] * 2 + 4
+    print(f"Stand-in link {rate / 1000:.0f} KB/s, producer {fps} fps, {seconds:.0f} s per run")
+    print(f"A full frame is {full_frame / 1024:.0f} KB: at most {rate / full_frame:.1f} fps on this link\n")
+    print(f"{'scene':<10} {'mode':<6} {'pushed':>6} {'shown':>6} {'dropped':>7} {'fps':>6} "
+          f"{'KB/frame':>8} {'link':>5} {'latency':>8}")
+    for name, scene in SCENES.items():
+        for delta in (False, True):
+            screen = StandInScreen(rate=rate)
+            ser = serial.Serial(screen.port, timeout=0.05)
+            stats = run_scene(FrameStreamer(ser, link_rate=rate, delta=delta), scene(), fps, seconds)
+            ser.close()
+            screen.close()
+            sent = max(1, stats.presented - stats.unchanged)
+            latency = f"{stats.latency_ms:.0f}ms" if stats.latency_ms is not None else "-"
+            print(f"{name:<10} {'delta' if delta else 'full':<6} {stats.pushed:>6} {stats.presented:>6} "
+                  f"{stats.dropped:>7} {stats.fps:>6.1f} {stats.bytes / sent / 1024:>8.1f} "
+                  f"{stats.utilization:>5.0%} {latency:>8}")
+            if stats.failed or screen.bad:
+                print(f"  ✗ {stats.failed} frame(s) failed, {screen.bad} bad CRC at the stand-in")
+    return 0
+
+
+def demo(port, fps):
+    import serial
+
+    from badge_link_profile import load_profile
+    from badge_ports import MAIN, find_port
+
+    port = port or find_port(MAIN)
+    if not port:
+        print("✗ No badge found on USB")
+        return 1
+    profile = load_profile(port)
+    # Set DTR/RTS before opening so the port never pulses them (a pulse can reset the badge)
+    ser = serial.Serial()
+    ser.port = port
+    ser.baudrate = profile.baudrate
+    ser.timeout = 0.05
+    ser.dtr = True
+    ser.rts = True
+    ser.open()
+    print(f"Streaming to {port} at up to {fps} fps (Ctrl+C to stop)...")
+    streamer = FrameStreamer(ser, link_rate=profile.link_rate, write_chunk=profile.write_chunk)
+    try:
+        run_scene(streamer, dashboard_scene(), fps, float("inf"))
+    except KeyboardInterrupt:
+        pass
+    stats = streamer.stop()
+    ser.close()
+    utilization = f"{stats.utilization:.0%}" if stats.utilization is not None else "?"
+    print(f"✓ {stats.presented} frames in {stats.elapsed:.1f} s ({stats.fps:.1f} fps), "
+          f"{stats.dropped} dropped, link {utilization} busy")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream live frames to the badge display")
+    parser.add_argument("--bench", action="store_true", help="Benchmark against a local stand-in device")
+    parser.add_argument("--demo", action="store_true", help="Stream a demo dashboard to the badge")
+    parser.add_argument("--port", help="Serial port for --demo (default: main processor)")
+    parser.add_argument("--rate", type=int, default=1_000_000, help="Stand-in link rate in bytes/s")
+    parser.add_argument("--seconds", type=float, default=3.0, help="Length of each benchmark run")
+    parser.add_argument("--fps", type=int, default=30, help="Frames pushed per second")
+    args = parser.parse_args()
+
+    if args.bench:
+        return benchmark(args.rate, args.seconds, args.fps)
+    if args.demo:
+        return demo(args.port, args.fps)
+    parser.print_help()
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
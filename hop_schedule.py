@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Adaptive Channel-Hop Schedule Generator
+
+The sniffer spends CHANNEL_HOP_INTERVAL_MS (200 ms) on every channel from
+START_CHANNEL to END_CHANNEL, as long on an empty channel 13 as on a packed
+channel 6. This builds a weighted schedule from what the badge has seen and
+keeps the cycle the same length, so the radio time does not change.
+
+Observations are the badge's uploads (the JSON from generateJSON: channel,
+first_seen, last_seen and frame_count per network). When there are no
+uploads to hand, the same records are derived by running the current hopper
+over a capture. Per channel they give:
+    resident  networks heard during the first cycle
+    arrivals  networks first heard later, per second (hotspots coming and going)
+    q         share of expected beacons actually received (frame_count over
+              beacons sent while the hopper was on the channel)
+
+A network whose beacons get through with probability q (measured per
+network) is heard within a minute with probability 1-(1-q)^b, b being the
+beacons it sends while the hopper is on its channel: 60 s times the
+channel's share of the cycle, over the 102.4 ms beacon interval. Summed
+over the networks on a channel, weighted by how long each was around, that
+is concave in the channel's dwell. So handing out the cycle in 10 ms steps
+to whichever channel gains the most networks per minute is optimal. Every
+channel keeps at least --min-dwell so new networks on quiet channels are
+still found.
+
+The schedule is then replayed against held-out traffic (another synthetic
+hall, or the second half of a capture) next to the uniform one. The tool
+reports networks heard per minute, networks found at all and time to first
+hear. --emit writes include/hop_schedule.h for the firmware.
+
+Usage:
+    python3 hop_schedule.py                                  # synthetic hall
+    python3 hop_schedule.py --observations upload1.json upload2.json --pcap hall.pcap
+    python3 hop_schedule.py --pcap hall.pcap --emit          # write include/hop_schedule.h
+"""
+
+import argparse
+import json
+import pathlib
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+from sniffer_sim import BEACON_INTERVAL, SENSITIVITY, hop_config, read_pcap, synthetic_hall
+
+HEADER_PATH = pathlib.Path(__file__).resolve().parent / "include" / "hop_schedule.h"
+STEP_MS = 10
+MIN_DWELL_MS = 60
+WINDOW = 60.0
+
+ChannelStats = namedtuple("ChannelStats", "channel resident arrivals q networks")
+Replay = namedtuple("Replay", "per_minute found median_delay")
+
+
+def uniform_schedule(channels, dwell):
+    return [(channel, int(round(dwell * 1000))) for channel in channels]
+
+
+def tuned_channels(times, schedule):
+    """Channel the hopper is on at each time, cycling through [(channel, dwell_ms)]"""
+    ends = np.cumsum([dwell for _, dwell in schedule]) / 1000
+    position = np.asarray(times) % ends[-1]
+    slot = np.searchsorted(ends, position, side="right")
+    return np.asarray([channel for channel, _ in schedule])[slot]
+
+
+def received(beacons, seed=0):
+    """Beacons a badge radio actually decodes.
+
+    Weak signals fade out over the last 15 dB above sensitivity, and each
+    other access point on the channel collides with some beacons.
+    """
+    rng = np.random.default_rng(seed)
+    rssi = np.array([b.rssi for b in beacons], dtype=float)
+    channels = np.array([b.channel for b in beacons])
+    crowding = {}
+    for beacon in beacons:
+        crowding.setdefault(beacon.channel, set()).add(beacon.bssid)
+    others = np.array([len(crowding[c]) - 1 for c in channels])
+    chance = np.clip((rssi - SENSITIVITY) / 15, 0, 1) * np.clip(1 - 0.006 * others, 0.2, 1)
+    return [beacon for beacon, keep in zip(beacons, (rng.random(len(beacons)) < chance).tolist()) if keep]
+
+
+def observe(beacons, schedule):
+    """What the badge would upload after hopping with schedule: one record per network"""
+    heard = tuned_channels([b.time for b in beacons], schedule) == np.array([b.channel for b in beacons])
+    networks = {}
+    for beacon, keep in zip(beacons, heard.tolist()):
+        if not keep:
+            continue
+        record = networks.setdefault(beacon.bssid, {
+            "bssid": beacon.bssid.hex(":").upper(), "ssid": beacon.ssid, "channel": beacon.channel,
+            "first_seen": int(beacon.time * 1000), "frame_count": 0})
+        record["last_seen"] = int(beacon.time * 1000)
+        record["frame_count"] += 1
+    return list(networks.values())
+
+
+def load_observations(paths):
+    """Network records from badge uploads; first_seen/last_seen stay in the badge's milliseconds"""
+    networks = []
+    for path in paths:
+        networks.extend(json.loads(pathlib.Path(path).read_text())["networks"])
+    return networks
+
+
+def channel_stats(networks, schedule):
+    """ChannelStats per channel, given the schedule the badge was hopping with when it saw them.
+
+    networks holds (q, presence) per network: its share of beacons received
+    and the share of the observation it was around for.
+    """
+    cycle = sum(dwell for _, dwell in schedule) / 1000
+    dwell = {channel: ms / 1000 for channel, ms in schedule}
+    start = min(n["first_seen"] for n in networks) / 1000
+    end = max(n.get("last_seen", n["first_seen"]) for n in networks) / 1000
+    duration = max(end - start, cycle)
+
+    stats = []
+    for channel in dwell:
+        on_channel = [n for n in networks if n["channel"] == channel]
+        resident = sum(n["first_seen"] / 1000 - start < cycle for n in on_channel)
+        arrivals = (len(on_channel) - resident) / duration
+        measured = []
+        for n in on_channel:
+            seen_for = (n.get("last_seen", n["first_seen"]) - n["first_seen"]) / 1000
+            listened = seen_for * dwell[channel] / cycle
+            q = min(1.0, n["frame_count"] / (listened / BEACON_INTERVAL)) if listened >= BEACON_INTERVAL else None
+            measured.append((q, min(1.0, (seen_for + WINDOW) / duration)))
+        known = [q for q, _ in measured if q is not None]
+        median = float(np.median(known)) if known else 0.5
+        stats.append(ChannelStats(channel, resident, arrivals, median,
+                                  [(max(0.02, median if q is None else q), presence) for q, presence in measured]))
+    return stats
+
+
+def heard_per_minute(networks, share):
+    """Expected networks heard in a minute on a channel the hopper is on for `share` of the time"""
+    beacons = WINDOW * share / BEACON_INTERVAL
+    return sum(presence * (1 - (1 - q) ** beacons) for q, presence in networks)
+
+
+def weighted_schedule(stats, cycle_ms, min_dwell=MIN_DWELL_MS, step=STEP_MS):
+    """[(channel, dwell_ms)] of the same cycle length, hearing the most networks per minute"""
+    if min_dwell * len(stats) > cycle_ms:
+        raise ValueError(f"--min-dwell {min_dwell} ms on {len(stats)} channels exceeds the {cycle_ms} ms cycle")
+    # An empty channel still counts as a weak prospect, so it keeps its minimum
+    networks = {s.channel: s.networks or [(s.q, 0.05)] for s in stats}
+    dwell = {s.channel: min_dwell for s in stats}
+
+    def gain(channel):
+        return (heard_per_minute(networks[channel], (dwell[channel] + step) / cycle_ms)
+                - heard_per_minute(networks[channel], dwell[channel] / cycle_ms))
+
+    spare = cycle_ms - min_dwell * len(stats)
+    while spare >= step:
+        best = max(dwell, key=gain)
+        if gain(best) <= 1e-9:
+            break
+        dwell[best] += step
+        spare -= step
+    # Every channel already hears all it can: share out what is left evenly
+    even = spare // len(dwell) // step * step
+    for channel in dwell:
+        dwell[channel] += even
+    dwell[max(dwell, key=lambda c: len(networks[c]))] += spare - even * len(dwell)
+    return [(s.channel, dwell[s.channel]) for s in stats]
+
+
+def replay(beacons, schedule):
+    """Replay with distinct networks heard per minute, networks found, median ms to first hear"""
+    heard = tuned_channels([b.time for b in beacons], schedule) == np.array([b.channel for b in beacons])
+    sent_first = {}
+    heard_first = {}
+    windows = {}
+    for beacon, keep in zip(beacons, heard.tolist()):
+        sent_first.setdefault(beacon.bssid, beacon.time)
+        if keep:
+            heard_first.setdefault(beacon.bssid, beacon.time)
+            windows.setdefault(int(beacon.time // WINDOW), set()).add(beacon.bssid)
+    # Only whole minutes count
+    end = beacons[-1].time
+    full = [len(seen) for minute, seen in windows.items() if (minute + 1) * WINDOW <= end] \
+        or [len(seen) for seen in windows.values()]
+    delays = [heard_first[b] - sent_first[b] for b in heard_first]
+    return Replay(float(np.mean(full)), len(heard_first), float(np.median(delays)) * 1000 if delays else 0.0)
+
+
+def emit_header(schedule, source):
+    lines = [
+        "#ifndef HOP_SCHEDULE_H",
+        "#define HOP_SCHEDULE_H",
+        "",
+        "#include <stdint.h>",
+        "",
+        f"// Generated by hop_schedule.py from {source}; do not edit.",
+        "// Not consumed yet: there is no WiFiSniffer implementation in this tree,",
+        "// so nothing reads this table. A hopper built on it would stay dwell_ms",
+        "// on each slot's channel in place of a fixed CHANNEL_HOP_INTERVAL_MS.",
+        "",
+        "struct HopSlot {",
+        "    uint8_t channel;",
+        "    uint16_t dwell_ms;",
+        "};",
+        "",
+        "static const HopSlot HOP_SCHEDULE[] = {",
+    ]
+    lines += [f"    {{{channel}, {dwell}}}," for channel, dwell in schedule]
+    lines += [
+        "};",
+        "",
+        f"#define HOP_SCHEDULE_SLOTS {len(schedule)}",
+        f"#define HOP_SCHEDULE_CYCLE_MS {sum(dwell for _, dwell in schedule)}",
+        "",
+        "#endif // HOP_SCHEDULE_H",
+        "",
+    ]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a weighted channel-hop schedule from badge observations")
+    parser.add_argument("--observations", nargs="+", help="Badge upload JSON files (default: derived from traffic)")
+    parser.add_argument("--pcap", help="Recorded traffic; first half trains, second half tests")
+    parser.add_argument("--aps", type=int, default=300, help="Access points in the synthetic hall")
+    parser.add_argument("--seconds", type=float, default=300.0, help="Length of each synthetic hall")
+    parser.add_argument("--seed", type=int, default=1, help="Training hall; the test hall uses seed + 1")
+    parser.add_argument("--min-dwell", type=int, default=MIN_DWELL_MS, help="Least time on any channel, ms")
+    parser.add_argument("--emit", nargs="?", const=str(HEADER_PATH), help="Write the schedule as a C++ header")
+    args = parser.parse_args()
+
+    channels, dwell = hop_config()
+    uniform = uniform_schedule(channels, dwell)
+    cycle_ms = sum(ms for _, ms in uniform)
+
+    if args.pcap:
+        # A real capture has its losses already
+        beacons = read_pcap(args.pcap)
+        if not beacons:
+            print(f"✗ No beacons in {args.pcap}")
+            return 1
+        middle = beacons[-1].time / 2
+        train = [b for b in beacons if b.time < middle]
+        test = [b._replace(time=b.time - middle) for b in beacons if b.time >= middle]
+        source = args.pcap
+    else:
+        train = received(synthetic_hall(args.aps, args.seconds, seed=args.seed), seed=args.seed)
+        test = received(synthetic_hall(args.aps, args.seconds, seed=args.seed + 1), seed=args.seed + 1)
+        source = f"a synthetic {args.aps}-AP hall"
+
+    if args.observations:
+        networks = load_observations(args.observations)
+        source = ", ".join(pathlib.Path(p).name for p in args.observations)
+    else:
+        networks = observe(train, uniform)
+    if not networks:
+        print("✗ No networks observed")
+        return 1
+
+    try:
+        schedule = weighted_schedule(channel_stats(networks, uniform), cycle_ms, args.min_dwell)
+    except ValueError as e:
+        print(f"✗ {e}")
+        return 1
+    stats = {s.channel: s for s in channel_stats(networks, uniform)}
+    print(f"{len(networks)} networks observed ({source}); cycle {cycle_ms} ms\n")
+    print(f"{'ch':>3} {'resident':>8} {'new/min':>7} {'q':>5} {'uniform':>8} {'weighted':>8}")
+    for (channel, ms), (_, uniform_ms) in zip(schedule, uniform):
+        s = stats[channel]
+        print(f"{channel:>3} {s.resident:>8} {s.arrivals * 60:>7.1f} {s.q:>5.2f} {uniform_ms:>6}ms {ms:>6}ms")
+
+    before = replay(test, uniform)
+    after = replay(test, schedule)
+    print(f"\nReplay on held-out traffic ({len(test)} beacons):")
+    print(f"{'':<10} {'per minute':>10} {'found':>6} {'first heard':>11}")
+    for name, r in (("uniform", before), ("weighted", after)):
+        print(f"{name:<10} {r.per_minute:>10.1f} {r.found:>6} {r.median_delay:>9.0f}ms")
+    print(f"networks per minute {after.per_minute / before.per_minute - 1:+.1%}, same radio time")
+
+    if args.emit:
+        pathlib.Path(args.emit).write_text(emit_header(schedule, source))
+        print(f"✓ Wrote {args.emit}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
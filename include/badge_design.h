@@ -0,0 +1,84 @@
+// Compiled for 240x320 from MVP Security Badge: 36 primitives from 54 source shapes (18 collinear segments merged)
+// Generated by scripts/compile_design.py - do not edit
+#ifndef BADGE_DESIGN_H
+#define BADGE_DESIGN_H
+
+#include <stdint.h>
+
+#define BADGE_DESIGN_WIDTH 240
+#define BADGE_DESIGN_HEIGHT 320
+
+enum DesignOp : uint8_t {
+    DESIGN_LINE,         // x1, y1, x2, y2
+    DESIGN_CIRCLE,       // x, y, r
+    DESIGN_FILL_CIRCLE,  // x, y, r
+    DESIGN_RECT,         // x, y, w, h
+    DESIGN_FILL_RECT,    // x, y, w, h
+};
+
+struct DesignShape {
+    DesignOp op;
+    int16_t a, b, c, d;
+};
+
+struct DesignText {
+    const char *text;
+    int16_t x, y;
+    uint8_t font;  // TFT_eSPI built-in font number
+};
+
+static const DesignShape BADGE_DESIGN[] = {
+    // Main shield outline
+    {DESIGN_LINE, 194, 165, 194, 81},
+    {DESIGN_LINE, 194, 81, 120, 53},
+    {DESIGN_LINE, 120, 53, 45, 81},
+    {DESIGN_LINE, 45, 81, 45, 165},
+    // Bottom curves
+    {DESIGN_LINE, 45, 165, 184, 234},
+    {DESIGN_LINE, 194, 165, 55, 234},
+    // Circuit traces - vertical
+    {DESIGN_LINE, 69, 88, 69, 193},
+    {DESIGN_LINE, 97, 95, 97, 206},
+    {DESIGN_LINE, 142, 95, 142, 206},
+    {DESIGN_LINE, 170, 88, 170, 193},
+    // Circuit traces - horizontal
+    {DESIGN_LINE, 62, 109, 177, 109},
+    {DESIGN_LINE, 66, 130, 173, 130},
+    {DESIGN_LINE, 69, 172, 170, 172},
+    // Circuit pads
+    {DESIGN_FILL_CIRCLE, 69, 109, 1, 0},
+    {DESIGN_FILL_CIRCLE, 83, 109, 1, 0},
+    {DESIGN_FILL_CIRCLE, 156, 109, 1, 0},
+    {DESIGN_FILL_CIRCLE, 170, 109, 1, 0},
+    // Central lock
+    {DESIGN_RECT, 111, 140, 17, 21},
+    {DESIGN_CIRCLE, 120, 136, 5, 0},
+    {DESIGN_LINE, 114, 136, 114, 140},
+    {DESIGN_LINE, 125, 136, 125, 140},
+    // Keyhole
+    {DESIGN_FILL_CIRCLE, 120, 149, 2, 0},
+    {DESIGN_FILL_RECT, 118, 149, 3, 6},
+    // Unlocked key
+    {DESIGN_CIRCLE, 146, 151, 2, 0},
+    {DESIGN_LINE, 148, 151, 156, 151},
+    // Corner circuit elements
+    {DESIGN_FILL_CIRCLE, 62, 95, 2, 0},
+    {DESIGN_FILL_CIRCLE, 177, 95, 2, 0},
+    // Diagonal circuit traces
+    {DESIGN_LINE, 62, 95, 69, 109},
+    {DESIGN_LINE, 177, 95, 170, 109},
+    // Top antenna
+    {DESIGN_FILL_CIRCLE, 120, 53, 2, 0},
+    {DESIGN_LINE, 120, 56, 120, 60},
+    // Side connection points
+    {DESIGN_FILL_CIRCLE, 194, 123, 2, 0},
+    {DESIGN_FILL_CIRCLE, 45, 123, 2, 0},
+};
+
+static const DesignText BADGE_DESIGN_TEXT[] = {
+    {"MVP SUMMIT", 120, 220, 4},
+    {"2026", 120, 234, 4},
+    {"01010011 01000101 01000011", 120, 245, 1},
+};
+
+#endif // BADGE_DESIGN_H
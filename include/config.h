@@ -20,7 +20,7 @@
 
 // WiFi Sniffer Configuration
 #define MAX_NETWORKS 100
-#define CHANNEL_HOP_INTERVAL_MS 200  // Time on each channel
+#define CHANNEL_HOP_INTERVAL_MS 200  // Time on each channel (uniform; hop_schedule.h's weighted table isn't used yet)
 #define SCAN_ALL_CHANNELS true
 #define START_CHANNEL 1
 #define END_CHANNEL 13  // 14 for Japan
@@ -0,0 +1,134 @@
+#ifndef FRAME_STREAM_H
+#define FRAME_STREAM_H
+
+#include <Arduino.h>
+#include <TFT_eSPI.h>
+
+// Receives frames streamed over USB serial by frame_stream.py and draws them.
+//
+// Packet: ESC 'F', uint16 seq, x, y, w, h (little-endian), then w*h RGB565
+// pixels (big-endian, as in FWI files), then a CRC32 of everything before it.
+// Rows go to the panel as soon as they arrive, so no frame buffer is needed.
+// Each packet is answered with ESC 'K', uint16 seq, uint8 status (0 drawn,
+// 1 bad CRC); after a bad CRC the host resends the whole screen.
+//
+// Other ESC commands with a one-byte argument (ESC 'T' mask for telemetry)
+// share the port and go to the handler registered with onCommand().
+
+#define FRAME_STREAM_MAX_WIDTH 320
+#define FRAME_STREAM_IDLE_MS 2000
+
+class FrameStreamReceiver {
+public:
+    FrameStreamReceiver(TFT_eSPI* tft) : tft(tft) {}
+
+    void begin() {
+        // Pixels arrive most significant byte first
+        tft->setSwapBytes(true);
+    }
+
+    void onCommand(uint8_t letter, void (*handler)(uint8_t)) {
+        commandLetter = letter;
+        commandHandler = handler;
+    }
+
+    // Call from loop(). Returns true while frames are arriving, so the
+    // caller can leave the screen alone.
+    bool poll() {
+        while (Serial.available()) {
+            feed(Serial.read());
+        }
+        return lastPacket && millis() - lastPacket < FRAME_STREAM_IDLE_MS;
+    }
+
+private:
+    enum State { HUNT, MAGIC, HEADER, PIXELS, CHECK, COMMAND };
+
+    TFT_eSPI* tft;
+    State state = HUNT;
+    uint8_t header[10];
+    uint8_t row[FRAME_STREAM_MAX_WIDTH * 2];
+    uint16_t seq, x, y, w, h, line;
+    uint32_t count, crc, received;
+    unsigned long lastPacket = 0;
+    uint8_t commandLetter = 0;
+    void (*commandHandler)(uint8_t) = nullptr;
+
+    static uint16_t u16(const uint8_t* p) { return p[0] | (p[1] << 8); }
+
+    void crcByte(uint8_t b) {
+        crc ^= b;
+        for (int i = 0; i < 8; i++) {
+            crc = (crc >> 1) ^ (0xEDB88320 & -(crc & 1));
+        }
+    }
+
+    void feed(uint8_t b) {
+        switch (state) {
+            case HUNT:
+                if (b == 0x1B) state = MAGIC;
+                break;
+            case MAGIC:
+                if (commandHandler && b == commandLetter) {
+                    state = COMMAND;
+                    break;
+                }
+                if (b != 'F') {
+                    state = (b == 0x1B) ? MAGIC : HUNT;
+                    break;
+                }
+                crc = 0xFFFFFFFF;
+                crcByte(0x1B);
+                crcByte('F');
+                count = 0;
+                state = HEADER;
+                break;
+            case HEADER:
+                crcByte(b);
+                header[count++] = b;
+                if (count < sizeof(header)) break;
+                seq = u16(header);
+                x = u16(header + 2);
+                y = u16(header + 4);
+                w = u16(header + 6);
+                h = u16(header + 8);
+                if (w == 0 || h == 0 || w > FRAME_STREAM_MAX_WIDTH) {
+                    state = HUNT;
+                    break;
+                }
+                count = 0;
+                line = 0;
+                state = PIXELS;
+                break;
+            case PIXELS:
+                crcByte(b);
+                row[count++] = b;
+                if (count < (uint32_t)w * 2) break;
+                tft->pushImage(x, y + line, w, 1, (uint16_t*)row);
+                count = 0;
+                if (++line == h) {
+                    received = 0;
+                    state = CHECK;
+                }
+                break;
+            case CHECK:
+                received |= (uint32_t)b << (8 * count);
+                if (++count < 4) break;
+                reply(received == ~crc ? 0 : 1);
+                lastPacket = millis();
+                state = HUNT;
+                break;
+            case COMMAND:
+                commandHandler(b);
+                state = HUNT;
+                break;
+        }
+    }
+
+    void reply(uint8_t status) {
+        uint8_t ack[5] = {0x1B, 'K', (uint8_t)(seq & 0xFF), (uint8_t)(seq >> 8), status};
+        Serial.write(ack, sizeof(ack));
+    }
+};
+
+#endif // FRAME_STREAM_H
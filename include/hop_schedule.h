@@ -0,0 +1,35 @@
+#ifndef HOP_SCHEDULE_H
+#define HOP_SCHEDULE_H
+
+#include <stdint.h>
+
+// Generated by hop_schedule.py from a synthetic 300-AP hall; do not edit.
+// Not consumed yet: there is no WiFiSniffer implementation in this tree,
+// so nothing reads this table. A hopper built on it would stay dwell_ms
+// on each slot's channel in place of a fixed CHANNEL_HOP_INTERVAL_MS.
+
+struct HopSlot {
+    uint8_t channel;
+    uint16_t dwell_ms;
+};
+
+static const HopSlot HOP_SCHEDULE[] = {
+    {1, 440},
+    {2, 130},
+    {3, 150},
+    {4, 60},
+    {5, 60},
+    {6, 380},
+    {7, 250},
+    {8, 130},
+    {9, 150},
+    {10, 170},
+    {11, 510},
+    {12, 70},
+    {13, 100},
+};
+
+#define HOP_SCHEDULE_SLOTS 13
+#define HOP_SCHEDULE_CYCLE_MS 2600
+
+#endif // HOP_SCHEDULE_H
@@ -0,0 +1,67 @@
+#ifndef TELEMETRY_H
+#define TELEMETRY_H
+
+#include <Arduino.h>
+
+// Answers telemetry queries from telemetry.py.
+//
+// Query: ESC 'T', uint8 field mask (arrives through FrameStreamReceiver).
+// Reply: ESC 't', the mask, one float32 per requested field in bit order
+// (little-endian), then a CRC32 of everything before it. This board has no
+// humidity or pressure sensor; those go out as NaN and the host stops
+// asking for them.
+
+#define TELEMETRY_BATTERY 0x01
+#define TELEMETRY_TEMPERATURE 0x02
+#define TELEMETRY_HUMIDITY 0x04
+#define TELEMETRY_PRESSURE 0x08
+
+class Telemetry {
+public:
+    Telemetry(float (*readBattery)()) : readBattery(readBattery) {}
+
+    void answer(uint8_t mask) {
+        uint8_t reply[3 + 4 * 4 + 4];
+        size_t length = 0;
+        reply[length++] = 0x1B;
+        reply[length++] = 't';
+        reply[length++] = mask;
+        for (uint8_t bit = TELEMETRY_BATTERY; bit <= TELEMETRY_PRESSURE; bit <<= 1) {
+            if (!(mask & bit)) continue;
+            float value = read(bit);
+            memcpy(reply + length, &value, sizeof(value));
+            length += sizeof(value);
+        }
+        uint32_t crc = crc32(reply, length);
+        memcpy(reply + length, &crc, sizeof(crc));
+        Serial.write(reply, length + sizeof(crc));
+    }
+
+private:
+    float (*readBattery)();
+
+    float read(uint8_t bit) {
+        switch (bit) {
+            case TELEMETRY_BATTERY:
+                return readBattery();
+            case TELEMETRY_TEMPERATURE:
+                // The RP2350's on-die sensor
+                return analogReadTemp();
+            default:
+                return NAN;
+        }
+    }
+
+    static uint32_t crc32(const uint8_t* data, size_t length) {
+        uint32_t crc = 0xFFFFFFFF;
+        for (size_t i = 0; i < length; i++) {
+            crc ^= data[i];
+            for (int k = 0; k < 8; k++) {
+                crc = (crc >> 1) ^ (0xEDB88320 & -(crc & 1));
+            }
+        }
+        return ~crc;
+    }
+};
+
+#endif // TELEMETRY_H
@@ -4,6 +4,7 @@
 #include <Arduino.h>
 #include <esp_wifi.h>
 #include <esp_wifi_types.h>
+#include "hop_schedule.h"
 
 // WiFi Network Structure
 struct WiFiNetwork {
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Streamed playback of long audio
+
+play_audio_file can only start once a whole file is on the badge, so the
+presenter trims uploads to 3 seconds. AudioStream plays clips of any length
+by splitting them into segments. The badge keeps a double buffer of two
+files, stream_a.wav and stream_b.wav in /sounds. While one segment plays,
+the next is sent into the other file. It is started the moment the playing
+one ends, then the file that just finished takes the segment after that.
+
+The first segment is short (FIRST_SEGMENT), so sound starts after one small
+transfer. Each later segment is as long as the link can deliver during the
+segment playing before it. That length is measured from each transfer,
+with SAFETY headroom, and capped at MAX_SEGMENT. A segment file is also
+never larger than one upload chunk (CHUNK_SIZE), so a display click waits
+behind at most one chunk, as it does for chunked uploads. With a link
+several times faster than the audio rate, segments soon reach the cap and
+playback is gapless. With a slower link each segment still plays, just
+late. The result reports how late.
+
+Segment edges fall on sample boundaries (ADPCM block boundaries for ADPCM),
+so the segments join without clicks. A tail shorter than FIRST_SEGMENT is
+sent with the segment before it rather than on its own.
+
+Usage:
+    python audio_stream.py --bench [--seconds 60] [--kbps 40]   # against a stand-in badge
+"""
+import argparse
+import pathlib
+import sys
+import tempfile
+import time
+from collections import namedtuple
+
+from audio_transcode import (ADPCM_BLOCK_ALIGN, BADGE_CODECS, _adpcm_samples_per_block, bytes_per_second,
+                             pick_format, read_wav, resample, to_mono, wav_bytes)
+from chunked_upload import CHUNK_SIZE
+from jobs import INTERACTIVE, DeviceLock
+
+FIRST_SEGMENT = 0.5
+MAX_SEGMENT = 8.0
+# Share of a segment's play time the next segment's transfer may take
+SAFETY = 0.6
+# Room for the WAV header (ADPCM's fmt and fact chunks included) within CHUNK_SIZE
+WAV_HEADER = 64
+# Assumed link rate in bytes/s until the first transfer is measured
+LINK_RATE = 30 * 1024
+SLOTS = ("stream_a.wav", "stream_b.wav")
+
+Segment = namedtuple("Segment", "index slot start duration size sent")
+StreamResult = namedtuple("StreamResult", "format duration segments first_sound late")
+
+
+def max_segment(fmt):
+    """Longest segment (seconds): MAX_SEGMENT, or less if its file would not fit in one CHUNK_SIZE transfer"""
+    return min(MAX_SEGMENT, (CHUNK_SIZE - WAV_HEADER) / bytes_per_second(fmt))
+
+
+def segment_length(playing, link_rate, fmt):
+    """Longest segment (seconds) whose transfer fits in SAFETY of the playing segment's time"""
+    return min(max_segment(fmt), max(FIRST_SEGMENT, playing * SAFETY * link_rate / bytes_per_second(fmt)))
+
+
+class AudioStream:
+    """Plays a WAV file of any length on the badge through a two-file double buffer.
+
+    on_status(text) and progress(played, total) report as segments start;
+    check() runs between segments and may raise to stop.
+    """
+
+    def __init__(self, device, device_lock=None, codecs=BADGE_CODECS, min_rate=8000,
+                 workdir=None, on_status=None):
+        self.device = device
+        self.device_lock = device_lock or DeviceLock()
+        self.fmt = pick_format(codecs, min_rate)
+        # Segment files go here; without one, each play() uses a temporary directory it removes
+        self.workdir = pathlib.Path(workdir) if workdir else None
+        self.on_status = on_status or (lambda text: None)
+        self.link_rate = LINK_RATE
+
+    def play(self, path, check=None, progress=None):
+        if self.workdir:
+            return self._play(path, self.workdir, check, progress)
+        with tempfile.TemporaryDirectory(prefix="audio_stream_") as workdir:
+            return self._play(path, pathlib.Path(workdir), check, progress)
+
+    def _play(self, path, workdir, check, progress):
+        fmt = self.fmt
+        samples, rate = read_wav(path)
+        mono = resample(to_mono(samples), rate, fmt.rate)
+        total = len(mono) / fmt.rate
+        align = _adpcm_samples_per_block(ADPCM_BLOCK_ALIGN[fmt.rate]) if fmt.codec == "adpcm" else 1
+        longest = int(max_segment(fmt) * fmt.rate) // align * align
+        shortest = int(FIRST_SEGMENT * fmt.rate)
+
+        start = time.perf_counter()
+        segments = []
+        late = []
+        first_sound = None
+        position = 0
+        length = FIRST_SEGMENT
+        ends_at = None
+        play_latency = 0.0
+
+        while position < len(mono):
+            if check:
+                check()
+            count = max(align, min(longest, int(length * fmt.rate) // align * align))
+            tail = len(mono) - position - count
+            if 0 < tail < shortest:
+                # Take a short tail along, or split what is left in two if it won't fit in one chunk
+                count = count + tail if count + tail <= longest else (count + tail) // 2 // align * align
+            chunk = mono[position:position + count]
+            slot = SLOTS[len(segments) % len(SLOTS)]
+            local = workdir / slot
+            local.write_bytes(wav_bytes(chunk, fmt))
+
+            # Send into the free half of the double buffer while the other half plays
+            sent = time.perf_counter()
+            with self.device_lock:
+                result = self.device.send_file(local, f"/sounds/{slot}", None)
+            sent = time.perf_counter() - sent
+            if result.is_err():
+                raise RuntimeError(f"segment {len(segments) + 1} upload failed: {result.unwrap_err()}")
+            size = local.stat().st_size
+            self.link_rate = size / max(sent, 1e-6)
+
+            # Start it when the playing segment ends, early by the play command's own latency
+            if ends_at is not None:
+                wait = ends_at - play_latency - time.perf_counter()
+                if wait > 0:
+                    time.sleep(wait)
+            issued = time.perf_counter()
+            self.device_lock.acquire(INTERACTIVE)
+            try:
+                result = self.device.play_audio_file(slot)
+            finally:
+                self.device_lock.release()
+            playing = time.perf_counter()
+            play_latency = playing - issued
+            if result.is_err():
+                raise RuntimeError(f"segment {len(segments) + 1} did not play: {result.unwrap_err()}")
+
+            duration = len(chunk) / fmt.rate
+            if ends_at is None:
+                first_sound = playing - start
+            else:
+                late.append(max(0.0, playing - ends_at))
+            ends_at = playing + duration
+            segments.append(Segment(len(segments), slot, position / fmt.rate, duration, size, sent))
+            position += len(chunk)
+
+            length = segment_length(duration, self.link_rate, fmt)
+            self.on_status(f"Streaming {position / fmt.rate:.0f}/{total:.0f}s "
+                           f"({self.link_rate / 1024:.0f} KB/s, next {length:.1f}s)")
+            if progress:
+                progress(position / fmt.rate, total)
+
+        # The call returns when the last segment starts; wait for it to finish
+        if ends_at is not None:
+            time.sleep(max(0.0, ends_at - time.perf_counter()))
+        return StreamResult(fmt, total, segments, first_sound, late)
+
+
+def describe(result):
+    """One-line summary such as '60.0s in 14 segments, first sound after 0.15s, no gaps'"""
+    text = (f"{result.duration:.1f}s in {len(result.segments)} segments, "
+            f"first sound after {result.first_sound:.2f}s")
+    gaps = [gap for gap in result.late if gap > 0.005]
+    if not gaps:
+        return text + ", no gaps"
+    return text + f", {len(gaps)} gaps (longest {max(gaps) * 1000:.0f} ms)"
+
+
+def benchmark(seconds, kbps):
+    """Stream a generated clip to a throttled stand-in badge and compare with a whole-file upload"""
+    import wave
+
+    import numpy as np
+
+    from badge_session import AUDIO_MIN_RATE, BADGE_AUDIO_CODECS
+    from upload_harness import StandInBadge
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = pathlib.Path(tmp)
+        clip = tmp / "talk.wav"
+        rate = 44100
+        t = np.arange(int(seconds * rate)) / rate
+        tone = (0.3 * np.sin(2 * np.pi * (220 + 110 * np.sin(t / 3)) * t) * 32767).astype('<i2')
+        with wave.open(str(clip), 'wb') as out:
+            out.setnchannels(2)
+            out.setsampwidth(2)
+            out.setframerate(rate)
+            out.writeframes(np.repeat(tone, 2).tobytes())
+
+        badge = StandInBadge(kbps=kbps)
+        stream = AudioStream(badge, codecs=BADGE_AUDIO_CODECS, min_rate=AUDIO_MIN_RATE, workdir=tmp)
+        whole = seconds * bytes_per_second(stream.fmt) / (kbps * 1024)
+        print(f"{seconds:.0f}s clip as {stream.fmt.name}, link {kbps} KB/s "
+              f"({kbps * 1024 / bytes_per_second(stream.fmt):.1f}x the audio rate)")
+        print(f"whole-file upload   first sound after {whole:6.2f}s")
+
+        result = stream.play(clip)
+        print(f"streamed            first sound after {result.first_sound:6.2f}s")
+        print(f"segments            {', '.join(f'{s.duration:.1f}' for s in result.segments)} s")
+        print(f"segment starts      worst {max(result.late, default=0) * 1000:.1f} ms after the previous one ended")
+        print(describe(result))
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream long audio to the badge in segments")
+    parser.add_argument("--bench", action="store_true", help="Stream a generated clip to a stand-in badge")
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--kbps", type=float, default=40, help="Stand-in link speed")
+    args = parser.parse_args()
+    if args.bench:
+        return benchmark(args.seconds, args.kbps)
+    parser.print_help()
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Audio transcoding for badge uploads
+
+Decodes a WAV file into a NumPy buffer, downmixes it to mono, resamples it and
+re-encodes it in one of the compact formats the badge can play:
+
+- 16-bit or 8-bit linear PCM
+- G.711 u-law (8 bits per sample, better dynamic range than 8-bit PCM)
+- IMA-ADPCM (4 bits per sample)
+
+at 8, 11.025 or 16 kHz. Every stage works on whole arrays; IMA-ADPCM is
+encoded block-parallel (each WAV block is independent, so the recursion runs
+once per sample position across all blocks at the same time).
+
+Usage:
+    python audio_transcode.py input.wav output.wav [--format adpcm_8k]
+"""
+import argparse
+import pathlib
+import struct
+import sys
+import wave
+from collections import namedtuple
+
+import numpy as np
+
+# WAVE format tags
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_MULAW = 0x0007
+WAVE_FORMAT_IMA_ADPCM = 0x0011
+
+AudioFormat = namedtuple("AudioFormat", "name codec rate bits")
+TranscodeResult = namedtuple("TranscodeResult", "format in_bytes out_bytes duration")
+
+RATES = (8000, 11025, 16000)
+
+# Ordered so that, at equal size, the better-sounding codec is listed first
+FORMATS = []
+for _rate in RATES:
+    _khz = f"{_rate // 1000}k"
+    FORMATS += [
+        AudioFormat(f"pcm16_{_khz}", "pcm", _rate, 16),
+        AudioFormat(f"ulaw_{_khz}", "ulaw", _rate, 8),
+        AudioFormat(f"pcm8_{_khz}", "pcm", _rate, 8),
+        AudioFormat(f"adpcm_{_khz}", "adpcm", _rate, 4),
+    ]
+FORMATS_BY_NAME = {fmt.name: fmt for fmt in FORMATS}
+
+# Codecs the stock badge firmware plays; add "ulaw"/"adpcm" for builds that decode them
+BADGE_CODECS = ("pcm",)
+
+# IMA-ADPCM tables
+IMA_STEP_TABLE = np.array([
+    7, 8, 9, 10, 11, 12, 13, 14, 16, 17, 19, 21, 23, 25, 28, 31, 34, 37, 41, 45,
+    50, 55, 60, 66, 73, 80, 88, 97, 107, 118, 130, 143, 157, 173, 190, 209, 230,
+    253, 279, 307, 337, 371, 408, 449, 494, 544, 598, 658, 724, 796, 876, 963,
+    1060, 1166, 1282, 1411, 1552, 1707, 1878, 2066, 2272, 2499, 2749, 3024, 3327,
+    3660, 4026, 4428, 4871, 5358, 5894, 6484, 7132, 7845, 8630, 9493, 10442,
+    11487, 12635, 13899, 15289, 16818, 18500, 20350, 22385, 24623, 27086, 29794,
+    32767], dtype=np.int32)
+IMA_INDEX_TABLE = np.array([-1, -1, -1, -1, 2, 4, 6, 8] * 2, dtype=np.int32)
+
+# The reference encoder's successive approximation (step, step/2, step/4) as lookup
+# tables: the smallest difference that reaches each 3-bit magnitude, and the
+# predictor delta that magnitude decodes to
+_bits = np.arange(8)
+IMA_THRESHOLDS = (((_bits & 4) > 0) * IMA_STEP_TABLE[:, None]
+                  + ((_bits & 2) > 0) * (IMA_STEP_TABLE[:, None] >> 1)
+                  + ((_bits & 1) > 0) * (IMA_STEP_TABLE[:, None] >> 2)).astype(np.int32)
+IMA_DELTAS = IMA_THRESHOLDS + (IMA_STEP_TABLE[:, None] >> 3)
+
+ADPCM_BLOCK_ALIGN = {8000: 256, 11025: 256, 16000: 512}
+
+
+def bytes_per_second(fmt):
+    """Encoded data rate of a format, including ADPCM block headers"""
+    if fmt.codec == "adpcm":
+        block_align = ADPCM_BLOCK_ALIGN[fmt.rate]
+        return fmt.rate * block_align / _adpcm_samples_per_block(block_align)
+    return fmt.rate * fmt.bits // 8
+
+
+def pick_format(codecs=BADGE_CODECS, min_rate=8000):
+    """Pick the smallest format the badge can play at or above min_rate"""
+    candidates = [fmt for fmt in FORMATS if fmt.codec in codecs and fmt.rate >= min_rate]
+    if not candidates:
+        raise ValueError(f"No badge format for codecs {codecs} at {min_rate}Hz or above")
+    # min() keeps the first of equal-sized entries, so FORMATS order breaks ties
+    return min(candidates, key=bytes_per_second)
+
+
+def read_wav(path, max_duration=None):
+    """Read a PCM WAV into a float32 array of shape (frames, channels) in [-1, 1)"""
+    with wave.open(str(path), 'rb') as wav_in:
+        params = wav_in.getparams()
+        nframes = params.nframes
+        if max_duration is not None:
+            nframes = min(nframes, int(params.framerate * max_duration))
+        raw = wav_in.readframes(nframes)
+
+    width = params.sampwidth
+    usable = len(raw) - len(raw) % (width * params.nchannels)
+    buf = np.frombuffer(raw[:usable], dtype=np.uint8)
+
+    if width == 1:
+        samples = (buf.astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        samples = buf.view('<i2').astype(np.float32) / 32768.0
+    elif width == 3:
+        triplets = buf.reshape(-1, 3).astype(np.int32)
+        ints = triplets[:, 0] | (triplets[:, 1] << 8) | (triplets[:, 2] << 16)
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        samples = ints.astype(np.float32) / 8388608.0
+    elif width == 4:
+        samples = buf.view('<i4').astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported sample width: {width} bytes")
+
+    return samples.reshape(-1, params.nchannels), params.framerate
+
+
+def to_mono(samples):
+    """Average all channels into one"""
+    if samples.ndim == 1:
+        return samples
+    return samples.mean(axis=1, dtype=np.float32)
+
+
+def _lowpass_kernel(cutoff, taps=63):
+    """Windowed-sinc low-pass FIR; cutoff is a fraction of the sample rate"""
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+def resample(samples, src_rate, dst_rate):
+    """Resample a mono buffer, low-pass filtering first when downsampling"""
+    if src_rate == dst_rate or len(samples) == 0:
+        return samples.astype(np.float32, copy=False)
+    if dst_rate < src_rate:
+        samples = np.convolve(samples, _lowpass_kernel(0.45 * dst_rate / src_rate), mode='same')
+    out_len = int(len(samples) * dst_rate / src_rate)
+    positions = np.arange(out_len) * (src_rate / dst_rate)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def _to_int16(samples):
+    return np.clip(np.round(samples * 32767.0), -32768, 32767).astype(np.int16)
+
+
+def encode_ulaw(samples):
+    """G.711 u-law encode a float buffer (bit-exact with the CCITT reference coder)"""
+    pcm14 = _to_int16(samples).astype(np.int32) >> 2
+    mask = np.where(pcm14 < 0, 0x7F, 0xFF)
+    magnitude = np.minimum(np.abs(pcm14), 8159) + 0x21
+    segment = np.maximum(np.floor(np.log2(magnitude)).astype(np.int32) - 5, 0)
+    ulaw = np.where(segment > 7, 0x7F, (segment << 4) | ((magnitude >> (segment + 1)) & 0x0F))
+    return (ulaw ^ mask).astype(np.uint8)
+
+
+def _adpcm_samples_per_block(block_align):
+    # Mono: 4-byte header holds the first sample, then two samples per byte
+    return (block_align - 4) * 2 + 1
+
+
+def encode_ima_adpcm(samples, block_align=256):
+    """IMA-ADPCM encode a float buffer into WAV-style mono blocks"""
+    spb = _adpcm_samples_per_block(block_align)
+    pcm = _to_int16(samples).astype(np.int32)
+    nblocks = max(1, -(-len(pcm) // spb))
+    padded = np.zeros(nblocks * spb, dtype=np.int32)
+    padded[:len(pcm)] = pcm
+    blocks = padded.reshape(nblocks, spb)
+
+    # Seed each block's step size from its opening slope so blocks start in tune
+    opening = np.abs(blocks[:, 1] - blocks[:, 0])
+    index = np.clip(np.searchsorted(IMA_STEP_TABLE, opening), 0, 88).astype(np.int32)
+    header_index = index.copy()
+    predictor = blocks[:, 0].copy()
+    codes = np.empty((nblocks, spb - 1), dtype=np.uint8)
+
+    for j in range(1, spb):
+        diff = blocks[:, j] - predictor
+        negative = diff < 0
+        magnitude = (np.abs(diff)[:, None] >= IMA_THRESHOLDS[index, 1:]).sum(axis=1)
+        delta = IMA_DELTAS[index, magnitude]
+        predictor = np.clip(np.where(negative, predictor - delta, predictor + delta), -32768, 32767)
+        index = np.clip(index + IMA_INDEX_TABLE[magnitude], 0, 88)
+        codes[:, j - 1] = magnitude | (negative << 3)
+
+    headers = np.zeros((nblocks, 4), dtype=np.uint8)
+    headers[:, 0:2] = blocks[:, 0].astype('<i2').view(np.uint8).reshape(nblocks, 2)
+    headers[:, 2] = header_index
+    packed = codes[:, 0::2] | (codes[:, 1::2] << 4)
+    return np.hstack([headers, packed]).tobytes()
+
+
+def encode(samples, fmt):
+    """Encode a mono float buffer already at fmt.rate; returns the data chunk bytes"""
+    if fmt.codec == "pcm" and fmt.bits == 16:
+        return _to_int16(samples).astype('<i2').tobytes()
+    if fmt.codec == "pcm" and fmt.bits == 8:
+        return np.clip(np.round(samples * 127.0) + 128, 0, 255).astype(np.uint8).tobytes()
+    if fmt.codec == "ulaw":
+        return encode_ulaw(samples).tobytes()
+    if fmt.codec == "adpcm":
+        return encode_ima_adpcm(samples, ADPCM_BLOCK_ALIGN[fmt.rate])
+    raise ValueError(f"Unknown codec: {fmt.codec}")
+
+
+def wav_bytes(samples, fmt):
+    """Build a complete mono WAV file for a float buffer already at fmt.rate"""
+    return _wav_container(encode(samples, fmt), len(samples), fmt)
+
+
+def wav_bytes_many(clips, fmt):
+    """wav_bytes for a list of buffers; ADPCM clips are encoded together in one pass"""
+    if fmt.codec != "adpcm":
+        return [wav_bytes(clip, fmt) for clip in clips]
+
+    # Block-align every clip so one block-parallel encode covers them all
+    block_align = ADPCM_BLOCK_ALIGN[fmt.rate]
+    spb = _adpcm_samples_per_block(block_align)
+    block_counts = [max(1, -(-len(clip) // spb)) for clip in clips]
+    joined = np.zeros(sum(block_counts) * spb, dtype=np.float32)
+    offset = 0
+    for clip, count in zip(clips, block_counts):
+        joined[offset:offset + len(clip)] = clip
+        offset += count * spb
+
+    data = encode_ima_adpcm(joined, block_align)
+    files = []
+    offset = 0
+    for clip, count in zip(clips, block_counts):
+        files.append(_wav_container(data[offset:offset + count * block_align], len(clip), fmt))
+        offset += count * block_align
+    return files
+
+
+def _wav_container(data, nframes, fmt):
+    if fmt.codec == "pcm":
+        fmt_chunk = struct.pack('<HHIIHH', WAVE_FORMAT_PCM, 1, fmt.rate,
+                                fmt.rate * fmt.bits // 8, fmt.bits // 8, fmt.bits)
+    elif fmt.codec == "ulaw":
+        fmt_chunk = struct.pack('<HHIIHHH', WAVE_FORMAT_MULAW, 1, fmt.rate, fmt.rate, 1, 8, 0)
+    else:
+        block_align = ADPCM_BLOCK_ALIGN[fmt.rate]
+        fmt_chunk = struct.pack('<HHIIHHHH', WAVE_FORMAT_IMA_ADPCM, 1, fmt.rate,
+                                int(bytes_per_second(fmt)), block_align, 4, 2,
+                                _adpcm_samples_per_block(block_align))
+
+    chunks = [b'fmt ', struct.pack('<I', len(fmt_chunk)), fmt_chunk]
+    if fmt.codec != "pcm":
+        # Compressed formats carry their true sample count in a fact chunk
+        chunks += [b'fact', struct.pack('<II', 4, nframes)]
+    chunks += [b'data', struct.pack('<I', len(data)), data]
+    if len(data) % 2:
+        chunks.append(b'\0')
+
+    body = b''.join(chunks)
+    return b'RIFF' + struct.pack('<I', len(body) + 4) + b'WAVE' + body
+
+
+def transcode(input_path, output_path, fmt=None, max_duration=None,
+              codecs=BADGE_CODECS, min_rate=8000):
+    """Convert a WAV file to a badge format; picks the smallest playable format if fmt is None"""
+    input_path = pathlib.Path(input_path)
+    output_path = pathlib.Path(output_path)
+    if fmt is None:
+        fmt = pick_format(codecs, min_rate)
+
+    samples, rate = read_wav(input_path, max_duration)
+    mono = resample(to_mono(samples), rate, fmt.rate)
+    output_path.write_bytes(wav_bytes(mono, fmt))
+
+    return TranscodeResult(fmt, input_path.stat().st_size, output_path.stat().st_size,
+                           len(mono) / fmt.rate)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transcode a WAV file for badge playback")
+    parser.add_argument("input", help="Source WAV file")
+    parser.add_argument("output", help="Destination WAV file")
+    parser.add_argument("--format", choices=sorted(FORMATS_BY_NAME),
+                        help="Target format (default: smallest the badge can play)")
+    parser.add_argument("--codecs", default=",".join(BADGE_CODECS),
+                        help="Codecs the badge can play, comma separated (default: %(default)s)")
+    parser.add_argument("--min-rate", type=int, default=8000, help="Lowest acceptable sample rate")
+    parser.add_argument("--max-duration", type=float, help="Trim to this many seconds")
+    args = parser.parse_args()
+
+    fmt = FORMATS_BY_NAME[args.format] if args.format else None
+    result = transcode(args.input, args.output, fmt, args.max_duration,
+                       tuple(args.codecs.split(",")), args.min_rate)
+
+    print(f"{args.input} -> {args.output} ({result.format.name})")
+    print(f"  {result.in_bytes / 1024:.1f}KB -> {result.out_bytes / 1024:.1f}KB "
+          f"({result.in_bytes / max(result.out_bytes, 1):.1f}x smaller, {result.duration:.2f}s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,248 @@
+"""
+Presenter operations without the window
+
+BadgeSession does what the presenter's buttons do: show text or an image,
+play audio, upload, scan the badge's files, and keep the library. It works
+on plain values rather than Tk widgets. Every operation runs as a job on a
+JobScheduler, so all of them share one device session and device_lock.
+The API server (presenter_api.py) drives a session on its own. The GUI can
+also hand its own scheduler, device and library to one, so the API runs
+alongside the window.
+
+Library is the presenter's library cache (freewili_library_cache.json)
+with the attributes and save_cache() of FreeWiliPresenter, so either can
+be passed as a session's library.
+
+NumPy, PIL, pyserial and freewili are imported by the operations that use
+them, so importing this module (and the presenter) stays fast.
+"""
+import json
+import pathlib
+import sys
+
+# Serial tools (link profiles) live in the repo root
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from badge_rpc import list_files
+from chunked_upload import ChunkedUploader, UploadJournal, describe
+from jobs import BULK, INTERACTIVE, SCAN, JobScheduler
+
+CACHE_FILE = pathlib.Path("freewili_library_cache.json")
+
+# Audio codecs the badge firmware can play and the lowest sample rate we accept
+BADGE_AUDIO_CODECS = ("pcm",)
+AUDIO_MIN_RATE = 11025
+AUDIO_MAX_SECONDS = 3
+
+IMAGE_SUFFIXES = (".jpg", ".jpeg", ".png", ".fwi")
+AUDIO_SUFFIXES = (".wav",)
+
+JOB_WORKERS = 2
+
+
+class NoDevice(Exception):
+    """No badge is connected"""
+
+
+class CommandFailed(Exception):
+    """The badge answered a command with an error"""
+
+
+def list_badge_files(device_lock):
+    """List the badge's files on the main processor port; returns (images, audio).
+
+    Framed requests when rpc.py runs on the badge, the file menu otherwise (badge_rpc.py).
+    """
+    import serial
+    from badge_link_profile import load_profile
+    from badge_ports import MAIN, find_port
+
+    # Main processor port, from the port cache when it is still plugged in
+    com_port = find_port(MAIN)
+    if not com_port:
+        raise NoDevice("main processor port not found")
+
+    # Measured link timings (badge_link_profile.py) instead of fixed sleeps
+    profile = load_profile(com_port)
+
+    # The scan shares the USB link with the device session
+    with device_lock:
+        ser = serial.Serial(com_port, profile.baudrate, timeout=1)
+        try:
+            ser.reset_input_buffer()
+            ser.reset_output_buffer()
+            listing = list_files(ser, profile)
+        finally:
+            ser.close()
+    return listing.images, listing.audio
+
+
+class Library:
+    """The presenter's library cache, for sessions that run without the window"""
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = pathlib.Path(path)
+        self.image_list = []
+        self.audio_list = []
+        self.image_sources = {}
+        if self.path.exists():
+            try:
+                cache = json.loads(self.path.read_text())
+                self.image_list = cache.get('images', [])
+                self.audio_list = cache.get('audio', [])
+                self.image_sources = cache.get('sources', {})
+            except (OSError, ValueError):
+                pass
+
+    def save_cache(self):
+        cache = {
+            'images': self.image_list,
+            'audio': self.audio_list,
+            'sources': self.image_sources
+        }
+        self.path.write_text(json.dumps(cache, indent=2))
+
+
+class BadgeSession:
+    """Presenter operations on one badge, each run as a job.
+
+    get_device() returns the connected badge or None; without it the
+    session finds one itself on first use. on_change() runs on a worker
+    after the library changed.
+    """
+
+    def __init__(self, library=None, jobs=None, get_device=None, journal=None, on_change=None,
+                 workdir="."):
+        self.library = library if library is not None else Library()
+        self.jobs = jobs or JobScheduler(workers=JOB_WORKERS)
+        self.journal = journal or UploadJournal()
+        self.on_change = on_change or (lambda: None)
+        self.workdir = pathlib.Path(workdir)
+        self._get_device = get_device
+        self._device = None
+
+    def device(self):
+        if self._get_device:
+            device = self._get_device()
+        else:
+            if self._device is None:
+                from freewili import FreeWili
+                with self.jobs.device_lock:
+                    devices = FreeWili.find_all()
+                self._device = devices[0] if devices else None
+            device = self._device
+        if device is None:
+            raise NoDevice("no badge connected")
+        return device
+
+    def _command(self, method, *args):
+        with self.jobs.device_lock:
+            result = getattr(self.device(), method)(*args)
+        if result.is_err():
+            raise CommandFailed(str(result.unwrap_err()))
+        return result.unwrap()
+
+    def _changed(self):
+        self.library.save_cache()
+        self.on_change()
+
+    def library_state(self):
+        return {"images": list(self.library.image_list), "audio": list(self.library.audio_list)}
+
+    # Operations: func(job, ...) for JobScheduler.submit, with the priority each one runs at (PRIORITIES)
+
+    def display_text(self, job, text):
+        return {"shown": self._command("show_text_display", text)}
+
+    def display_image(self, job, name):
+        return {"shown": self._command("show_gui_image", name)}
+
+    def play(self, job, name):
+        return {"playing": self._command("play_audio_file", name)}
+
+    def stream(self, job, path):
+        """Play a WAV of any length, uploading it in segments as it plays (audio_stream.py)"""
+        from audio_stream import AudioStream, describe as describe_stream
+
+        stream = AudioStream(self.device(), self.jobs.device_lock, codecs=BADGE_AUDIO_CODECS,
+                             min_rate=AUDIO_MIN_RATE, on_status=lambda text: job.report(message=text))
+        result = stream.play(path, check=job.check, progress=lambda played, total: job.report(played / total))
+        return {"seconds": result.duration, "segments": len(result.segments),
+                "first_sound": result.first_sound, "summary": describe_stream(result)}
+
+    def scan(self, job):
+        images, audio = list_badge_files(self.jobs.device_lock)
+        for name in images:
+            if name not in self.library.image_list:
+                self.library.image_list.append(name)
+        for name in audio:
+            if name not in self.library.audio_list:
+                self.library.audio_list.append(name)
+        self._changed()
+        return {"found_images": images, "found_audio": audio, **self.library_state()}
+
+    def upload(self, job, path, rotate=True, show=True):
+        """Upload an image (converted to FWI) or a WAV (trimmed and transcoded), then show or play it"""
+        from audio_transcode import transcode
+        from fwi_encoder import encode_file
+
+        path = pathlib.Path(path)
+        suffix = path.suffix.lower()
+        if suffix in AUDIO_SUFFIXES:
+            local = self.workdir / (path.stem + "_trim.wav")
+            converted = transcode(path, local, max_duration=AUDIO_MAX_SECONDS,
+                                  codecs=BADGE_AUDIO_CODECS, min_rate=AUDIO_MIN_RATE)
+            job.report(message=converted.format.name)
+            target, names = None, self.library.audio_list
+        elif suffix in IMAGE_SUFFIXES:
+            if suffix == ".fwi":
+                local = path
+            else:
+                local = self.workdir / (path.stem + ".fwi")
+                local.write_bytes(encode_file(path, rotate=rotate))
+            target, names = f"images/{local.name}", self.library.image_list
+        else:
+            raise ValueError(f"not an image or WAV file: {path.name}")
+
+        # Last point where a cancel can still skip the transfer
+        job.check()
+        uploader = ChunkedUploader(self.device(), self.journal, device_lock=self.jobs.device_lock,
+                                   event_cb=transfer_progress(job))
+        result = uploader.upload(local, target, check=job.check)
+
+        if local.name not in names:
+            names.append(local.name)
+        if names is self.library.image_list:
+            self.library.image_sources[local.name] = str(path.resolve())
+        self._changed()
+
+        if show:
+            self._command("play_audio_file" if names is self.library.audio_list else "show_gui_image", local.name)
+        return {"name": local.name, "bytes": result.size, "upload": describe(result)}
+
+
+# Queue class of each operation (jobs.py)
+PRIORITIES = {
+    "display_text": INTERACTIVE,
+    "display_image": INTERACTIVE,
+    "play": INTERACTIVE,
+    # A stream's play commands still take the link as interactive (audio_stream.py)
+    "stream": BULK,
+    "scan": SCAN,
+    "upload": BULK,
+}
+
+
+def transfer_progress(job):
+    """Upload event callback that turns 'Sent x/y bytes ... (r KB/s)' messages into job progress"""
+    def callback(msg):
+        if msg.startswith("Sent ") and "/" in msg:
+            try:
+                sent, total = msg.split()[1].split("/")
+            except ValueError:
+                return
+            rate = msg[msg.rfind("(") + 1:-1] if msg.endswith("KB/s)") else "uploading"
+            job.report(int(sent) / int(total), rate)
+        elif msg.startswith(("Resuming", "Joining", "Verified")):
+            job.report(message=msg.split(" ")[0].lower())
+    return callback
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Benchmark: in-memory FWI encoder vs. the temp-PNG + freewili convert path
+
+Runs both pipelines on the same source image, checks that they produce
+identical bytes and reports the time per image. Also runs the low-memory
+file path (reduced-resolution decode, turns after shrinking) and reports
+each path's peak memory, measured in a fresh interpreter per path.
+
+Usage:
+    python bench_fwi_encoder.py [image] [--runs 5] [--no-rotate]
+"""
+import argparse
+import multiprocessing
+import pathlib
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from fwi_encoder import EXIF_ORIENTATION, encode_file, encode_fwi, peak_rss_mb
+
+
+def legacy_convert(img_path, rotate, workdir):
+    """The presenter's original path: PIL -> temp PNG -> freewili convert -> .fwi on disk"""
+    from freewili.image import convert as convert_image
+
+    img = Image.open(img_path)
+    if rotate:
+        img = img.transpose(Image.ROTATE_270)
+    img.thumbnail((320, 240), Image.Resampling.LANCZOS)
+
+    canvas = Image.new('RGB', (320, 240), (0, 0, 0))
+    x, y = (320 - img.width) // 2, (240 - img.height) // 2
+    canvas.paste(img, (x, y))
+
+    temp_png = workdir / "temp_convert.png"
+    canvas.save(temp_png)
+    fwi_path = workdir / "legacy.fwi"
+    convert_image(temp_png, fwi_path)
+    return fwi_path.read_bytes()
+
+
+def direct_convert(img_path, rotate):
+    """The new path: decode once, encode in memory"""
+    with Image.open(img_path) as img:
+        return encode_fwi(img, rotate=rotate)
+
+
+def low_memory_convert(img_path, rotate):
+    """The ingest path: draft decode, shrink, then EXIF orientation and rotation"""
+    return encode_file(img_path, rotate=rotate)
+
+
+def _measure_peak(path_name, img_path, rotate, result):
+    baseline = peak_rss_mb()
+    if path_name == "direct":
+        direct_convert(img_path, rotate)
+    else:
+        low_memory_convert(img_path, rotate)
+    result.put(peak_rss_mb() - baseline)
+
+
+def peak_memory(path_name, img_path, rotate):
+    """Peak RSS growth of one conversion in a freshly spawned interpreter, in MB"""
+    if peak_rss_mb() is None:
+        return None
+    context = multiprocessing.get_context("spawn")
+    result = context.Queue()
+    process = context.Process(target=_measure_peak, args=(path_name, str(img_path), rotate, result))
+    process.start()
+    peak = result.get()
+    process.join()
+    return peak
+
+
+def pixel_difference(a, b):
+    """Mean absolute difference per RGB565 channel between two FWI files of the same size"""
+    words_a = np.frombuffer(a, dtype='>u2', offset=24).astype(np.int32)
+    words_b = np.frombuffer(b, dtype='>u2', offset=24).astype(np.int32)
+    channels = [(words >> 11, (words >> 5) & 63, words & 31) for words in (words_a, words_b)]
+    return float(np.mean([np.abs(x - y).mean() for x, y in zip(*channels)]))
+
+
+def time_runs(func, runs):
+    best = float("inf")
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FWI conversion paths")
+    parser.add_argument("image", nargs="?", default=str(pathlib.Path(__file__).with_name("oscar.jpg")))
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--no-rotate", action="store_true")
+    args = parser.parse_args()
+    rotate = not args.no_rotate
+
+    try:
+        import freewili.image  # noqa: F401
+    except ImportError:
+        print("ERROR: freewili not installed (needed for the reference path)")
+        return 1
+
+    with Image.open(args.image) as img:
+        print(f"Source: {args.image} ({img.width}x{img.height} {img.mode})")
+        oriented = img.getexif().get(EXIF_ORIENTATION, 1) != 1
+
+    # Before anything big is decoded here, so the children start from a small parent
+    direct_peak = peak_memory("direct", args.image, rotate)
+    low_peak = peak_memory("low", args.image, rotate)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        workdir = pathlib.Path(tmp)
+        legacy_time, legacy_bytes = time_runs(lambda: legacy_convert(args.image, rotate, workdir), args.runs)
+    direct_time, direct_bytes = time_runs(lambda: direct_convert(args.image, rotate), args.runs)
+    low_time, low_bytes = time_runs(lambda: low_memory_convert(args.image, rotate), args.runs)
+
+    def peak(mb):
+        return f"{mb:7.0f} MB peak" if mb is not None else ""
+
+    print(f"temp PNG + convert : {legacy_time * 1000:8.1f} ms")
+    print(f"in-memory encoder  : {direct_time * 1000:8.1f} ms  {peak(direct_peak)}")
+    print(f"low-memory decode  : {low_time * 1000:8.1f} ms  {peak(low_peak)}")
+    print(f"speedup            : {legacy_time / direct_time:8.1f}x (encoder), "
+          f"{legacy_time / low_time:.1f}x (low-memory)")
+    print(f"output             : {len(direct_bytes)} bytes, "
+          f"{'identical' if direct_bytes == legacy_bytes else 'DIFFERENT'}")
+    if oriented:
+        # Only the file path honours EXIF orientation, so the pictures differ by design
+        print("low-memory output  : EXIF orientation applied (not comparable)")
+    else:
+        # Reduced-resolution decoding resamples a little differently
+        print(f"low-memory output  : mean difference {pixel_difference(low_bytes, direct_bytes):.2f} "
+              f"levels per channel")
+    return 0 if direct_bytes == legacy_bytes else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark: presenter cold start
+
+Starts fresh interpreters and measures three things. The first is how long
+`import freewili_presenter` takes. The second is how long the window takes
+to appear, from process start until Tk reports it visible. The third is
+what the deferred modules (NumPy, PIL, pyserial, freewili) would add if
+they were still imported at the top. Each run uses an empty working
+directory, so no library cache, journal or thumbnails are read. The window
+closes as soon as it is drawn, before the background discovery gets far.
+
+First paint needs a display; without one only the import times are reported.
+
+Usage:
+    python bench_startup.py [--runs 5] [--target-ms 300]
+"""
+import argparse
+import json
+import os
+import pathlib
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+TARGET_MS = 300
+PRESENTER_DIR = pathlib.Path(__file__).resolve().parent
+
+IMPORT_ONLY = """
+import sys, time, json
+start = time.perf_counter()
+import freewili_presenter
+imported = time.perf_counter()
+heavy = [name for name in ("numpy", "PIL", "serial", "freewili") if name in sys.modules]
+print(json.dumps({"import": imported - start, "loaded": heavy}))
+"""
+
+FIRST_PAINT = """
+import os, sys, time, json
+import freewili_presenter
+root = freewili_presenter.tk.Tk()
+app = freewili_presenter.FreeWiliPresenter(root)
+root.wait_visibility(root)
+root.update_idletasks()
+print(json.dumps({"painted": time.time()}), flush=True)
+os._exit(0)
+"""
+
+DEFERRED = """
+import time, json
+start = time.perf_counter()
+import numpy, PIL.Image, serial.tools.list_ports, freewili.fw
+print(json.dumps({"deferred": time.perf_counter() - start}))
+"""
+
+
+def run_child(code, cwd):
+    """Run code in a fresh interpreter; returns (its JSON line, wall time from spawn)"""
+    started = time.time()
+    out = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True, timeout=60,
+                         env={**os.environ, "PYTHONPATH": str(PRESENTER_DIR)})
+    if out.returncode:
+        raise RuntimeError(out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "child failed")
+    return json.loads(out.stdout.strip().splitlines()[-1]), started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure presenter import time and first paint")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=TARGET_MS)
+    args = parser.parse_args()
+
+    imports, paints, deferred = [], [], []
+    loaded = []
+    paint_error = None
+    with tempfile.TemporaryDirectory() as tmp:
+        # Untimed warm-up so every timed run reads .pyc files from the OS cache
+        run_child(IMPORT_ONLY, tmp)
+        for _ in range(args.runs):
+            result, _ = run_child(IMPORT_ONLY, tmp)
+            imports.append(result["import"])
+            loaded = result["loaded"]
+            result, _ = run_child(DEFERRED, tmp)
+            deferred.append(result["deferred"])
+            if paint_error is None:
+                try:
+                    result, started = run_child(FIRST_PAINT, tmp)
+                    paints.append(result["painted"] - started)
+                except RuntimeError as e:
+                    paint_error = str(e)
+
+    def ms(samples):
+        return f"median {statistics.median(samples) * 1000:6.1f} ms  worst {max(samples) * 1000:6.1f} ms"
+
+    print(f"{args.runs} cold starts, Python {sys.version.split()[0]}")
+    print(f"import freewili_presenter     {ms(imports)}")
+    print(f"  heavy modules loaded        {', '.join(loaded) or 'none'}")
+    print(f"deferred imports (for scale)  {ms(deferred)}")
+    if paints:
+        print(f"process start -> window       {ms(paints)}")
+        worst = max(paints)
+    else:
+        print(f"process start -> window       skipped ({paint_error})")
+        worst = max(imports)
+
+    ok = worst * 1000 < args.target_ms
+    what = "first paint" if paints else "import (no display for first paint)"
+    print(f"{'✓' if ok else '✗'} {what} under {args.target_ms:.0f} ms")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
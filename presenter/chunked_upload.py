@@ -0,0 +1,324 @@
+"""
+Resumable chunked uploads to the badge
+
+device.send_file is all-or-nothing: the firmware checks one CRC32 over the
+whole file, and there is no offset to resume from. A cable wiggle at 90%
+of a full-screen .fwi means starting over.
+
+ChunkedUploader sends a file as numbered part files instead. Each part is
+its own send_file, so the firmware CRC-checks it on arrival. A part is
+recorded in a local journal only after the badge accepts it. When every
+part is on the badge, a small generated script joins them into the target
+file. The target is then read back and compared against the source's
+SHA-256 before the upload counts as done.
+
+If the link drops, the journal keeps the confirmed parts. Calling upload()
+again with the same file and target (after a reconnect, or in a later
+session) sends only the missing parts.
+
+Files no larger than one chunk skip the parts and the join: they go as a
+single send_file and are read back and compared the same way. So do files
+for the display processor (images, sounds), whatever their size: the
+firmware only runs scripts on the main processor, and a script there can't
+open files on the display's filesystem, so display parts could never be
+joined. Those uploads are verified but not resumable.
+
+The read-back waits for the join, up to verify_timeout plus the time the
+link needs to write the file and read it back. If the file never shows up
+complete, the journal keeps the parts, so calling upload() again joins
+them and checks again without resending.
+"""
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+CHUNK_SIZE = 16384
+# Link rate assumed for the verification window until this upload has measured one (bytes/s)
+VERIFY_LINK_RATE = 16 * 1024
+JOURNAL_FILE = pathlib.Path("freewili_upload_journal.json")
+
+# Part names have to fit the firmware's 8.3 limit: <token>.<index>
+MAX_PARTS = 1000
+
+UploadResult = namedtuple("UploadResult", "target size sent_bytes resumed_bytes elapsed verified")
+
+
+class UploadError(Exception):
+    """An upload stopped before the target was complete; upload() again to resume"""
+
+
+def throughput(result):
+    """Bytes per second actually sent over the link for an UploadResult"""
+    return result.sent_bytes / result.elapsed if result.elapsed > 0 else 0.0
+
+
+def describe(result):
+    """One-line summary such as '153.6KB in 4.1s (37.5 KB/s, resumed 64.0KB)'"""
+    text = f"{result.size / 1024:.1f}KB in {result.elapsed:.1f}s ({throughput(result) / 1024:.1f} KB/s"
+    if result.resumed_bytes:
+        text += f", resumed {result.resumed_bytes / 1024:.1f}KB"
+    return text + ")"
+
+
+def file_digest(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(65536):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def joiner_script(parts, target):
+    """Badge-side script that concatenates the part files into target"""
+    lines = [
+        "# Generated by chunked_upload.py: join uploaded parts",
+        f"PARTS = {parts!r}",
+        f"TARGET = {target!r}",
+        "out = open(TARGET, 'wb')",
+        "for name in PARTS:",
+        "    f = open(name, 'rb')",
+        "    while True:",
+        "        buf = f.read(4096)",
+        "        if not buf:",
+        "            break",
+        "        out.write(buf)",
+        "    f.close()",
+        "out.close()",
+        "",
+    ]
+    return "\n".join(lines)
+
+
+class UploadJournal:
+    """Confirmed parts per (target, content hash), kept in a JSON file; shared by concurrent uploads"""
+
+    def __init__(self, path=JOURNAL_FILE):
+        self.path = pathlib.Path(path)
+        self.entries = {}
+        self._lock = threading.RLock()
+        if self.path.exists():
+            try:
+                self.entries = json.loads(self.path.read_text())
+            except (OSError, ValueError):
+                self.entries = {}
+
+    @staticmethod
+    def key(target, digest):
+        return f"{target}:{digest}"
+
+    def entry(self, target, digest, size, chunk_size):
+        """Existing entry for this content, or a fresh one if the chunking changed"""
+        key = self.key(target, digest)
+        with self._lock:
+            entry = self.entries.get(key)
+            if not entry or entry.get("chunk_size") != chunk_size or entry.get("size") != size:
+                entry = {"target": target, "size": size, "chunk_size": chunk_size, "confirmed": []}
+                self.entries[key] = entry
+            return dict(entry, confirmed=list(entry["confirmed"]))
+
+    def confirm(self, target, digest, index):
+        with self._lock:
+            entry = self.entries[self.key(target, digest)]
+            if index not in entry["confirmed"]:
+                entry["confirmed"].append(index)
+            self.save()
+
+    def forget(self, target, digest):
+        with self._lock:
+            if self.entries.pop(self.key(target, digest), None) is not None:
+                self.save()
+
+    def save(self):
+        # Write-then-rename so a crash mid-save never loses earlier progress
+        with self._lock:
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_text(json.dumps(self.entries, indent=2))
+            os.replace(tmp, self.path)
+
+
+def measured_write_chunk(processor):
+    """Write chunk badge_link_profile.py measured for the processor's port, 0 if none"""
+    try:
+        from badge_link_profile import write_chunk_for
+        from badge_ports import DISPLAY, MAIN
+        from freewili.types import FreeWiliProcessorType
+    except ImportError:
+        return 0
+    return write_chunk_for(MAIN if processor == FreeWiliProcessorType.Main else DISPLAY)
+
+
+class ChunkedUploader:
+    def __init__(self, device, journal=None, chunk_size=CHUNK_SIZE, device_lock=None,
+                 event_cb=None, verify_timeout=5.0, write_chunk=None):
+        self.device = device
+        self.journal = journal if journal is not None else UploadJournal()
+        self.chunk_size = chunk_size
+        # send_file's serial write size; None looks up the measured one per processor
+        self.write_chunk = write_chunk
+        self._write_chunks = {}
+        self.device_lock = device_lock
+        self.event_cb = event_cb or (lambda msg: None)
+        self.verify_timeout = verify_timeout
+
+    def upload(self, source, target=None, processor=None, check=None):
+        """Send source to target on the badge, resuming any earlier partial upload.
+
+        target and processor default the way send_file picks them. check() is
+        called between parts and may raise to stop early. Returns an
+        UploadResult; raises UploadError if the link fails or verification
+        does not match.
+        """
+        source = pathlib.Path(source)
+        # freewili.fw is slow to import, and only needed when target or processor are left out
+        from freewili.fw import FileMap
+        from freewili.types import FreeWiliProcessorType
+        try:
+            if not target:
+                target = FileMap.from_fname(str(source)).to_path(str(source))
+            if not processor:
+                processor = FileMap.from_fname(target).processor
+        except ValueError as e:
+            raise UploadError(str(e)) from e
+
+        size = source.stat().st_size
+        start = time.perf_counter()
+        digest = file_digest(source)
+        if size <= self.chunk_size or processor != FreeWiliProcessorType.Main:
+            # One send_file, no join (scripts only run on Main); still read back before it counts
+            self._send(source, target, processor, 0, size, start)
+            with tempfile.TemporaryDirectory() as tmp:
+                verified = self._verify(target, processor, digest, size, pathlib.Path(tmp),
+                                        self._verify_window(size, size, start))
+            if not verified:
+                raise UploadError(f"{target} failed verification")
+            return UploadResult(target, size, size, 0, time.perf_counter() - start, True)
+
+        count = -(-size // self.chunk_size)
+        if count > MAX_PARTS:
+            raise UploadError(f"{source.name} needs {count} parts; use a larger chunk size")
+
+        entry = self.journal.entry(target, digest, size, self.chunk_size)
+        self.journal.save()
+        directory, _, _ = target.rpartition("/")
+        prefix = f"{directory}/" if directory else ""
+        parts = [f"{prefix}{digest[:8]}.{i:03d}" for i in range(count)]
+
+        confirmed = set(entry["confirmed"])
+        resumed = sum(self._part_size(i, size) for i in confirmed)
+        done = resumed
+        if resumed:
+            self.event_cb(f"Resuming {target}: {len(confirmed)}/{count} parts already on badge")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            part_path = pathlib.Path(tmp) / "part.bin"
+            with open(source, 'rb') as f:
+                for index, name in enumerate(parts):
+                    if index in confirmed:
+                        continue
+                    if check:
+                        check()
+                    f.seek(index * self.chunk_size)
+                    part_path.write_bytes(f.read(self.chunk_size))
+                    done += self._send(part_path, name, processor, done, size, start, resumed)
+                    self.journal.confirm(target, digest, index)
+
+            self.event_cb(f"Joining {count} parts into {target}...")
+            script = pathlib.Path(tmp) / f"j{digest[:7]}.py"
+            script.write_text(joiner_script(["/" + p.lstrip("/") for p in parts], "/" + target.lstrip("/")))
+            self._call("send_file", script, f"/scripts/{script.name}", processor)
+            self._call("run_script", script.name, False, processor)
+
+            window = self._verify_window(size, done - resumed, start)
+            verified = self._verify(target, processor, digest, size, pathlib.Path(tmp), window)
+            elapsed = time.perf_counter() - start
+            if verified is None:
+                # The join may still be running; keep the parts and check again next time
+                raise UploadError(f"{target} not complete after {window:.1f}s; upload again to re-check")
+            if not verified:
+                # The parts are suspect too; start clean next time
+                self.journal.forget(target, digest)
+                raise UploadError(f"{target} failed verification after join")
+
+            for name in parts + [f"/scripts/{script.name}"]:
+                try:
+                    self._call("remove_directory_or_file", name, processor)
+                except UploadError:
+                    pass
+        self.journal.forget(target, digest)
+        return UploadResult(target, size, size - resumed, resumed, elapsed, True)
+
+    def _part_size(self, index, size):
+        return min(self.chunk_size, size - index * self.chunk_size)
+
+    def _send(self, path, name, processor, done, size, start, resumed=0):
+        """send_file one part, reporting progress and link rate over the whole upload"""
+        def progress(msg):
+            if msg.startswith("Sent ") and "/" in msg:
+                try:
+                    sent = done + int(msg.split()[1].split("/")[0])
+                except ValueError:
+                    return
+                elapsed = time.perf_counter() - start
+                rate = (sent - resumed) / elapsed / 1024 if elapsed > 0 else 0.0
+                self.event_cb(f"Sent {sent}/{size} bytes of {name} ({rate:.1f} KB/s)")
+
+        self._call("send_file", path, name, processor, progress, self._write_chunk(processor))
+        return path.stat().st_size
+
+    def _write_chunk(self, processor):
+        if self.write_chunk is not None:
+            return self.write_chunk
+        if processor not in self._write_chunks:
+            self._write_chunks[processor] = measured_write_chunk(processor)
+        return self._write_chunks[processor]
+
+    def _verify_window(self, size, sent, start):
+        """verify_timeout plus a write and a read-back of size at the rate this upload measured"""
+        elapsed = time.perf_counter() - start
+        rate = sent / elapsed if sent and elapsed > 0 else VERIFY_LINK_RATE
+        return self.verify_timeout + 2 * size / rate
+
+    def _verify(self, target, processor, digest, size, workdir, window):
+        """Read the file back until it matches or window seconds pass.
+
+        True if it matched, False if a complete copy differs, None if no
+        complete copy turned up in time (the join may still be running).
+        """
+        readback = workdir / "readback.bin"
+        deadline = time.perf_counter() + window
+        verdict = None
+        while True:
+            try:
+                self._call("get_file", "/" + target.lstrip("/"), readback, processor)
+                if readback.stat().st_size == size:
+                    if file_digest(readback) == digest:
+                        self.event_cb(f"Verified {target} (sha256 {digest[:12]})")
+                        return True
+                    verdict = False
+            except (UploadError, OSError):
+                pass
+            if time.perf_counter() >= deadline:
+                return verdict
+            # run_script returns before the join finishes
+            time.sleep(0.5)
+
+    def _call(self, method, *args):
+        """Run one device command under the device lock; Err or a dropped link raises UploadError"""
+        try:
+            if self.device_lock:
+                with self.device_lock:
+                    result = getattr(self.device, method)(*args)
+            else:
+                result = getattr(self.device, method)(*args)
+        except UploadError:
+            raise
+        except Exception as e:
+            raise UploadError(f"{method} failed: {e}") from e
+        if result.is_err():
+            raise UploadError(f"{method} failed: {result.err_value}")
+        return result.ok_value
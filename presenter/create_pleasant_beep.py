@@ -1,50 +1,18 @@
 #!/usr/bin/env python3
 """Create a pleasant 'boop' sound instead of harsh beep"""
-import wave
-import struct
-import math
+import pathlib
 
-sample_rate = 22050
-duration = 0.3  # Short 300ms
+from audio_transcode import AudioFormat, wav_bytes
+from sfx import render
 
-# Two-tone pleasant "boop" - descending notes
-freq1 = 800  # Higher note
-freq2 = 600  # Lower note
-transition = 0.15  # Switch frequency at 150ms
+# 16-bit mono at 22.05kHz, same as the original test_beep.wav
+fmt = AudioFormat("pcm16_22k", "pcm", 22050, 16)
 
-num_samples = int(sample_rate * duration)
-samples = []
-
-for i in range(num_samples):
-    t = i / sample_rate
-
-    # Envelope: fade in and fade out for smooth sound
-    if t < 0.02:  # Fast fade in
-        envelope = t / 0.02
-    elif t > duration - 0.1:  # Fade out
-        envelope = (duration - t) / 0.1
-    else:
-        envelope = 1.0
-
-    # Frequency transition
-    if t < transition:
-        freq = freq1
-    else:
-        freq = freq2
-
-    # Generate sine wave with envelope
-    sample = int(32767 * 0.3 * envelope * math.sin(2 * math.pi * freq * t))
-    samples.append(sample)
-
-# Write WAV file
-with wave.open('test_beep.wav', 'w') as wav_file:
-    wav_file.setnchannels(1)  # Mono
-    wav_file.setsampwidth(2)  # 2 bytes
-    wav_file.setframerate(sample_rate)
-
-    for sample in samples:
-        wav_file.writeframes(struct.pack('<h', sample))
+# Two-tone descending "boop" (800Hz -> 600Hz) with a smooth fade in/out
+samples = render("boop", fmt.rate)
+pathlib.Path('test_beep.wav').write_bytes(wav_bytes(samples, fmt))
 
 print("Created pleasant 'boop' sound (test_beep.wav)")
 print("- 300ms two-tone descending sound")
 print("- Smooth fade in/out envelope")
+print("Run 'python sfx.py' to render the full UI sound bank")
@@ -1,54 +1,106 @@
 #!/usr/bin/env python3
 """
 FreeWili Presenter v5 - With persistent library cache
+
+The window comes up first. NumPy, PIL, pyserial and freewili are imported
+where they are first used. Once the window has been drawn, the library
+cache is read, the badge is searched for and the port watcher starts, all
+in the background. bench_startup.py measures import time and first paint.
 """
+import argparse
 import sys
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import pathlib
-from PIL import Image
-import threading
-import wave
 import json
-import serial.tools.list_ports
 
-sys.path.insert(0, r'D:\CODE\freewili-python')
-from freewili import FreeWili
-from freewili.image import convert as convert_image
+# Development checkout of freewili-python on Windows; elsewhere the installed package is used
+FREEWILI_CHECKOUT = pathlib.Path(r'D:\CODE\freewili-python')
+if sys.platform == "win32" and FREEWILI_CHECKOUT.is_dir():
+    sys.path.insert(0, str(FREEWILI_CHECKOUT))
+
+from badge_session import (AUDIO_MIN_RATE, BADGE_AUDIO_CODECS, CACHE_FILE, BadgeSession, Library,
+                           list_badge_files, transfer_progress)
+from chunked_upload import ChunkedUploader, UploadError, UploadJournal, describe
+from jobs import BULK, INTERACTIVE, SCAN, JobCancelled, JobScheduler
+from slideshow import PLAYLIST_SUFFIXES, Slideshow, load_playlist
+from thumbnails import PreviewPane, ThumbnailCache
 
-CACHE_FILE = pathlib.Path("freewili_library_cache.json")
+# Background workers; device commands are serialized by the scheduler's device lock
+JOB_WORKERS = 2
+JOB_PUMP_MS = 15
 
 class FreeWiliPresenter:
     def __init__(self, root):
         self.root = root
         self.root.title("FreeWili Presenter v5 - Persistent Library")
-        self.root.geometry("700x700")
+        self.root.geometry("700x940")
 
         self.device = None
         self.image_list = []
         self.audio_list = []
+        # Local file each library image was made from, for thumbnails
+        self.image_sources = {}
+        self.slideshow = None
+        self.slide_rotate = tk.BooleanVar(value=True)
+        self.jobs = JobScheduler(workers=JOB_WORKERS)
+        self.upload_journal = UploadJournal()
+        self.thumbnails = ThumbnailCache(
+            self._thumbnail_source, lambda name, png: self.root.after(0, lambda: self.preview.thumbnail_ready(name, png)))
+
+        self._library_loaded = False
+        self.port_watcher = None
 
-        self.load_cache()
         self.setup_ui()
+        self.root.after(JOB_PUMP_MS, self._pump_jobs)
+        # Idle callbacks run after Tk's own redraws, so this waits for the first paint
+        self.root.after_idle(self._start_background)
+
+    def _start_background(self):
+        # The cached library can be browsed before (or without) a badge
+        self.jobs.submit("Load library", lambda job: Library(CACHE_FILE), priority=SCAN,
+                         on_done=self._cache_loaded)
         self.connect_device()
 
-    def load_cache(self):
-        """Load the library cache from disk"""
-        if CACHE_FILE.exists():
-            try:
-                with open(CACHE_FILE, 'r') as f:
-                    cache = json.load(f)
-                    self.image_list = cache.get('images', [])
-                    self.audio_list = cache.get('audio', [])
-            except:
-                self.image_list = []
-                self.audio_list = []
+        # Reconnect as soon as the badge is plugged back in
+        self.jobs.submit("Watch ports", self._watch_ports_job, priority=SCAN)
+
+    def _watch_ports_job(self, job):
+        # pyserial is imported here, on a worker, not at startup or on the Tk thread
+        from badge_ports import PortWatcher
+        self.port_watcher = PortWatcher(
+            lambda kind, port: self.root.after(0, lambda: self._port_event(kind, port))).start()
+
+    def start_api(self, port):
+        """Serve this window's device session over HTTP/WebSocket (presenter_api.py)"""
+        from presenter_api import PresenterAPI
+
+        session = BadgeSession(library=self, jobs=self.jobs, get_device=lambda: self.device,
+                               journal=self.upload_journal,
+                               on_change=lambda: self.root.after(0, self._update_listboxes))
+        # The window already pumps the scheduler's callbacks on the Tk thread
+        return PresenterAPI(session, port=port, pump=False).start_in_thread()
+
+    def _cache_loaded(self, cache):
+        """Take the library read in the background, keeping anything added meanwhile"""
+        added = bool(self.image_list or self.audio_list)
+        self.image_list = cache.image_list + [name for name in self.image_list if name not in cache.image_list]
+        self.audio_list = cache.audio_list + [name for name in self.audio_list if name not in cache.audio_list]
+        self.image_sources = {**cache.image_sources, **self.image_sources}
+        self._library_loaded = True
+        if added:
+            self.save_cache()
+        self._update_listboxes()
 
     def save_cache(self):
         """Save the library cache to disk"""
+        if not self._library_loaded:
+            # Would overwrite the cache before it has been read; _cache_loaded saves instead
+            return
         cache = {
             'images': self.image_list,
-            'audio': self.audio_list
+            'audio': self.audio_list,
+            'sources': self.image_sources
         }
         with open(CACHE_FILE, 'w') as f:
             json.dump(cache, f, indent=2)
@@ -72,8 +124,18 @@ class FreeWiliPresenter:
 
         ttk.Label(img_lib_frame, text="Images on badge:").pack(anchor="w")
 
-        self.image_listbox = tk.Listbox(img_lib_frame, height=5)
-        self.image_listbox.pack(fill="both", expand=True, pady=5)
+        list_frame = ttk.Frame(img_lib_frame)
+        list_frame.pack(fill="both", expand=True, pady=5)
+
+        self.image_listbox = tk.Listbox(list_frame, height=5, exportselection=False)
+        self.image_listbox.pack(side="left", fill="both", expand=True)
+        self.image_listbox.bind("<<ListboxSelect>>", self._image_selected)
+
+        # Thumbnails of the same list, drawn from local copies only
+        self.preview = PreviewPane(list_frame, self.thumbnails,
+                                   on_select=self._preview_selected,
+                                   on_activate=lambda index: self.display_from_library())
+        self.preview.frame.pack(side="right", fill="y", padx=(5, 0))
 
         img_btn_frame = ttk.Frame(img_lib_frame)
         img_btn_frame.pack(pady=5)
@@ -100,11 +162,46 @@ class FreeWiliPresenter:
 
         ttk.Button(audio_btn_frame, text="Play Selected", command=self.play_from_library).pack(side="left", padx=5)
         ttk.Button(audio_btn_frame, text="Upload New...", command=self.upload_new_audio).pack(side="left", padx=5)
+        ttk.Button(audio_btn_frame, text="Stream Long Audio...", command=self.stream_audio).pack(side="left", padx=5)
         ttk.Button(audio_btn_frame, text="Remove from List", command=self.remove_audio).pack(side="left", padx=5)
 
         self.audio_status = ttk.Label(audio_lib_frame, text="")
         self.audio_status.pack()
 
+        # Slideshow frame
+        slide_frame = ttk.LabelFrame(self.root, text="Slideshow", padding=10)
+        slide_frame.pack(fill="x", padx=10, pady=5)
+
+        slide_btn_frame = ttk.Frame(slide_frame)
+        slide_btn_frame.pack(pady=5)
+
+        ttk.Button(slide_btn_frame, text="Load Playlist...", command=self.load_slideshow).pack(side="left", padx=5)
+        ttk.Button(slide_btn_frame, text="Preload All", command=self.preload_slideshow).pack(side="left", padx=5)
+        ttk.Button(slide_btn_frame, text="< Prev", command=self.prev_slide).pack(side="left", padx=5)
+        ttk.Button(slide_btn_frame, text="Next >", command=self.next_slide).pack(side="left", padx=5)
+        ttk.Checkbutton(slide_btn_frame, text="Rotate", variable=self.slide_rotate).pack(side="left", padx=5)
+
+        self.slide_status = ttk.Label(slide_frame, text="No playlist loaded (PageDown/PageUp or arrows to advance)")
+        self.slide_status.pack()
+
+        # Presentation clickers send PageDown/PageUp
+        for key in ("<Next>", "<Right>"):
+            self.root.bind(key, lambda e: self.next_slide())
+        for key in ("<Prior>", "<Left>"):
+            self.root.bind(key, lambda e: self.prev_slide())
+
+        # Jobs frame
+        jobs_frame = ttk.LabelFrame(self.root, text="Jobs", padding=10)
+        jobs_frame.pack(fill="x", padx=10, pady=5)
+
+        self.jobs_listbox = tk.Listbox(jobs_frame, height=4)
+        self.jobs_listbox.pack(fill="x", pady=5)
+
+        jobs_btn_frame = ttk.Frame(jobs_frame)
+        jobs_btn_frame.pack()
+        ttk.Button(jobs_btn_frame, text="Cancel Selected", command=self.cancel_selected_job).pack(side="left", padx=5)
+        ttk.Button(jobs_btn_frame, text="Cancel Pending", command=self.jobs.cancel_pending).pack(side="left", padx=5)
+
         # Info
         info_frame = ttk.Frame(self.root, padding=10)
         info_frame.pack(fill="x", padx=10, pady=5)
@@ -119,19 +216,59 @@ class FreeWiliPresenter:
         ttk.Button(test_frame, text="Upload Oscar", command=self.test_oscar).pack(side="left", padx=5)
         ttk.Button(test_frame, text="Upload Beep", command=self.test_beep).pack(side="left", padx=5)
 
+    def _pump_jobs(self):
+        """Run finished-job callbacks and refresh the job list, within one frame's budget"""
+        if self.jobs.pump():
+            self.jobs_listbox.delete(0, tk.END)
+            self._job_rows = self.jobs.jobs()
+            for job in self._job_rows:
+                self.jobs_listbox.insert(tk.END, str(job))
+        self.root.after(JOB_PUMP_MS, self._pump_jobs)
+
+    def cancel_selected_job(self):
+        selection = self.jobs_listbox.curselection()
+        if selection:
+            self.jobs.cancel(self._job_rows[selection[0]])
+
+    def _upload_file(self, job, path, target):
+        """Resumable, verified upload; an interrupted one continues where it stopped next time"""
+        uploader = ChunkedUploader(self.device, self.upload_journal, device_lock=self.jobs.device_lock,
+                                   event_cb=transfer_progress(job))
+        return uploader.upload(path, target, check=job.check)
+
     def connect_device(self):
+        """Find the badge on a worker thread; the window stays live meanwhile"""
+        if self.jobs.busy("Find badge"):
+            return
         self.status_label.config(text="Searching...", foreground="orange")
-        self.root.update()
-
-        devices = FreeWili.find_all()
-        if devices:
-            self.device = devices[0]
-            self.status_label.config(text=f"Connected: {self.device}", foreground="green")
+        self.jobs.submit("Find badge", self._find_device_job, priority=SCAN,
+                         on_done=self._device_found, on_error=self._device_error)
+
+    def _find_device_job(self, job):
+        from freewili import FreeWili
+        with self.jobs.device_lock:
+            devices = FreeWili.find_all()
+        return devices[0] if devices else None
+
+    def _device_found(self, device):
+        self.device = device
+        if device:
+            self.status_label.config(text=f"Connected: {device}", foreground="green")
             self._update_listboxes()
         else:
-            self.device = None
             self.status_label.config(text="No device found", foreground="red")
 
+    def _port_event(self, kind, port):
+        if kind == "remove" and self.device:
+            self.device = None
+            self.status_label.config(text=f"Badge unplugged ({port.device})", foreground="red")
+        elif kind == "add" and not self.device:
+            self.connect_device()
+
+    def _device_error(self, error):
+        self.device = None
+        self.status_label.config(text=f"Search failed: {str(error)[:30]}", foreground="red")
+
     def scan_badge_files(self):
         """Scan the badge filesystem via serial commands to find existing files"""
         if not self.device:
@@ -139,65 +276,13 @@ class FreeWiliPresenter:
             return
 
         self.status_label.config(text="Scanning badge...", foreground="blue")
-        threading.Thread(target=self._scan_badge_thread, daemon=True).start()
+        self.jobs.submit("Scan badge files", self._scan_badge_thread, priority=SCAN)
 
-    def _scan_badge_thread(self):
+    def _scan_badge_thread(self, job):
         """Try to list files via serial commands"""
         try:
-            # Use serial connection to list files
-            # File menu -> List files command
-            import serial
-            import time
-
-            # Find COM port
-            ports = list(serial.tools.list_ports.comports())
-            com_port = None
-            for port in ports:
-                if "Main Processor" in port.description or "USB Serial Device" in port.description:
-                    com_port = port.device
-                    break
-
-            if not com_port:
-                com_port = "COM4"  # Fallback
-
-            ser = serial.Serial(com_port, 115200, timeout=1)
-            time.sleep(0.5)
-
-            # Clear buffer
-            ser.reset_input_buffer()
-            ser.reset_output_buffer()
-
-            # Send file list command
-            ser.write(b'f\n')  # File menu
-            time.sleep(0.5)
-            ser.read(ser.in_waiting)  # Clear response
-
-            ser.write(b'l\n')  # List files
-            time.sleep(1.0)
-
-            # Read file list
-            response = ser.read(ser.in_waiting).decode('ascii', errors='ignore')
-            ser.close()
-
-            # Parse response for .fwi and .wav files
-            lines = response.split('\n')
-            found_images = []
-            found_audio = []
-
-            for line in lines:
-                if '.fwi' in line.lower():
-                    # Extract filename
-                    parts = line.strip().split()
-                    for part in parts:
-                        if '.fwi' in part.lower():
-                            found_images.append(part)
-                            break
-                elif '.wav' in line.lower():
-                    parts = line.strip().split()
-                    for part in parts:
-                        if '.wav' in part.lower():
-                            found_audio.append(part)
-                            break
+            # File menu -> List files on the main processor's port
+            found_images, found_audio = list_badge_files(self.jobs.device_lock)
 
             # Merge with existing cache (keep unique)
             for img in found_images:
@@ -224,17 +309,36 @@ class FreeWiliPresenter:
         self.image_listbox.delete(0, tk.END)
         for img in self.image_list:
             self.image_listbox.insert(tk.END, img)
+        self.preview.set_names(self.image_list)
 
         self.audio_listbox.delete(0, tk.END)
         for audio in self.audio_list:
             self.audio_listbox.insert(tk.END, audio)
 
+    def _thumbnail_source(self, name):
+        """Local file to draw a thumbnail from: the upload's source, else the .fwi left beside us"""
+        source = self.image_sources.get(name)
+        if source and pathlib.Path(source).exists():
+            return pathlib.Path(source)
+        fwi = pathlib.Path(name)
+        return fwi if fwi.exists() else None
+
+    def _image_selected(self, event):
+        selection = self.image_listbox.curselection()
+        self.preview.select(selection[0] if selection else None)
+
+    def _preview_selected(self, index):
+        self.image_listbox.selection_clear(0, tk.END)
+        self.image_listbox.selection_set(index)
+        self.image_listbox.see(index)
+
     def remove_image(self):
         """Remove selected image from library list (doesn't delete from badge)"""
         selection = self.image_listbox.curselection()
         if selection:
             filename = self.image_listbox.get(selection[0])
             self.image_list.remove(filename)
+            self.image_sources.pop(filename, None)
             self.save_cache()
             self._update_listboxes()
 
@@ -255,11 +359,12 @@ class FreeWiliPresenter:
 
         filename = self.image_listbox.get(selection[0])
         self.img_status.config(text=f"Displaying {filename}...", foreground="blue")
-        threading.Thread(target=self._display_existing, args=(filename,), daemon=True).start()
+        self.jobs.submit(f"Display {filename}", self._display_existing, filename, priority=INTERACTIVE)
 
-    def _display_existing(self, filename):
+    def _display_existing(self, job, filename):
         try:
-            result = self.device.show_gui_image(filename)
+            with self.jobs.device_lock:
+                result = self.device.show_gui_image(filename)
             if result.is_ok():
                 self.root.after(0, lambda: self.img_status.config(text=f"[OK] {filename}", foreground="green"))
             else:
@@ -276,12 +381,13 @@ class FreeWiliPresenter:
 
         filename = self.audio_listbox.get(selection[0])
         self.audio_status.config(text=f"Playing {filename}...", foreground="blue")
-        threading.Thread(target=self._play_existing, args=(filename,), daemon=True).start()
+        self.jobs.submit(f"Play {filename}", self._play_existing, filename, priority=INTERACTIVE)
 
-    def _play_existing(self, filename):
+    def _play_existing(self, job, filename):
         try:
             # Use API method that worked in v2
-            result = self.device.play_audio_file(filename)
+            with self.jobs.device_lock:
+                result = self.device.play_audio_file(filename)
 
             if result.is_ok():
                 self.root.after(0, lambda: self.audio_status.config(text=f"[OK] Playing {filename}", foreground="green"))
@@ -301,7 +407,7 @@ class FreeWiliPresenter:
             filetypes=[("Image files", "*.jpg *.jpeg *.png *.fwi"), ("All files", "*.*")]
         )
         if filename:
-            threading.Thread(target=self._upload_image_thread, args=(filename, True), daemon=True).start()
+            self._submit_image_upload(filename, True)
 
     def upload_new_image_no_rotate(self):
         filename = filedialog.askopenfilename(
@@ -309,9 +415,13 @@ class FreeWiliPresenter:
             filetypes=[("Image files", "*.jpg *.jpeg *.png *.fwi"), ("All files", "*.*")]
         )
         if filename:
-            threading.Thread(target=self._upload_image_thread, args=(filename, False), daemon=True).start()
+            self._submit_image_upload(filename, False)
 
-    def _upload_image_thread(self, img_path, rotate=True):
+    def _submit_image_upload(self, filename, rotate):
+        self.jobs.submit(f"Upload {pathlib.Path(filename).name}", self._upload_image_thread, filename, rotate,
+                         priority=BULK)
+
+    def _upload_image_thread(self, job, img_path, rotate=True):
         try:
             img_path = pathlib.Path(img_path)
 
@@ -324,53 +434,51 @@ class FreeWiliPresenter:
                 # Convert image to FWI
                 self.root.after(0, lambda: self.img_status.config(text="Converting...", foreground="blue"))
 
-                img = Image.open(img_path)
-                if rotate:
-                    img = img.transpose(Image.ROTATE_270)
-                img.thumbnail((320, 240), Image.Resampling.LANCZOS)
-
-                canvas = Image.new('RGB', (320, 240), (0, 0, 0))
-                x, y = (320 - img.width) // 2, (240 - img.height) // 2
-                canvas.paste(img, (x, y))
+                # Decoded at reduced size; big photos never load at full resolution
+                from fwi_encoder import encode_file
+                fwi_bytes = encode_file(img_path, rotate=rotate)
 
+                # send_file needs a path, so the encoded bytes are written exactly once
                 fwi_filename = img_path.stem + ".fwi"
-                temp_png = pathlib.Path("temp_convert.png")
-                canvas.save(temp_png)
-
                 fwi_path = pathlib.Path(fwi_filename)
-                convert_image(temp_png, fwi_path)
+                fwi_path.write_bytes(fwi_bytes)
 
+            # Last point where a cancel can still skip the transfer
+            job.check()
             self.root.after(0, lambda: self.img_status.config(text=f"Uploading {fwi_filename}..."))
 
-            # Try uploading to images directory first
-            result = self.device.send_file(fwi_path, f"images/{fwi_filename}", None)
-            if result.is_err():
-                # Try root directory as fallback
-                result = self.device.send_file(fwi_path, fwi_filename, None)
-
-            # Wait a moment for upload to complete
-            import time
-            time.sleep(0.5)
+            try:
+                upload = self._upload_file(job, fwi_path, f"images/{fwi_filename}")
+            except UploadError as e:
+                error_msg = str(e)[:50]  # Capture message immediately
+                self.root.after(0, lambda: self.img_status.config(
+                    text=f"Upload interrupted (retry resumes): {error_msg}", foreground="red"))
+                return
 
             self.root.after(0, lambda: self.img_status.config(text="Displaying..."))
 
-            # Display the newly uploaded image - try both paths
-            display_result = self.device.show_gui_image(fwi_filename)
-            if display_result.is_err():
-                # Try with images/ prefix
-                display_result = self.device.show_gui_image(f"images/{fwi_filename}")
+            with self.jobs.device_lock:
+                # Display the newly uploaded image - try both paths
+                display_result = self.device.show_gui_image(fwi_filename)
+                if display_result.is_err():
+                    # Try with images/ prefix
+                    display_result = self.device.show_gui_image(f"images/{fwi_filename}")
 
-            # Add to library and save cache
+            # Add to library (the upload was verified by read-back) and save cache
             if fwi_filename not in self.image_list:
                 self.image_list.append(fwi_filename)
+            self.image_sources[fwi_filename] = str(img_path.resolve())
+            self.thumbnails.forget(fwi_filename)
 
             # Save cache synchronously (not in root.after)
             self.save_cache()
 
             # Update UI
             self.root.after(0, self._update_listboxes)
-            self.root.after(0, lambda: self.img_status.config(text=f"[OK] Uploaded & displayed {fwi_filename}", foreground="green"))
+            self.root.after(0, lambda: self.img_status.config(text=f"[OK] Uploaded & displayed {fwi_filename}, {describe(upload)}", foreground="green"))
 
+        except JobCancelled:
+            self.root.after(0, lambda: self.img_status.config(text="Upload cancelled", foreground="orange"))
         except Exception as e:
             error_msg = str(e)[:50]  # Capture message immediately
             self.root.after(0, lambda: self.img_status.config(text=f"Error: {error_msg}", foreground="red"))
@@ -383,125 +491,101 @@ class FreeWiliPresenter:
             filetypes=[("WAV files", "*.wav"), ("All files", "*.*")]
         )
         if filename:
-            threading.Thread(target=self._upload_audio_thread, args=(filename,), daemon=True).start()
+            self._submit_audio_upload(filename)
+
+    def stream_audio(self):
+        """Play a whole WAV without the 3 second trim; it uploads in segments while it plays"""
+        if not self.device:
+            messagebox.showerror("Error", "No device connected!")
+            return
+        filename = filedialog.askopenfilename(
+            title="Select Audio to Stream",
+            filetypes=[("WAV files", "*.wav"), ("All files", "*.*")]
+        )
+        if filename:
+            self.jobs.submit(f"Stream {pathlib.Path(filename).name}", self._stream_audio_thread, filename,
+                             priority=BULK)
+
+    def _stream_audio_thread(self, job, audio_path):
+        from audio_stream import AudioStream, describe as describe_stream
+        try:
+            stream = AudioStream(self.device, self.jobs.device_lock, codecs=BADGE_AUDIO_CODECS,
+                                 min_rate=AUDIO_MIN_RATE,
+                                 on_status=lambda text: self.root.after(
+                                     0, lambda: self.audio_status.config(text=text, foreground="blue")))
+            result = stream.play(audio_path, check=job.check,
+                                 progress=lambda played, total: job.report(played / total, f"{played:.0f}s"))
+            self.root.after(0, lambda: self.audio_status.config(
+                text=f"[OK] Streamed {describe_stream(result)}", foreground="green"))
+        except JobCancelled:
+            self.root.after(0, lambda: self.audio_status.config(text="Stream stopped", foreground="orange"))
+        except Exception as e:
+            error_msg = str(e)[:50]  # Capture message immediately
+            self.root.after(0, lambda: self.audio_status.config(text=f"Error: {error_msg}", foreground="red"))
 
     def compress_audio(self, input_path, output_path, max_duration_sec=3):
-        """Compress WAV by trimming duration and downsampling to 8kHz mono"""
-        with wave.open(str(input_path), 'rb') as wav_in:
-            params = wav_in.getparams()
-
-            # Trim to max duration
-            max_frames = int(params.framerate * max_duration_sec)
-            frames_to_read = min(params.nframes, max_frames)
-            frames = wav_in.readframes(frames_to_read)
-
-        # Downsample to 8kHz
-        new_rate = 8000
-        sample_width = params.sampwidth
-        num_channels = params.nchannels
-
-        # Calculate downsampling ratio
-        ratio = params.framerate / new_rate
-        bytes_per_frame = sample_width * num_channels
-
-        # Downsample by taking every Nth frame
-        new_samples = []
-        num_original_frames = len(frames) // bytes_per_frame
-
-        for i in range(int(num_original_frames / ratio)):
-            # Get source frame index
-            src_frame_idx = int(i * ratio)
-            src_byte_idx = src_frame_idx * bytes_per_frame
-
-            # Extract one frame
-            frame = frames[src_byte_idx:src_byte_idx + bytes_per_frame]
-
-            if len(frame) == bytes_per_frame:
-                # If stereo, convert to mono by taking first channel
-                if num_channels == 2:
-                    # Take just the first channel (left)
-                    mono_sample = frame[:sample_width]
-                    new_samples.append(mono_sample)
-                else:
-                    new_samples.append(frame)
-
-        # Write compressed file
-        with wave.open(str(output_path), 'wb') as wav_out:
-            wav_out.setnchannels(1)  # Always mono
-            wav_out.setsampwidth(sample_width)
-            wav_out.setframerate(new_rate)
-            wav_out.writeframes(b''.join(new_samples))
-
-        return pathlib.Path(output_path).stat().st_size / 1024
-
-    def _upload_audio_thread(self, audio_path):
+        """Transcode WAV to the smallest mono format the badge can play, trimmed to max duration"""
+        from audio_transcode import transcode
+        return transcode(input_path, output_path, max_duration=max_duration_sec,
+                         codecs=BADGE_AUDIO_CODECS, min_rate=AUDIO_MIN_RATE)
+
+    def _submit_audio_upload(self, filename):
+        self.jobs.submit(f"Upload {pathlib.Path(filename).name}", self._upload_audio_thread, filename,
+                         priority=BULK)
+
+    def _upload_audio_thread(self, job, audio_path):
         try:
             audio_path = pathlib.Path(audio_path)
 
             self.root.after(0, lambda: self.audio_status.config(text="Checking audio format...", foreground="blue"))
 
-            # Check and trim audio
+            # Trim to 3 seconds and transcode to a compact badge format
             trimmed_filename = audio_path.stem + "_trim.wav"
             trimmed_path = pathlib.Path(trimmed_filename)
 
-            # Just trim to 3 seconds, keep original format
             try:
-                with wave.open(str(audio_path), 'rb') as wav_in:
-                    params = wav_in.getparams()
-
-                    # Log format info
-                    print(f"Audio format: {params.nchannels}ch, {params.framerate}Hz, {params.sampwidth*8}bit, {params.nframes} frames")
-
-                    # Read only first 3 seconds (or less if file is shorter)
-                    max_frames = int(params.framerate * 3)
-                    try:
-                        frames = wav_in.readframes(max_frames)
-                    except Exception:
-                        # If reading fails, read whatever we can
-                        wav_in.rewind()
-                        frames = wav_in.readframes(wav_in.getnframes())
-
-                # Write trimmed file - set params individually to avoid invalid nframes
-                with wave.open(str(trimmed_path), 'wb') as wav_out:
-                    wav_out.setnchannels(params.nchannels)
-                    wav_out.setsampwidth(params.sampwidth)
-                    wav_out.setframerate(params.framerate)
-                    # Don't set nframes - let it be calculated from written data
-                    wav_out.writeframes(frames)
-
+                converted = self.compress_audio(audio_path, trimmed_path, max_duration_sec=3)
+                print(f"Audio format: {converted.format.name}, {converted.duration:.2f}s, "
+                      f"{converted.in_bytes} -> {converted.out_bytes} bytes")
             except Exception as e:
                 error_msg = str(e)[:50]  # Capture message immediately
                 self.root.after(0, lambda: self.audio_status.config(
                     text=f"Error: {error_msg}", foreground="red"))
                 return
 
-            file_size_kb = trimmed_path.stat().st_size / 1024
+            job.check()
+            file_size_kb = converted.out_bytes / 1024
             self.root.after(0, lambda: self.audio_status.config(
-                text=f"Uploading {file_size_kb:.0f}KB ({params.nchannels}ch {params.framerate}Hz)..."))
+                text=f"Uploading {file_size_kb:.0f}KB ({converted.format.name})..."))
 
-            try:
-                devices = FreeWili.find_all()
-                if devices:
-                    self.device = devices[0]
-            except:
-                pass
+            with self.jobs.device_lock:
+                try:
+                    from freewili import FreeWili
+                    devices = FreeWili.find_all()
+                    if devices:
+                        self.device = devices[0]
+                except:
+                    pass
 
-            # Use v3's working approach: send_file with None for target path
-            result = self.device.send_file(trimmed_path, None, None)
-
-            # Wait for upload to complete
-            import time
-            time.sleep(0.5)
+            try:
+                # No target: the uploader routes .wav files to /sounds like send_file does
+                upload = self._upload_file(job, trimmed_path, None)
+            except UploadError as e:
+                error_msg = str(e)[:50]  # Capture message immediately
+                self.root.after(0, lambda: self.audio_status.config(
+                    text=f"Upload interrupted (retry resumes): {error_msg}", foreground="red"))
+                return
 
             self.root.after(0, lambda: self.audio_status.config(text="Playing..."))
 
-            # Play using the filename from the path (v3 approach)
-            try:
-                play_result = self.device.play_audio_file(trimmed_path.name)
-                if play_result.is_ok():
-                    self.root.after(0, lambda: self.audio_status.config(text="[OK] Playing!", foreground="green"))
-            except Exception as play_err:
-                print(f"Playback error: {play_err}")
+            with self.jobs.device_lock:
+                # Play using the filename from the path (v3 approach)
+                try:
+                    play_result = self.device.play_audio_file(trimmed_path.name)
+                    if play_result.is_ok():
+                        self.root.after(0, lambda: self.audio_status.config(text="[OK] Playing!", foreground="green"))
+                except Exception as play_err:
+                    print(f"Playback error: {play_err}")
 
             # Add to library with the actual filename
             actual_filename = trimmed_path.name
@@ -513,25 +597,118 @@ class FreeWiliPresenter:
 
             # Update UI
             self.root.after(0, self._update_listboxes)
-            self.root.after(0, lambda: self.audio_status.config(text=f"[OK] Uploaded & played {actual_filename}", foreground="green"))
+            self.root.after(0, lambda: self.audio_status.config(text=f"[OK] Uploaded & played {actual_filename}, {describe(upload)}", foreground="green"))
 
+        except JobCancelled:
+            self.root.after(0, lambda: self.audio_status.config(text="Upload cancelled", foreground="orange"))
         except Exception as e:
             error_msg = str(e)[:50]  # Capture message immediately
             self.root.after(0, lambda: self.audio_status.config(text=f"Error: {error_msg}", foreground="red"))
             import traceback
             traceback.print_exc()
 
+    def load_slideshow(self):
+        """Load an ordered playlist (a playlist file or several images) and start prefetching"""
+        if not self.device:
+            messagebox.showerror("Error", "No device connected!")
+            return
+
+        filenames = filedialog.askopenfilenames(
+            title="Select Slides or Playlist",
+            filetypes=[("Slides", "*.jpg *.jpeg *.png *.fwi *.txt *.m3u"), ("All files", "*.*")]
+        )
+        if not filenames:
+            return
+
+        if len(filenames) == 1 and pathlib.Path(filenames[0]).suffix.lower() in PLAYLIST_SUFFIXES:
+            sources = load_playlist(filenames[0])
+        else:
+            sources = list(filenames)
+
+        # A prefetch for the previous playlist is no longer useful
+        for job in self.jobs.jobs():
+            if job.title == "Prefetch slides":
+                self.jobs.cancel(job)
+        self.slideshow = Slideshow(
+            self.device, sources, on_badge=self.image_sources, rotate=self.slide_rotate.get(),
+            device_lock=self.jobs.device_lock,
+            upload=lambda path, target: ChunkedUploader(
+                self.device, self.upload_journal, device_lock=self.jobs.device_lock).upload(path, target),
+            on_status=lambda text: self.root.after(0, lambda: self._set_slide_status(text)),
+            on_uploaded=self._slide_uploaded)
+
+        missing = len(self.slideshow.missing())
+        self.slide_status.config(
+            text=f"{len(self.slideshow)} slides, {missing} to upload (prefetching)", foreground="blue")
+        self.jobs.submit("Prefetch slides", self._preload_thread, self.slideshow, priority=BULK)
+
+    def preload_slideshow(self):
+        if not self.slideshow:
+            messagebox.showwarning("No Playlist", "Load a playlist first")
+            return
+        if self.jobs.busy("Prefetch slides"):
+            return
+        self.slide_status.config(text="Preloading all slides...", foreground="blue")
+        self.jobs.submit("Prefetch slides", self._preload_thread, self.slideshow, priority=BULK)
+
+    def _preload_thread(self, job, slideshow):
+        failed = slideshow.prefetch(
+            check=job.check, progress=lambda done, total: job.report(done / total, f"{done}/{total}"))
+        if failed:
+            names = ", ".join(s.name for s in failed)[:50]
+            self.root.after(0, lambda: self.slide_status.config(text=f"Not uploaded: {names}", foreground="red"))
+        else:
+            self.root.after(0, lambda: self.slide_status.config(
+                text=f"[OK] All {len(slideshow)} slides on badge - ready", foreground="green"))
+
+    def next_slide(self):
+        if self.slideshow and len(self.slideshow):
+            self.jobs.submit("Next slide", self._show_slide, self.slideshow.next, priority=INTERACTIVE)
+
+    def prev_slide(self):
+        if self.slideshow and len(self.slideshow):
+            self.jobs.submit("Previous slide", self._show_slide, self.slideshow.prev, priority=INTERACTIVE)
+
+    def _show_slide(self, job, advance):
+        try:
+            result = advance()
+            slide = self.slideshow.current
+            text = f"Slide {self.slideshow.position + 1}/{len(self.slideshow)}: {slide.name}"
+            color = "green" if result.is_ok() else "orange"
+            self.root.after(0, lambda: self.slide_status.config(text=text, foreground=color))
+        except Exception as e:
+            error_msg = str(e)[:50]  # Capture message immediately
+            self.root.after(0, lambda: self.slide_status.config(text=f"Error: {error_msg}", foreground="red"))
+
+    def _set_slide_status(self, text):
+        self.slide_status.config(text=text, foreground="blue")
+
+    def _slide_uploaded(self, name):
+        for slide in self.slideshow.slides:
+            if slide.name == name:
+                self.image_sources[name] = str(slide.source.resolve())
+        if name not in self.image_list:
+            self.image_list.append(name)
+        self.save_cache()
+        self.root.after(0, self._update_listboxes)
+
     def test_oscar(self):
         oscar = pathlib.Path(r"D:\CODE\freewili\oscar.jpg")
         if oscar.exists():
-            threading.Thread(target=self._upload_image_thread, args=(str(oscar), True), daemon=True).start()
+            self._submit_image_upload(str(oscar), True)
 
     def test_beep(self):
         beep = pathlib.Path(r"D:\CODE\freewili\test_beep.wav")
         if beep.exists():
-            threading.Thread(target=self._upload_audio_thread, args=(str(beep),), daemon=True).start()
+            self._submit_audio_upload(str(beep))
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="FreeWili Presenter")
+    parser.add_argument("--api", type=int, metavar="PORT", help="Also serve the HTTP/WebSocket API on this port")
+    args = parser.parse_args()
+
     root = tk.Tk()
     app = FreeWiliPresenter(root)
+    if args.api:
+        app.start_api(args.api)
     root.mainloop()
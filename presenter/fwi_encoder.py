@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+In-memory FreeWili image (.fwi) encoder
+
+Takes a PIL image or an RGB/RGBA array and returns the FWI file as bytes:
+letterboxing and RGB565 packing are NumPy array operations (rotation too, for
+array input), with no temporary PNG and no read-back. Output is byte-identical to
+freewili.image.convert on the same canvas.
+
+Image files go through open_scaled, which never holds the full-size photo:
+JPEGs are decoded at reduced resolution (draft mode), everything is shrunk
+before the EXIF orientation and the rotation are applied, and those turns
+then only move the small image.
+
+FWI layout (little-endian header, big-endian pixels):
+    char[8]  "FW01IMG\\0"
+    uint32   flags (1 = transparent colour 0)
+    uint32   total pixel count
+    uint16   width, height
+    uint16   transparent colour (0), image id (0)
+    uint16   RGB565 pixels, row major
+
+Usage:
+    python fwi_encoder.py photo.jpg [out.fwi] [--no-rotate]
+"""
+import argparse
+import pathlib
+import struct
+import sys
+import time
+
+import numpy as np
+from PIL import Image, ImageOps
+
+FWI_MAGIC = b"FW01IMG\0"
+FWI_FLAG_TRANSPARENT = 1
+SCREEN_SIZE = (320, 240)
+EXIF_ORIENTATION = 0x0112
+# Reduce with a cheap box filter down to this multiple of the target, then LANCZOS
+REDUCING_GAP = 2.0
+
+
+def fwi_header(width, height, flags=FWI_FLAG_TRANSPARENT):
+    """Build the 24-byte FWI header"""
+    return struct.pack('<8sIIhhhh', FWI_MAGIC, flags, width * height, width, height, 0, 0)
+
+
+def to_array(image):
+    """Return an (H, W, 3|4) uint8 array for a PIL image or array-like"""
+    if isinstance(image, Image.Image):
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+        return np.asarray(image)
+    pixels = np.asarray(image, dtype=np.uint8)
+    if pixels.ndim == 2:
+        pixels = np.repeat(pixels[:, :, None], 3, axis=2)
+    return pixels
+
+
+def fit(image, size=SCREEN_SIZE, rotate=False):
+    """Rotate 90 degrees clockwise (optional) and shrink to fit size; returns an array"""
+    if isinstance(image, Image.Image):
+        # Large decoded images stay inside PIL so the full-size frame is never copied
+        if rotate:
+            image = image.transpose(Image.ROTATE_270)
+        if image.width > size[0] or image.height > size[1]:
+            image.thumbnail(size, Image.Resampling.LANCZOS)
+        return to_array(image)
+
+    pixels = to_array(image)
+    if rotate:
+        pixels = np.rot90(pixels, k=-1)
+    if pixels.shape[1] > size[0] or pixels.shape[0] > size[1]:
+        # Resampling stays in PIL; it is the only non-array step
+        image = Image.fromarray(np.ascontiguousarray(pixels))
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+        pixels = np.asarray(image)
+    return pixels
+
+
+def letterbox(pixels, size=SCREEN_SIZE):
+    """Centre an array on a black canvas of the given size"""
+    width, height = size
+    canvas = np.zeros((height, width, pixels.shape[2]), dtype=np.uint8)
+    if pixels.shape[2] == 4:
+        # Padding is opaque black, like the RGB canvas the presenter used to paste onto
+        canvas[:, :, 3] = 255
+    y = (height - pixels.shape[0]) // 2
+    x = (width - pixels.shape[1]) // 2
+    canvas[y:y + pixels.shape[0], x:x + pixels.shape[1]] = pixels
+    return canvas
+
+
+def rgb565(pixels):
+    """Pack (H, W, 3|4) uint8 pixels into big-endian RGB565 words; alpha 0 becomes colour 0"""
+    channels = pixels[:, :, :3].astype(np.uint32)
+    # Same truncating scale as freewili.image.convert (int(c / 255 * max))
+    r = channels[:, :, 0] * 31 // 255
+    g = channels[:, :, 1] * 63 // 255
+    b = channels[:, :, 2] * 31 // 255
+    words = (r << 11) | (g << 5) | b
+    if pixels.shape[2] == 4:
+        words[pixels[:, :, 3] == 0] = 0
+    return words.astype('>u2')
+
+
+def encode_fwi(image, size=SCREEN_SIZE, rotate=False):
+    """Encode an image as FWI bytes; size=None keeps the image's own dimensions"""
+    if size is not None:
+        pixels = letterbox(fit(image, size, rotate), size)
+    else:
+        pixels = to_array(image)
+        if rotate:
+            pixels = np.rot90(pixels, k=-1)
+    height, width = pixels.shape[:2]
+    return fwi_header(width, height) + rgb565(pixels).tobytes()
+
+
+def decode_fwi(data):
+    """(H, W, 3) uint8 pixels of FWI bytes; ValueError if it is not an FWI image"""
+    if len(data) < 24:
+        raise ValueError("not an FWI image")
+    magic, _, count, width, height, _, _ = struct.unpack_from('<8sIIhhhh', data)
+    if magic != FWI_MAGIC or count != width * height or width <= 0 or len(data) < 24 + 2 * count:
+        raise ValueError("not an FWI image")
+    words = np.frombuffer(data, dtype='>u2', count=count, offset=24).reshape(height, width).astype(np.uint32)
+    return np.dstack([(words >> 11) * 255 // 31, ((words >> 5) & 63) * 255 // 63, (words & 31) * 255 // 31]
+                     ).astype(np.uint8)
+
+
+def open_scaled(source, size=SCREEN_SIZE, rotate=False):
+    """Decode an image file to fit size, upright per its EXIF orientation and optionally rotated.
+
+    The turns happen after shrinking, so the box is worked out in the file's
+    stored orientation first. thumbnail() sets JPEG draft mode before
+    anything is decoded, so a 48 MP photo is read at 1/8 scale and never
+    exists at full size.
+    """
+    with Image.open(source) as img:
+        box = size
+        if rotate:
+            box = (box[1], box[0])
+        if img.getexif().get(EXIF_ORIENTATION, 1) in (5, 6, 7, 8):
+            # Stored on its side: the orientation turn swaps width and height
+            box = (box[1], box[0])
+        img.thumbnail(box, Image.Resampling.LANCZOS, reducing_gap=REDUCING_GAP)
+        img = ImageOps.exif_transpose(img)
+    if rotate:
+        img = img.transpose(Image.ROTATE_270)
+    return img
+
+
+def encode_file(source, size=SCREEN_SIZE, rotate=False):
+    """Encode an image file as FWI bytes through the low-memory open_scaled path"""
+    return encode_fwi(open_scaled(source, size, rotate), size)
+
+
+def convert_file(source, output=None, rotate=False):
+    """Encode an image file to FWI and write it; returns the output path"""
+    source = pathlib.Path(source)
+    output = pathlib.Path(output) if output else source.with_suffix(".fwi")
+    output.write_bytes(encode_file(source, rotate=rotate))
+    return output
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far, in MB (None where unavailable)"""
+    try:
+        # Linux: the high-water mark of this program image (ru_maxrss survives fork + exec)
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert an image to a FreeWili .fwi file")
+    parser.add_argument("input", help="Source image (JPG, PNG, ...)")
+    parser.add_argument("output", nargs="?", help="Destination .fwi (default: <input>.fwi)")
+    parser.add_argument("--no-rotate", action="store_true", help="Don't rotate 90 degrees clockwise")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    output = convert_file(args.input, args.output, rotate=not args.no_rotate)
+    elapsed = time.perf_counter() - start
+    peak = peak_rss_mb()
+    print(f"{args.input} -> {output} ({elapsed * 1000:.0f} ms"
+          + (f", peak RSS {peak:.0f} MB)" if peak is not None else ")"))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,308 @@
+"""
+Bounded job scheduler for presenter work
+
+Every button used to start its own thread, so a burst of clicks meant a burst
+of concurrent uploads on one serial port. JobScheduler runs all background
+work on a fixed pool of worker threads, keeps a visible queue, lets pending
+jobs be cancelled and gives each job a progress value and message.
+
+Callbacks (on_done / on_error) never run on a worker: they are queued and
+executed by pump(), which the UI calls from its own event loop with a small
+time budget so the window keeps responding whatever is in flight.
+watch() is the exception for headless callers: its callbacks run on the
+thread that changed the job and must return quickly.
+
+Device calls from different jobs must hold device_lock, so only one command
+is on the serial link at a time while file conversion and other CPU work
+run in parallel.
+
+Each job has a priority class: INTERACTIVE (display, play, slide changes),
+SCAN (discovery and file listings) or BULK (uploads, prefetch). Queued jobs
+start in class order, one worker only takes interactive jobs, and
+device_lock hands the link to the most urgent waiter whenever it is
+released. Uploads release it between parts, so a slide change waits at most
+one part's transfer time.
+"""
+import heapq
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+INTERACTIVE = 0
+SCAN = 1
+BULK = 2
+PRIORITY_NAMES = {INTERACTIVE: "interactive", SCAN: "scan", BULK: "bulk"}
+
+
+class JobCancelled(Exception):
+    """Raised inside a job that was cancelled while running"""
+
+
+class DeviceLock:
+    """Reentrant lock on the badge link, granted by priority class.
+
+    On release the most urgent waiter gets the link, first come first served
+    within a class, so a bulk job that re-acquires between parts cannot keep
+    it from a waiting display command. Plain `with lock:` uses the class of
+    the job running on the calling thread (BULK outside a job).
+    """
+
+    def __init__(self, history=100):
+        self._cond = threading.Condition()
+        self._owner = None
+        self._depth = 0
+        self._waiting = []
+        self._tickets = itertools.count()
+        self._local = threading.local()
+        self._waits = {priority: deque(maxlen=history) for priority in PRIORITY_NAMES}
+
+    def set_priority(self, priority):
+        """Class used by this thread's acquires that don't name one"""
+        self._local.priority = priority
+
+    def acquire(self, priority=None):
+        me = threading.get_ident()
+        with self._cond:
+            if self._owner == me:
+                self._depth += 1
+                return True
+            if priority is None:
+                priority = getattr(self._local, "priority", BULK)
+            ticket = (priority, next(self._tickets))
+            heapq.heappush(self._waiting, ticket)
+            start = time.perf_counter()
+            while self._owner is not None or self._waiting[0] != ticket:
+                self._cond.wait()
+            heapq.heappop(self._waiting)
+            self._owner = me
+            self._depth = 1
+            self._waits[priority].append(time.perf_counter() - start)
+            return True
+
+    def release(self):
+        with self._cond:
+            if self._owner != threading.get_ident():
+                raise RuntimeError("device lock released by a thread that does not hold it")
+            self._depth -= 1
+            if not self._depth:
+                self._owner = None
+                self._cond.notify_all()
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def wait_stats(self):
+        """{class name: (acquires, mean wait, longest wait)} over recent acquires, in seconds"""
+        with self._cond:
+            return {PRIORITY_NAMES[priority]: (len(waits), sum(waits) / len(waits), max(waits))
+                    for priority, waits in self._waits.items() if waits}
+
+
+class Job:
+    def __init__(self, job_id, title, func, args, on_done, on_error, scheduler, priority=BULK):
+        self.id = job_id
+        self.title = title
+        self.priority = priority
+        self.func = func
+        self.args = args
+        self.on_done = on_done
+        self.on_error = on_error
+        self.state = PENDING
+        self.progress = None
+        self.message = ""
+        self._scheduler = scheduler
+        self._cancel = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check(self):
+        """Raise JobCancelled if the job was cancelled; call between steps"""
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def report(self, progress=None, message=None):
+        """Update progress (0.0-1.0) and/or the status message; safe from any thread"""
+        if progress is not None:
+            self.progress = max(0.0, min(1.0, progress))
+        if message is not None:
+            self.message = message
+        self._scheduler._touch(self)
+
+    def __str__(self):
+        state = self.state
+        if self.state == RUNNING and self.progress is not None:
+            state = f"{self.progress * 100:.0f}%"
+        if self.state == RUNNING and self.cancelled:
+            state = "cancelling"
+        text = f"#{self.id} {self.title} [{state}]"
+        return f"{text} {self.message}" if self.message else text
+
+
+class JobScheduler:
+    def __init__(self, workers=2, history=5, interactive_workers=1):
+        self.device_lock = DeviceLock()
+        self._cond = threading.Condition()
+        self._pending = []
+        self._running = []
+        self._finished = deque(maxlen=history)
+        self._callbacks = queue.Queue()
+        self._ids = itertools.count(1)
+        self._version = 0
+        self._seen_version = -1
+        self._stopped = False
+        self._watchers = []
+        # The reserved workers keep a display click from queueing behind uploads
+        self._workers = [threading.Thread(target=self._worker, args=(i < interactive_workers,), daemon=True)
+                         for i in range(workers + interactive_workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, title, func, *args, on_done=None, on_error=None, priority=BULK):
+        """Queue func(job, *args); on_done(result) / on_error(exc) run on the UI thread"""
+        with self._cond:
+            job = Job(next(self._ids), title, func, args, on_done, on_error, self, priority)
+            self._pending.append(job)
+            self._pending.sort(key=lambda queued: (queued.priority, queued.id))
+            self._version += 1
+            self._cond.notify_all()
+        self._notify(job)
+        return job
+
+    def watch(self, callback):
+        """Call callback(job) whenever a job is queued, starts, reports progress or ends"""
+        self._watchers.append(callback)
+
+    def cancel(self, job):
+        """Drop a pending job, or ask a running one to stop at its next check()"""
+        with self._cond:
+            if job in self._pending:
+                self._pending.remove(job)
+                job.state = CANCELLED
+                self._finished.append(job)
+            elif job.state == RUNNING:
+                job._cancel.set()
+            self._version += 1
+        self._notify(job)
+
+    def cancel_pending(self):
+        with self._cond:
+            cancelled = self._pending
+            for job in cancelled:
+                job.state = CANCELLED
+                self._finished.append(job)
+            self._pending = []
+            self._version += 1
+        for job in cancelled:
+            self._notify(job)
+
+    def jobs(self):
+        """Snapshot: running, then pending in start order, then recently finished"""
+        with self._cond:
+            return list(self._running) + list(self._pending) + list(reversed(self._finished))
+
+    def busy(self, title):
+        """True if a job with this title is running or queued"""
+        with self._cond:
+            return any(job.title == title for job in itertools.chain(self._running, self._pending))
+
+    def pump(self, budget=0.008):
+        """Run queued callbacks on the calling thread for at most budget seconds.
+
+        Returns True if the job list changed since the previous pump.
+        """
+        deadline = time.perf_counter() + budget
+        while time.perf_counter() < deadline:
+            try:
+                callback, value = self._callbacks.get_nowait()
+            except queue.Empty:
+                break
+            # One bad callback must not stop the pump; the UI relies on it for the rest of the session
+            try:
+                callback(value)
+            except Exception:
+                import traceback
+                traceback.print_exc()
+
+        with self._cond:
+            changed = self._version != self._seen_version
+            self._seen_version = self._version
+        return changed
+
+    def shutdown(self):
+        self.cancel_pending()
+        with self._cond:
+            self._stopped = True
+            for job in self._running:
+                job._cancel.set()
+            self._cond.notify_all()
+
+    def _touch(self, job=None):
+        with self._cond:
+            self._version += 1
+        if job:
+            self._notify(job)
+
+    def _notify(self, job):
+        for callback in self._watchers:
+            try:
+                callback(job)
+            except Exception:
+                import traceback
+                traceback.print_exc()
+
+    def _next_job(self, interactive_only):
+        if self._pending and (not interactive_only or self._pending[0].priority == INTERACTIVE):
+            return self._pending.pop(0)
+        return None
+
+    def _worker(self, interactive_only=False):
+        while True:
+            with self._cond:
+                job = None
+                while not self._stopped:
+                    job = self._next_job(interactive_only)
+                    if job:
+                        break
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                job.state = RUNNING
+                self._running.append(job)
+                self._version += 1
+            self._notify(job)
+
+            self.device_lock.set_priority(job.priority)
+            try:
+                result = job.func(job, *job.args)
+                job.state = DONE
+                if job.on_done:
+                    self._callbacks.put((job.on_done, result))
+            except JobCancelled:
+                job.state = CANCELLED
+            except Exception as e:
+                job.state = FAILED
+                job.message = str(e)[:50]
+                if job.on_error:
+                    self._callbacks.put((job.on_error, e))
+                else:
+                    import traceback
+                    traceback.print_exc()
+
+            with self._cond:
+                self._running.remove(job)
+                self._finished.append(job)
+                self._version += 1
+            self._notify(job)
@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+"""
+Headless HTTP/WebSocket API for the presenter
+
+Drives a badge without the window, for stage cues, scoreboards and other
+automation. Every request becomes a job on one BadgeSession
+(badge_session.py), so requests queue on a single device session in the
+same priority classes as the GUI's buttons: display and play first, then
+scans, then uploads. Run it on its own, or start the presenter with --api
+to serve its session while the window is open.
+
+Standard library only: a small HTTP/1.1 server on asyncio with keep-alive,
+and a WebSocket at /events that pushes every job change.
+
+Web pages open in the presenter's browser can reach 127.0.0.1 too, so
+every request needs a local Host (127.0.0.1, localhost or [::1], which also
+stops DNS rebinding), and a request carrying a browser Origin is refused
+unless that origin is local. JSON bodies need Content-Type: application/json,
+which a page can't send to another origin without the browser asking first.
+
+Endpoints (JSON in and out; add ?wait=0 to get the job id back at once):
+    GET  /library                                   images and audio on the badge
+    GET  /jobs                                      running, queued and recent jobs
+    POST /display/text   {"text": "Hello"}
+    POST /display/image  {"name": "oscar.fwi"}
+    POST /play           {"name": "test_beep_trim.wav"}
+    POST /scan                                      refresh the library from the badge
+    POST /upload?name=oscar.jpg[&rotate=0][&show=0] raw file bytes as the body,
+         or {"path": "/local/file.jpg"}             a file on this machine
+    POST /stream?name=talk.wav                      play a WAV of any length while it uploads
+    POST /jobs/<id>/cancel
+    GET  /events                                    WebSocket: {"job": 3, "state": "running", ...}
+
+Usage:
+    python presenter_api.py [--host 127.0.0.1] [--port 8765]
+    python presenter_api.py --bench [--requests 200]    # overhead against a stand-in badge
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import pathlib
+import struct
+import sys
+import threading
+import time
+import urllib.parse
+from http import HTTPStatus
+
+from badge_session import PRIORITIES, BadgeSession, CommandFailed, Library, NoDevice
+from chunked_upload import UploadError, UploadJournal
+from jobs import CANCELLED, JobCancelled
+
+HOST = "127.0.0.1"
+PORT = 8765
+MAX_BODY = 64 * 1024 * 1024
+UPLOAD_DIR = pathlib.Path("freewili_api_uploads")
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+LOCAL_HOSTS = ("127.0.0.1", "localhost", "::1")
+
+# Exception -> HTTP status; anything else is a 500
+ERROR_STATUS = [
+    (ValueError, HTTPStatus.BAD_REQUEST),
+    (JobCancelled, HTTPStatus.CONFLICT),
+    (NoDevice, HTTPStatus.SERVICE_UNAVAILABLE),
+    (CommandFailed, HTTPStatus.BAD_GATEWAY),
+    (UploadError, HTTPStatus.BAD_GATEWAY),
+]
+
+
+def job_event(job):
+    return {"job": job.id, "title": job.title, "state": job.state, "progress": job.progress,
+            "message": job.message}
+
+
+def host_name(value):
+    """Host name from a Host header or an Origin's netloc, without port or IPv6 brackets"""
+    value = value.strip().lower()
+    if value.startswith("["):
+        return value[1:value.find("]")] if "]" in value else value[1:]
+    return value.rpartition(":")[0] if value.count(":") == 1 else value
+
+
+def _settle(future, value, error):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(value)
+
+
+def ws_frame(text):
+    """A server-to-client WebSocket text frame (never masked)"""
+    data = text.encode()
+    if len(data) < 126:
+        header = struct.pack("!BB", 0x81, len(data))
+    elif len(data) < 65536:
+        header = struct.pack("!BBH", 0x81, 126, len(data))
+    else:
+        header = struct.pack("!BBQ", 0x81, 127, len(data))
+    return header + data
+
+
+async def ws_read(reader):
+    """(opcode, payload) of the next client frame; client frames are always masked"""
+    first, second = await reader.readexactly(2)
+    length = second & 0x7F
+    if length == 126:
+        length, = struct.unpack("!H", await reader.readexactly(2))
+    elif length == 127:
+        length, = struct.unpack("!Q", await reader.readexactly(8))
+    mask = await reader.readexactly(4) if second & 0x80 else b"\0\0\0\0"
+    payload = bytearray(await reader.readexactly(length))
+    for i in range(length):
+        payload[i] ^= mask[i % 4]
+    return first & 0x0F, bytes(payload)
+
+
+class PresenterAPI:
+    """HTTP and WebSocket front end for a BadgeSession.
+
+    pump=True drains the scheduler's callback queue on the server's loop;
+    leave it off when a GUI is already pumping the same scheduler.
+    """
+
+    def __init__(self, session, host=HOST, port=PORT, pump=True, upload_dir=UPLOAD_DIR):
+        self.session = session
+        self.host = host
+        self.port = port
+        self.pump = pump
+        self.upload_dir = pathlib.Path(upload_dir)
+        self.loop = None
+        self._server = None
+        self._waiting = {}
+        self._sockets = set()
+        session.jobs.watch(self._job_changed)
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._connection, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        if self.pump:
+            self.loop.create_task(self._pump())
+        return self
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"Presenter API on http://{self.host}:{self.port}/ (events: ws://{self.host}:{self.port}/events)")
+        async with self._server:
+            await self._server.serve_forever()
+
+    def start_in_thread(self):
+        """Serve on a daemon thread with its own event loop, e.g. next to the Tk main loop"""
+        started = threading.Event()
+
+        def run():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self.start())
+            started.set()
+            loop.run_forever()
+
+        threading.Thread(target=run, daemon=True).start()
+        started.wait()
+        return self
+
+    async def _pump(self):
+        while True:
+            self.session.jobs.pump()
+            await asyncio.sleep(0.05)
+
+    # Jobs
+
+    def submit(self, operation, title, *args):
+        """Queue a session operation; returns (job, future resolved on the event loop)"""
+        future = self.loop.create_future()
+        func = getattr(self.session, operation)
+
+        def run(job, *args):
+            try:
+                value = func(job, *args)
+            except BaseException as e:
+                self.loop.call_soon_threadsafe(_settle, future, None, e)
+                raise
+            self.loop.call_soon_threadsafe(_settle, future, value, None)
+            return value
+
+        # on_error swallows the traceback the scheduler would print; the caller gets the error
+        job = self.session.jobs.submit(title, run, *args, priority=PRIORITIES[operation],
+                                       on_error=lambda error: None)
+        self._waiting[job.id] = future
+        future.add_done_callback(lambda _: self._waiting.pop(job.id, None))
+        return job, future
+
+    def _job_changed(self, job):
+        """Scheduler watcher: runs on whichever thread changed the job"""
+        if self.loop:
+            self.loop.call_soon_threadsafe(self._publish, job, job_event(job))
+
+    def _publish(self, job, event):
+        # A job cancelled before it started never runs, so nothing else settles its future
+        if job.state == CANCELLED and job.id in self._waiting:
+            _settle(self._waiting[job.id], None, JobCancelled())
+        frame = ws_frame(json.dumps(event))
+        for writer in list(self._sockets):
+            writer.write(frame)
+
+    # HTTP
+
+    async def _connection(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                method, target, _ = line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = header.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+
+                url = urllib.parse.urlsplit(target)
+                refused = self._refuse(headers)
+                if refused:
+                    await self._respond(writer, HTTPStatus.FORBIDDEN, {"error": refused})
+                    return
+                if url.path == "/events" and headers.get("upgrade", "").lower() == "websocket":
+                    await self._websocket(reader, writer, headers)
+                    return
+
+                length = int(headers.get("content-length", 0))
+                if length > MAX_BODY:
+                    await self._respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "body too large"})
+                    return
+                body = await reader.readexactly(length) if length else b""
+                query = dict(urllib.parse.parse_qsl(url.query))
+                status, payload = await self._dispatch(method, url.path, query, headers, body)
+                await self._respond(writer, status, payload)
+                if headers.get("connection", "").lower() == "close":
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    def _refuse(self, headers):
+        """Why a request can't be from a local client, or None; see the module docstring"""
+        allowed = LOCAL_HOSTS + (self.host.lower(),)
+        if host_name(headers.get("host", "")) not in allowed:
+            return "Host must be 127.0.0.1 or localhost"
+        origin = headers.get("origin")
+        if origin is not None and host_name(urllib.parse.urlsplit(origin).netloc) not in allowed:
+            return f"cross-origin requests are not allowed ({origin})"
+        return None
+
+    async def _respond(self, writer, status, payload):
+        data = json.dumps(payload).encode()
+        writer.write(f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                     f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data)
+        await writer.drain()
+
+    async def _dispatch(self, method, path, query, headers, body):
+        start = time.perf_counter()
+        try:
+            if method == "GET" and path == "/library":
+                return HTTPStatus.OK, self.session.library_state()
+            if method == "GET" and path == "/jobs":
+                return HTTPStatus.OK, {"jobs": [job_event(job) for job in self.session.jobs.jobs()]}
+            if method == "POST" and path.startswith("/jobs/") and path.endswith("/cancel"):
+                return self._cancel(int(path.split("/")[2]))
+            if method != "POST":
+                return HTTPStatus.NOT_FOUND, {"error": f"no such endpoint: {method} {path}"}
+
+            if path == "/display/text":
+                text = self._field(headers, body, "text")
+                job, future = self.submit("display_text", "Display text", text)
+            elif path == "/display/image":
+                name = self._field(headers, body, "name")
+                job, future = self.submit("display_image", f"Display {name}", name)
+            elif path == "/play":
+                name = self._field(headers, body, "name")
+                job, future = self.submit("play", f"Play {name}", name)
+            elif path == "/stream":
+                source = self._upload_source(query, headers, body)
+                job, future = self.submit("stream", f"Stream {source.name}", source)
+            elif path == "/scan":
+                job, future = self.submit("scan", "Scan badge files")
+            elif path == "/upload":
+                source = self._upload_source(query, headers, body)
+                job, future = self.submit("upload", f"Upload {source.name}", source,
+                                          query.get("rotate", "1") != "0", query.get("show", "1") != "0")
+            else:
+                return HTTPStatus.NOT_FOUND, {"error": f"no such endpoint: {method} {path}"}
+
+            if query.get("wait") == "0":
+                return HTTPStatus.ACCEPTED, {"job": job.id, "state": job.state}
+            result = await future
+            return HTTPStatus.OK, {"job": job.id, "result": result,
+                                   "ms": round((time.perf_counter() - start) * 1000, 2)}
+        except Exception as e:
+            status = next((code for kind, code in ERROR_STATUS if isinstance(e, kind)),
+                          HTTPStatus.INTERNAL_SERVER_ERROR)
+            return status, {"error": str(e) or type(e).__name__}
+
+    @staticmethod
+    def _json(headers, body):
+        if not headers.get("content-type", "").startswith("application/json"):
+            raise ValueError("body must be sent as Content-Type: application/json")
+        try:
+            value = json.loads(body or b"{}")
+        except ValueError as e:
+            raise ValueError(f"body is not JSON: {e}") from e
+        if not isinstance(value, dict):
+            raise ValueError("body must be a JSON object")
+        return value
+
+    def _field(self, headers, body, key):
+        value = self._json(headers, body).get(key)
+        if not isinstance(value, str) or not value:
+            raise ValueError(f"body needs a \"{key}\" string")
+        return value
+
+    def _upload_source(self, query, headers, body):
+        if headers.get("content-type", "").startswith("application/json"):
+            path = pathlib.Path(self._field(headers, body, "path"))
+            if not path.is_file():
+                raise ValueError(f"no such file: {path}")
+            return path
+        name = pathlib.Path(query.get("name", "")).name
+        if name in ("", ".", "..") or not body:
+            raise ValueError("upload needs ?name= (a file name) and the file as the body")
+        self.upload_dir.mkdir(exist_ok=True)
+        path = self.upload_dir / name
+        path.write_bytes(body)
+        return path
+
+    def _cancel(self, job_id):
+        for job in self.session.jobs.jobs():
+            if job.id == job_id:
+                self.session.jobs.cancel(job)
+                return HTTPStatus.OK, job_event(job)
+        return HTTPStatus.NOT_FOUND, {"error": f"no job {job_id}"}
+
+    # WebSocket
+
+    async def _websocket(self, reader, writer, headers):
+        key = headers.get("sec-websocket-key", "")
+        accept = base64.b64encode(hashlib.sha1((key + WS_GUID).encode()).digest()).decode()
+        writer.write(("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                      f"Sec-WebSocket-Accept: {accept}\r\n\r\n").encode())
+        await writer.drain()
+        self._sockets.add(writer)
+        try:
+            # Events are pushed from _publish; here we only answer pings and wait for the close
+            while True:
+                opcode, payload = await ws_read(reader)
+                if opcode == 0x8:
+                    writer.write(struct.pack("!BB", 0x88, 0))
+                    break
+                if opcode == 0x9:
+                    writer.write(struct.pack("!BB", 0x8A, len(payload)) + payload)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._sockets.discard(writer)
+
+
+def benchmark(count):
+    """Time display commands called directly and through the API, against a stand-in badge"""
+    import http.client
+    import socket
+    import statistics
+    import tempfile
+
+    from upload_harness import DISPLAY_TIME, StandInBadge
+
+    badge = StandInBadge()
+    badge.files["/images/oscar.fwi"] = b"fwi"
+    tmp = pathlib.Path(tempfile.mkdtemp())
+    session = BadgeSession(library=Library(tmp / "library.json"), get_device=lambda: badge,
+                           journal=UploadJournal(tmp / "journal.json"), workdir=tmp)
+    api = PresenterAPI(session, port=0).start_in_thread()
+
+    def median_ms(samples):
+        return statistics.median(samples) * 1000
+
+    def p95_ms(samples):
+        return sorted(samples)[int(len(samples) * 0.95)] * 1000
+
+    direct = []
+    for _ in range(count):
+        start = time.perf_counter()
+        session.display_image(None, "oscar.fwi")
+        direct.append(time.perf_counter() - start)
+
+    # Events arrive on a WebSocket; the key and its accept value are the RFC 6455 example
+    events = socket.create_connection((api.host, api.port))
+    events.sendall(b"GET /events HTTP/1.1\r\nHost: 127.0.0.1\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                   b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\nSec-WebSocket-Version: 13\r\n\r\n")
+    handshake = events.recv(4096)
+    assert b"s3pPLMBiTxaQ9kYGzzhZRbK+xOo=" in handshake, handshake
+
+    client = http.client.HTTPConnection(api.host, api.port)
+    over_api = []
+    for _ in range(count):
+        start = time.perf_counter()
+        client.request("POST", "/display/image", json.dumps({"name": "oscar.fwi"}),
+                       {"Content-Type": "application/json"})
+        reply = json.loads(client.getresponse().read())
+        over_api.append(time.perf_counter() - start)
+        assert "result" in reply, reply
+
+    client.request("POST", "/display/image", json.dumps({"name": "missing.fwi"}),
+                   {"Content-Type": "application/json"})
+    response = client.getresponse()
+    missing = (response.status, json.loads(response.read())["error"])
+
+    # What a web page or a rebound DNS name could send, and a name that isn't a file
+    refused = []
+    for target, headers, body in [
+            ("/display/text", {"Origin": "https://example.com", "Content-Type": "application/json"},
+             json.dumps({"text": "hi"})),
+            ("/display/text", {"Content-Type": "text/plain"}, json.dumps({"text": "hi"})),
+            ("/display/text", {"Host": "attacker.example:8765", "Content-Type": "application/json"},
+             json.dumps({"text": "hi"})),
+            ("/upload?name=..", {}, b"data")]:
+        refusing = http.client.HTTPConnection(api.host, api.port)
+        if "Host" in headers:
+            refusing.putrequest("POST", target, skip_host=True)
+            for key, value in list(headers.items()) + [("Content-Length", str(len(body)))]:
+                refusing.putheader(key, value)
+            refusing.endheaders(body.encode() if isinstance(body, str) else body)
+        else:
+            refusing.request("POST", target, body, headers)
+        refused.append(refusing.getresponse().status)
+        refusing.close()
+
+    # Each job is reported queued, running and done
+    events.settimeout(2)
+    received = b""
+    try:
+        while received.count(b'"state": "done"') < count:
+            received += events.recv(65536)
+    except socket.timeout:
+        pass
+    events.close()
+    client.close()
+
+    done = received.count(b'"state": "done"')
+    print(f"{count} display commands, stand-in badge taking {DISPLAY_TIME * 1000:.0f} ms each")
+    print(f"direct call      median {median_ms(direct):6.2f} ms  p95 {p95_ms(direct):6.2f} ms")
+    print(f"HTTP request     median {median_ms(over_api):6.2f} ms  p95 {p95_ms(over_api):6.2f} ms")
+    print(f"overhead         median {median_ms(over_api) - median_ms(direct):6.2f} ms")
+    print(f"events           {done} done events over the WebSocket")
+    print(f"missing file     HTTP {missing[0]}: {missing[1]}")
+    ok = refused == [HTTPStatus.FORBIDDEN, HTTPStatus.BAD_REQUEST, HTTPStatus.FORBIDDEN, HTTPStatus.BAD_REQUEST]
+    print(f"{'✓' if ok else '✗'} foreign Origin, text/plain body, foreign Host and ?name=.. refused "
+          f"(HTTP {', '.join(str(status) for status in refused)})")
+    return 0 if ok else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless HTTP/WebSocket API for the presenter")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--bench", action="store_true", help="Measure request overhead on a stand-in badge")
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    if args.bench:
+        return benchmark(args.requests)
+
+    api = PresenterAPI(BadgeSession(), host=args.host, port=args.port)
+    try:
+        asyncio.run(api.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Sound-effect synthesis for the badge speaker
+
+Builds tones, chirps, envelopes and multi-note presets as whole NumPy arrays
+and writes each clip with a single buffer write, already encoded in the
+badge's playback format (see audio_transcode.py).
+
+Usage:
+    python sfx.py                       # render every preset into ./sounds
+    python sfx.py -o ui boop click      # render selected presets into ./ui
+    python sfx.py --transpose -2 2      # also render pitch variants
+    python sfx.py --list
+"""
+import argparse
+import pathlib
+import sys
+import time
+
+import numpy as np
+
+from audio_transcode import BADGE_CODECS, FORMATS_BY_NAME, pick_format, wav_bytes_many
+
+
+def timeline(duration, rate):
+    """Sample times for a clip of the given duration"""
+    return np.arange(int(round(duration * rate)), dtype=np.float64) / rate
+
+
+def tone(freq, duration, rate):
+    """Constant-frequency sine"""
+    return np.sin(2 * np.pi * freq * timeline(duration, rate)).astype(np.float32)
+
+
+def chirp(f_start, f_end, duration, rate, exponential=False):
+    """Sine sweep from f_start to f_end"""
+    t = timeline(duration, rate)
+    if exponential:
+        freq = f_start * (f_end / f_start) ** (t / duration)
+    else:
+        freq = f_start + (f_end - f_start) * (t / duration)
+    return _oscillate(freq, rate)
+
+
+def notes(sequence, rate):
+    """Phase-continuous sine through a list of (freq, duration) pairs; freq 0 is a rest"""
+    freq = np.concatenate([np.full(int(round(d * rate)), f, dtype=np.float64) for f, d in sequence])
+    wave = _oscillate(freq, rate)
+    wave[freq == 0] = 0.0
+    return wave
+
+
+def _oscillate(freq, rate):
+    # Integrating the instantaneous frequency keeps the phase continuous across changes
+    phase = 2 * np.pi * np.cumsum(freq) / rate
+    return np.sin(phase - phase[0]).astype(np.float32)
+
+
+def envelope(length, rate, attack=0.01, decay=0.0, sustain=1.0, release=0.05):
+    """Piecewise-linear ADSR envelope for a clip of length samples"""
+    duration = length / rate
+    release = min(release, duration)
+    attack = min(attack, duration - release)
+    decay = min(decay, duration - release - attack)
+    times = [0.0, attack, attack + decay, duration - release, duration]
+    levels = [0.0, 1.0, sustain, sustain, 0.0]
+    return np.interp(np.arange(length) / rate, times, levels).astype(np.float32)
+
+
+def shape(wave, rate, gain=0.3, **adsr):
+    """Apply an ADSR envelope and output gain to a raw waveform"""
+    return wave * envelope(len(wave), rate, **adsr) * gain
+
+
+# Each preset takes (rate, pitch) where pitch scales every frequency
+PRESETS = {
+    # The original two-tone descending "boop" from create_pleasant_beep.py
+    "boop": lambda rate, p: shape(notes([(800 * p, 0.15), (600 * p, 0.15)], rate), rate,
+                                  attack=0.02, release=0.1),
+    "click": lambda rate, p: shape(tone(2000 * p, 0.015, rate), rate, attack=0.001, release=0.012),
+    "tick": lambda rate, p: shape(tone(3200 * p, 0.008, rate), rate, gain=0.2, attack=0.0005, release=0.006),
+    "select": lambda rate, p: shape(chirp(900 * p, 1400 * p, 0.06, rate), rate, attack=0.005, release=0.03),
+    "back": lambda rate, p: shape(chirp(1400 * p, 900 * p, 0.06, rate), rate, attack=0.005, release=0.03),
+    "slide_next": lambda rate, p: shape(chirp(600 * p, 900 * p, 0.09, rate, exponential=True), rate,
+                                        attack=0.005, release=0.05),
+    "slide_prev": lambda rate, p: shape(chirp(900 * p, 600 * p, 0.09, rate, exponential=True), rate,
+                                        attack=0.005, release=0.05),
+    "success": lambda rate, p: shape(notes([(523 * p, 0.08), (659 * p, 0.08), (784 * p, 0.16)], rate), rate,
+                                     attack=0.01, release=0.08),
+    "error": lambda rate, p: shape(notes([(330 * p, 0.12), (0, 0.04), (220 * p, 0.22)], rate), rate,
+                                   gain=0.35, attack=0.01, release=0.08),
+    "warning": lambda rate, p: shape(notes([(880 * p, 0.1), (0, 0.05), (880 * p, 0.1)], rate), rate,
+                                     attack=0.005, release=0.03),
+    "notify": lambda rate, p: shape(notes([(1047 * p, 0.07), (0, 0.03), (1319 * p, 0.12)], rate), rate,
+                                    attack=0.005, release=0.06),
+    "connect": lambda rate, p: shape(chirp(400 * p, 1200 * p, 0.25, rate, exponential=True), rate,
+                                     attack=0.02, release=0.08),
+    "disconnect": lambda rate, p: shape(chirp(1200 * p, 400 * p, 0.25, rate, exponential=True), rate,
+                                        attack=0.02, release=0.08),
+    "startup": lambda rate, p: shape(notes([(392 * p, 0.1), (523 * p, 0.1), (659 * p, 0.1),
+                                            (784 * p, 0.25)], rate), rate, attack=0.01, decay=0.1,
+                                     sustain=0.7, release=0.15),
+}
+
+
+def render(name, rate, transpose=0):
+    """Render a preset as a float array, optionally transposed by semitones"""
+    return PRESETS[name](rate, 2.0 ** (transpose / 12.0))
+
+
+def render_bank(out_dir, fmt, names=None, transposes=(0,)):
+    """Render presets into out_dir in the given badge format; returns the written paths"""
+    out_dir = pathlib.Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    clips = []
+    for name in names or PRESETS:
+        for semitones in transposes:
+            suffix = f"_{semitones:+d}" if semitones else ""
+            paths.append(out_dir / f"{name}{suffix}.wav")
+            clips.append(render(name, fmt.rate, semitones))
+
+    for path, data in zip(paths, wav_bytes_many(clips, fmt)):
+        path.write_bytes(data)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render a bank of UI sounds for the badge")
+    parser.add_argument("presets", nargs="*", help="Presets to render (default: all)")
+    parser.add_argument("-o", "--out", default="sounds", help="Output directory (default: %(default)s)")
+    parser.add_argument("--format", choices=sorted(FORMATS_BY_NAME),
+                        help="Target format (default: smallest the badge can play)")
+    parser.add_argument("--min-rate", type=int, default=11025, help="Lowest acceptable sample rate")
+    parser.add_argument("--transpose", nargs=2, type=int, metavar=("LOW", "HIGH"),
+                        help="Also render every semitone variant from LOW to HIGH")
+    parser.add_argument("--list", action="store_true", help="List presets and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for name in PRESETS:
+            print(name)
+        return 0
+
+    unknown = [name for name in args.presets if name not in PRESETS]
+    if unknown:
+        print(f"Unknown preset(s): {', '.join(unknown)}")
+        return 1
+
+    fmt = FORMATS_BY_NAME[args.format] if args.format else pick_format(BADGE_CODECS, args.min_rate)
+    transposes = range(args.transpose[0], args.transpose[1] + 1) if args.transpose else (0,)
+
+    start = time.perf_counter()
+    written = render_bank(args.out, fmt, args.presets, transposes)
+    elapsed = time.perf_counter() - start
+
+    total_kb = sum(path.stat().st_size for path in written) / 1024
+    print(f"Rendered {len(written)} clips ({fmt.name}, {total_kb:.1f}KB) to {args.out}/ "
+          f"in {elapsed * 1000:.0f}ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+Preloaded slideshow for the badge display
+
+A Slideshow owns an ordered playlist of images. prefetch() converts and
+uploads missing slides nearest to the cursor first (the presenter runs it as
+a background job), so moving to a slide that is already on the badge costs
+exactly one show_gui_image command.
+
+Playlists are plain text: one image path per line (relative paths are
+resolved against the playlist's folder), blank lines and '#' comments ignored.
+
+A slide only counts as on the badge if the badge file was made from the same
+source file, so Slide1.png from this deck never passes for another deck's
+Slide1.fwi. Two different sources with the same stem get distinct names.
+"""
+import pathlib
+import threading
+from collections import namedtuple
+
+Slide = namedtuple("Slide", "source name")
+
+PLAYLIST_SUFFIXES = (".txt", ".m3u", ".playlist")
+
+
+def load_playlist(path):
+    """Read a playlist file into a list of image paths"""
+    path = pathlib.Path(path)
+    slides = []
+    for line in path.read_text().splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        source = pathlib.Path(line)
+        if not source.is_absolute():
+            source = path.parent / source
+        slides.append(source)
+    return slides
+
+
+def name_slides(sources):
+    """Slides with their badge file names; a second source with a stem already used gets _2, _3..."""
+    slides = []
+    names = {}
+    taken = set()
+    for source in sources:
+        source = pathlib.Path(source)
+        key = source.resolve()
+        if key not in names:
+            name, n = source.stem + ".fwi", 2
+            while name.lower() in taken:
+                name, n = f"{source.stem}_{n}.fwi", n + 1
+            taken.add(name.lower())
+            names[key] = name
+        slides.append(Slide(source, names[key]))
+    return slides
+
+
+class Slideshow:
+    """on_badge maps badge file names to the source each was made from (the presenter's image_sources)"""
+
+    def __init__(self, device, sources, on_badge=None, rotate=True, cache_dir=".",
+                 device_lock=None, on_status=None, on_uploaded=None, upload=None):
+        self.device = device
+        # upload(path, target) replaces a plain send_file, e.g. with a resumable uploader
+        self.upload = upload
+        self.slides = name_slides(sources)
+        self.rotate = rotate
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.on_status = on_status or (lambda text: None)
+        self.on_uploaded = on_uploaded or (lambda name: None)
+        self.position = -1
+
+        # Names known to be on the badge, uploads in progress and uploads that failed.
+        # A name made from another source is a different image and is uploaded again.
+        on_badge = on_badge or {}
+        self._uploaded = {slide.name for slide in self.slides
+                          if on_badge.get(slide.name) == str(slide.source.resolve())}
+        self._in_flight = set()
+        self._failed = set()
+
+        self._cond = threading.Condition()
+        self._device_lock = device_lock or threading.Lock()
+
+    def __len__(self):
+        return len(self.slides)
+
+    @property
+    def current(self):
+        return self.slides[self.position] if 0 <= self.position < len(self.slides) else None
+
+    def missing(self):
+        """Slides not yet on the badge"""
+        with self._cond:
+            return [s for s in self.slides if s.name not in self._uploaded]
+
+    def prefetch(self, check=None, progress=None):
+        """Upload missing slides, nearest to the cursor first; returns the ones that failed.
+
+        check() is called between slides and may raise to stop early;
+        progress(done, total) is called after each upload. Slides that failed
+        on an earlier run are retried once.
+        """
+        with self._cond:
+            self._failed.clear()
+        while True:
+            if check:
+                check()
+            with self._cond:
+                slide = self._next_missing()
+                if slide is None:
+                    break
+                self._in_flight.add(slide.name)
+            self._upload(slide)
+            if progress:
+                progress(len(self.slides) - len(self.missing()), len(self.slides))
+
+        with self._cond:
+            return [s for s in self.slides if s.name in self._failed]
+
+    def next(self):
+        return self.show(min(self.position + 1, len(self.slides) - 1))
+
+    def prev(self):
+        return self.show(max(self.position - 1, 0))
+
+    def show(self, index):
+        """Display slide index; a single show_gui_image if it is already uploaded"""
+        slide = self.slides[index]
+        with self._cond:
+            self.position = index
+            # prefetch() picks its next slide relative to the new cursor
+            ready = slide.name in self._uploaded
+
+        if not ready:
+            # The cursor overtook the prefetcher: upload this one now
+            self._upload(slide, claim=True)
+
+        with self._device_lock:
+            result = self.device.show_gui_image(slide.name)
+        return result
+
+    def _next_missing(self):
+        # Slides at and after the cursor first, then the ones already passed
+        start = max(self.position, 0)
+        order = self.slides[start:] + self.slides[:start]
+        for slide in order:
+            if slide.name not in self._uploaded and slide.name not in self._in_flight \
+                    and slide.name not in self._failed:
+                return slide
+        return None
+
+    def _upload(self, slide, claim=False):
+        if claim:
+            with self._cond:
+                # Wait out a prefetch of the same slide rather than uploading it twice
+                while slide.name in self._in_flight:
+                    self._cond.wait()
+                if slide.name in self._uploaded:
+                    return True
+                self._in_flight.add(slide.name)
+
+        ok = False
+        try:
+            self.on_status(f"Preparing {slide.name}...")
+            if slide.source.suffix.lower() == '.fwi':
+                fwi_path = slide.source
+            else:
+                from fwi_encoder import convert_file
+                fwi_path = convert_file(slide.source, self.cache_dir / slide.name, rotate=self.rotate)
+
+            if self.upload:
+                # Raises on failure
+                self.upload(fwi_path, f"images/{slide.name}")
+                ok = True
+            else:
+                with self._device_lock:
+                    result = self.device.send_file(fwi_path, f"images/{slide.name}", None)
+                ok = result.is_ok()
+            if not ok:
+                self.on_status(f"Upload failed: {slide.name}")
+        except Exception as e:
+            self.on_status(f"Upload failed: {slide.name}: {str(e)[:40]}")
+
+        with self._cond:
+            self._in_flight.discard(slide.name)
+            if ok:
+                self._uploaded.add(slide.name)
+                self._failed.discard(slide.name)
+            else:
+                self._failed.add(slide.name)
+            done = sum(1 for s in self.slides if s.name in self._uploaded)
+            self._cond.notify_all()
+
+        if ok:
+            self.on_uploaded(slide.name)
+            self.on_status(f"{done}/{len(self.slides)} slides on badge")
+        return ok
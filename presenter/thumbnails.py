@@ -0,0 +1,395 @@
+#!/usr/bin/env python3
+"""
+Thumbnail previews for the image library
+
+Thumbnails are made from local files only and never cost a badge command.
+The source is the image an upload was made from, when the library
+remembers it. Otherwise it is the .fwi the upload or slideshow prefetch
+left next to the presenter. Each is rendered once and kept as a small PNG
+in an on-disk cache bounded in bytes, with the least recently used files
+removed first. Keys include the source's size and modification time, so
+an edited image gets a new thumbnail.
+
+ThumbnailCache.want(names) is called with the rows on screen. Rows already
+in memory are delivered at once; the rest go to a small worker pool,
+newest request first. A worker skips any name that has scrolled away
+before it got to it. PreviewPane is a virtual list on a Tk canvas: only
+the visible rows have canvas items and decoded images, so a 1,000-image
+library costs no more than the few rows in view.
+
+Usage:
+    python thumbnails.py --bench [--images 1000]    # scroll a generated library, no badge needed
+"""
+import argparse
+import base64
+import hashlib
+import io
+import os
+import pathlib
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+
+THUMB_SIZE = (96, 72)
+CACHE_DIR = pathlib.Path("freewili_thumbs")
+CACHE_BYTES = 16 * 1024 * 1024
+MEMORY_ITEMS = 256
+WORKERS = 2
+ROW_HEIGHT = THUMB_SIZE[1] + 8
+
+
+def render(source, size=THUMB_SIZE):
+    """PNG bytes of a thumbnail for an image file or an .fwi"""
+    # Imported on the worker, so opening the presenter doesn't wait for PIL and NumPy
+    from PIL import Image
+
+    from fwi_encoder import decode_fwi, open_scaled
+
+    source = pathlib.Path(source)
+    if source.suffix.lower() == ".fwi":
+        image = Image.fromarray(decode_fwi(source.read_bytes()))
+        image.thumbnail(size, Image.Resampling.BILINEAR)
+    else:
+        # Draft-mode decode: big photos are never read at full size
+        image = open_scaled(source, size)
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGB")
+    out = io.BytesIO()
+    image.save(out, "PNG")
+    return out.getvalue()
+
+
+class ThumbnailCache:
+    """Renders thumbnails on a worker pool into a size-bounded disk cache.
+
+    resolve(name) gives the local file to render from, or None.
+    deliver(name, png) is called with PNG bytes, or None when there is no
+    local copy. It runs on a worker thread except for memory hits, so the
+    presenter hops back to Tk with root.after.
+    """
+
+    def __init__(self, resolve, deliver, cache_dir=CACHE_DIR, max_bytes=CACHE_BYTES,
+                 workers=WORKERS, size=THUMB_SIZE):
+        self.resolve = resolve
+        self.deliver = deliver
+        self.dir = pathlib.Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.size = size
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.hits = {"memory": 0, "disk": 0, "rendered": 0, "skipped": 0, "missing": 0}
+
+        # Disk entries, least recently used first; indexed by the first worker
+        self._files = OrderedDict()
+        self._disk_bytes = 0
+        self._indexed = False
+        self._memory = OrderedDict()
+        self._queue = deque()
+        self._wanted = set()
+        self._busy = set()
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._workers = [threading.Thread(target=self._worker, daemon=True) for _ in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def want(self, names):
+        """Thumbnails for these names (the visible rows, top first); earlier wants are dropped"""
+        ready = []
+        with self._cond:
+            self._wanted = set(names)
+            for name in reversed(names):
+                if name in self._memory:
+                    self._memory.move_to_end(name)
+                    ready.append((name, self._memory[name]))
+                    self.hits["memory"] += 1
+                else:
+                    self._queue.appendleft(name)
+            self._cond.notify_all()
+        for name, png in ready:
+            self.deliver(name, png)
+
+    def forget(self, name):
+        """Drop the in-memory copy, e.g. after the image under this name was replaced"""
+        with self._cond:
+            self._memory.pop(name, None)
+
+    def disk_bytes(self):
+        with self._cond:
+            return self._disk_bytes
+
+    def close(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        for worker in self._workers:
+            worker.join()
+
+    def _key(self, source):
+        stat = source.stat()
+        text = f"{source.resolve()}|{stat.st_size}|{stat.st_mtime_ns}|{self.size[0]}x{self.size[1]}"
+        return hashlib.sha1(text.encode()).hexdigest() + ".png"
+
+    def _index(self):
+        """List the disk cache once, off the UI thread (a full cache is a few thousand stats)"""
+        with self._cond:
+            if self._indexed:
+                return
+            sizes = {}
+            for path in self.dir.glob("*.png"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                sizes[path.name] = (stat.st_mtime, stat.st_size)
+            for key in sorted(sizes, key=lambda key: sizes[key][0]):
+                self._files[key] = sizes[key][1]
+            self._disk_bytes = sum(self._files.values())
+            self._indexed = True
+
+    def _load(self, name):
+        source = self.resolve(name)
+        if source is None or not pathlib.Path(source).exists():
+            self.hits["missing"] += 1
+            return None
+        source = pathlib.Path(source)
+        key = self._key(source)
+        path = self.dir / key
+        with self._cond:
+            on_disk = key in self._files
+            if on_disk:
+                self._files.move_to_end(key)
+        if on_disk:
+            try:
+                png = path.read_bytes()
+                os.utime(path)
+                self.hits["disk"] += 1
+                return png
+            except OSError:
+                pass
+
+        png = render(source, self.size)
+        self.hits["rendered"] += 1
+        partial = path.with_suffix(".tmp")
+        partial.write_bytes(png)
+        os.replace(partial, path)
+        with self._cond:
+            self._disk_bytes += len(png) - self._files.pop(key, 0)
+            self._files[key] = len(png)
+            while self._disk_bytes > self.max_bytes and len(self._files) > 1:
+                oldest, size = self._files.popitem(last=False)
+                self._disk_bytes -= size
+                try:
+                    (self.dir / oldest).unlink()
+                except OSError:
+                    pass
+        return png
+
+    def _worker(self):
+        self._index()
+        while True:
+            with self._cond:
+                while not self._queue and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return
+                name = self._queue.popleft()
+                if name not in self._wanted or name in self._memory or name in self._busy:
+                    self.hits["skipped"] += 1
+                    continue
+                self._busy.add(name)
+            try:
+                png = self._load(name)
+            except Exception as e:
+                print(f"Thumbnail failed for {name}: {e}")
+                png = None
+            with self._cond:
+                self._busy.discard(name)
+                if png is not None:
+                    self._memory[name] = png
+                    while len(self._memory) > MEMORY_ITEMS:
+                        self._memory.popitem(last=False)
+            self.deliver(name, png)
+
+
+class PreviewPane:
+    """Scrolling thumbnail list that only builds the rows in view.
+
+    on_select(index) runs on a click, on_activate(index) on a double click.
+    """
+
+    def __init__(self, parent, cache, on_select=None, on_activate=None, width=230):
+        import tkinter as tk
+        from tkinter import ttk
+
+        self.cache = cache
+        self.on_select = on_select or (lambda index: None)
+        self.on_activate = on_activate or (lambda index: None)
+        self.names = []
+        self.selected = None
+        self._rows = {}
+        self._photos = {}
+
+        self.frame = ttk.Frame(parent)
+        self.canvas = tk.Canvas(self.frame, width=width, highlightthickness=0, background="white")
+        scrollbar = ttk.Scrollbar(self.frame, orient="vertical", command=self._yview)
+        self.canvas.configure(yscrollcommand=scrollbar.set)
+        self.canvas.pack(side="left", fill="both", expand=True)
+        scrollbar.pack(side="right", fill="y")
+
+        self.canvas.bind("<Configure>", lambda e: self._refresh())
+        self.canvas.bind("<Button-1>", lambda e: self._click(e, self.on_select))
+        self.canvas.bind("<Double-Button-1>", lambda e: self._click(e, self.on_activate))
+        self.canvas.bind("<MouseWheel>", lambda e: self._yview("scroll", -1 if e.delta > 0 else 1, "units"))
+        self.canvas.bind("<Button-4>", lambda e: self._yview("scroll", -1, "units"))
+        self.canvas.bind("<Button-5>", lambda e: self._yview("scroll", 1, "units"))
+
+    def set_names(self, names):
+        self.names = list(names)
+        for index in list(self._rows):
+            self._drop(index)
+        self.canvas.configure(scrollregion=(0, 0, 1, max(1, len(self.names) * ROW_HEIGHT)),
+                              yscrollincrement=ROW_HEIGHT)
+        self._refresh()
+
+    def select(self, index):
+        """Highlight a row and scroll it into view"""
+        self.selected = index
+        if index is not None and self.names:
+            top, bottom = self._visible()
+            if not top <= index < bottom - 1:
+                self.canvas.yview_moveto(index / len(self.names))
+        for row in list(self._rows):
+            self._drop(row)
+        self._refresh()
+
+    def thumbnail_ready(self, name, png):
+        """Show a delivered thumbnail if its row is still on screen; call on the Tk thread"""
+        import tkinter as tk
+
+        for index, items in self._rows.items():
+            if self.names[index] != name:
+                continue
+            background, thumb, frame, label = items
+            if png is None:
+                self.canvas.itemconfigure(label, text=f"{name}\n(no local copy)")
+                continue
+            photo = tk.PhotoImage(data=base64.b64encode(png))
+            self._photos[index] = photo
+            self.canvas.itemconfigure(thumb, image=photo)
+
+    def _yview(self, *args):
+        self.canvas.yview(*args)
+        self._refresh()
+
+    def _visible(self):
+        top = int(self.canvas.canvasy(0) // ROW_HEIGHT)
+        bottom = int((self.canvas.canvasy(0) + self.canvas.winfo_height()) // ROW_HEIGHT) + 1
+        return max(0, top), min(len(self.names), bottom)
+
+    def _drop(self, index):
+        for item in self._rows.pop(index):
+            self.canvas.delete(item)
+        self._photos.pop(index, None)
+
+    def _refresh(self):
+        top, bottom = self._visible()
+        for index in [i for i in self._rows if not top <= i < bottom]:
+            self._drop(index)
+        for index in range(top, bottom):
+            if index in self._rows:
+                continue
+            y = index * ROW_HEIGHT
+            fill = "#cde4ff" if index == self.selected else ""
+            background = self.canvas.create_rectangle(0, y, 2000, y + ROW_HEIGHT, fill=fill, outline="")
+            # Plain canvas items rather than a widget per row
+            w, h = THUMB_SIZE
+            frame = self.canvas.create_rectangle(4, y + 4, 4 + w, y + 4 + h, outline="#ccc")
+            thumb = self.canvas.create_image(4 + w // 2, y + 4 + h // 2)
+            label = self.canvas.create_text(w + 12, y + ROW_HEIGHT // 2, text=self.names[index], anchor="w")
+            self._rows[index] = (background, thumb, frame, label)
+        self.cache.want([self.names[i] for i in range(top, bottom)])
+
+    def _click(self, event, callback):
+        index = int(self.canvas.canvasy(event.y) // ROW_HEIGHT)
+        if 0 <= index < len(self.names):
+            self.select(index)
+            callback(index)
+
+
+def benchmark(count, page):
+    """Build a library of count images, then page through it cold and warm"""
+    from fwi_encoder import encode_file
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = pathlib.Path(tmp)
+        sample = pathlib.Path(__file__).with_name("oscar.jpg")
+        sources = {}
+        for i in range(count):
+            # Half photos, half FWIs left behind by uploads; distinct files so each needs its own thumbnail
+            if i % 2:
+                path = tmp / f"slide{i:04d}.fwi"
+                path.write_bytes(encode_file(sample))
+            else:
+                path = tmp / f"slide{i:04d}.jpg"
+                shutil.copy(sample, path)
+            os.utime(path, (i, i))
+            sources[path.stem + ".fwi"] = path
+        names = list(sources)
+
+        def run(label):
+            delivered = {}
+            done = threading.Event()
+            lock = threading.Lock()
+
+            def deliver(name, png):
+                with lock:
+                    if name not in wanted:
+                        return
+                    delivered[name] = time.perf_counter()
+                    if len(delivered) >= len(wanted):
+                        done.set()
+
+            cache = ThumbnailCache(sources.get, deliver, cache_dir=tmp / "thumbs")
+            first_page = []
+            start = time.perf_counter()
+            for offset in range(0, len(names), page):
+                wanted = names[offset:offset + page]
+                delivered.clear()
+                done.clear()
+                asked = time.perf_counter()
+                cache.want(wanted)
+                done.wait(30)
+                first_page.append(max(delivered.values()) - asked)
+            elapsed = time.perf_counter() - start
+            cache.close()
+            pages = sorted(first_page)
+            print(f"{label:<14} {elapsed:6.2f} s for {len(names)} rows, page of {page}: "
+                  f"median {pages[len(pages) // 2] * 1000:5.1f} ms, worst {pages[-1] * 1000:6.1f} ms  "
+                  f"({cache.hits['rendered']} rendered, {cache.hits['disk']} from disk)")
+            return cache
+
+        print(f"Library of {count} images (half .jpg, half .fwi), {THUMB_SIZE[0]}x{THUMB_SIZE[1]} thumbnails")
+        cold = run("cold cache")
+        run("warm cache")
+        print(f"disk cache     {cold.disk_bytes() / 1024:6.0f} KB in {cold.dir.name}/ (limit {CACHE_BYTES // 1024} KB)")
+        print("badge commands      0")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Thumbnail cache for the presenter's image library")
+    parser.add_argument("--bench", action="store_true", help="Page through a generated library")
+    parser.add_argument("--images", type=int, default=1000)
+    parser.add_argument("--page", type=int, default=8, help="Rows visible at once")
+    args = parser.parse_args()
+    if args.bench:
+        return benchmark(args.images, args.page)
+    parser.print_help()
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
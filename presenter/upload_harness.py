@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Disconnect harness for the chunked uploader
+
+Runs ChunkedUploader against a stand-in badge that keeps files in memory,
+checks the CRC32 of every transfer the way the firmware does and drops the
+link at random points. Like the badge, it keeps a separate filesystem per
+processor and runs scripts only on the main one. It retries after each drop, as the presenter would
+after reconnecting. It then checks that the file on the stand-in matches
+the source and that no confirmed part was sent twice.
+
+With --contend it instead queues throttled uploads on a JobScheduler and
+submits a display job every 150ms while they run, first without priority
+classes and then with them, and reports how long each display took from
+click to screen.
+
+No hardware needed.
+
+Usage:
+    python upload_harness.py [file] [--drop-rate 0.3] [--seed 1] [--kbps 0]
+    python upload_harness.py --contend [--kbps 200]
+"""
+import argparse
+import io
+import pathlib
+import random
+import statistics
+import sys
+import tempfile
+import time
+import zlib
+
+from freewili.fw import FileMap
+from freewili.types import FreeWiliProcessorType
+from result import Err, Ok
+
+from chunked_upload import ChunkedUploader, UploadError, UploadJournal, describe
+from jobs import BULK, INTERACTIVE, PENDING, RUNNING, JobScheduler
+
+DISPLAY_TIME = 0.02
+DISPLAY_INTERVAL = 0.15
+
+
+class LinkDropped(Exception):
+    """The stand-in's USB link went away"""
+
+
+class _StandInFile(io.BytesIO):
+    def __init__(self, files, name, data=b""):
+        super().__init__(data)
+        self._files = files
+        self._name = name
+
+    def close(self):
+        self._files[self._name] = self.getvalue()
+        super().close()
+
+
+class StandInBadge:
+    """Just enough of the FreeWili API for uploads, with injected disconnects"""
+
+    def __init__(self, drop_rate=0.0, seed=None, kbps=0, chunk_size=4096):
+        self.files = {}  # display processor: images and sounds
+        self.main_files = {}  # main processor: scripts, FPGA images, radio files
+        self.drop_rate = drop_rate
+        self.random = random.Random(seed)
+        self.kbps = kbps
+        self.chunk_size = chunk_size
+        self.connected = True
+        self.transfers = []
+        self.plays = []
+
+    @staticmethod
+    def _key(name):
+        return "/" + str(name).lstrip("/")
+
+    def reconnect(self):
+        self.connected = True
+
+    def filesystem(self, processor, name):
+        """The processor's files; None picks the processor from the extension, as send_file does"""
+        if processor is None:
+            try:
+                processor = FileMap.from_fname(str(name)).processor
+            except ValueError:
+                processor = FreeWiliProcessorType.Main
+        return self.main_files if processor == FreeWiliProcessorType.Main else self.files
+
+    def send_file(self, source_file, target_name, processor=None, event_cb=None, chunk_size=0):
+        if not self.connected:
+            raise LinkDropped("device not connected")
+        data = pathlib.Path(source_file).read_bytes()
+        expected_crc = zlib.crc32(data)
+        received = bytearray()
+        drop_at = self.random.randrange(len(data) + 1) if self.random.random() < self.drop_rate else None
+
+        for offset in range(0, len(data), self.chunk_size):
+            chunk = data[offset:offset + self.chunk_size]
+            if drop_at is not None and offset + len(chunk) > drop_at:
+                # Cable pulled mid-transfer: the firmware never sees a matching CRC
+                self.connected = False
+                raise LinkDropped(f"link dropped at {drop_at}/{len(data)} bytes of {target_name}")
+            if self.kbps:
+                time.sleep(len(chunk) / (self.kbps * 1024))
+            received += chunk
+            if event_cb:
+                event_cb(f"Sent {len(received)}/{len(data)} bytes of {source_file}.")
+
+        if zlib.crc32(received) != expected_crc:
+            return Err(f"CRC mismatch for {target_name}")
+        self.filesystem(processor, target_name)[self._key(target_name)] = bytes(received)
+        self.transfers.append((self._key(target_name), len(received)))
+        return Ok(f"Sent {target_name}")
+
+    def run_script(self, file_name, stop_first, processor=None):
+        if not self.connected:
+            raise LinkDropped("device not connected")
+        if self.filesystem(processor, file_name) is not self.main_files:
+            return Err(f"scripts only run on the main processor, not {processor}")
+        script = self.main_files.get(self._key(f"scripts/{file_name}"))
+        if script is None:
+            return Err(f"{file_name} not found")
+        exec(script.decode(), {"open": self._open, "__name__": "__main__"})
+        return Ok(f"Ran {file_name}")
+
+    def get_file(self, source_file, destination_path, processor=None, event_cb=None):
+        if not self.connected:
+            raise LinkDropped("device not connected")
+        data = self.filesystem(processor, source_file).get(self._key(source_file))
+        if data is None:
+            return Err(f"{source_file} not found")
+        pathlib.Path(destination_path).write_bytes(data)
+        return Ok(f"Got {source_file}")
+
+    def show_gui_image(self, path):
+        if not self.connected:
+            raise LinkDropped("device not connected")
+        time.sleep(DISPLAY_TIME)
+        if self._key(path) not in self.files and self._key(f"images/{path}") not in self.files:
+            return Err(f"{path} not found")
+        return Ok(f"Showing {path}")
+
+    def play_audio_file(self, file_name):
+        if not self.connected:
+            raise LinkDropped("device not connected")
+        # Same command round trip as a display
+        time.sleep(DISPLAY_TIME)
+        if self._key(f"sounds/{file_name}") not in self.files:
+            return Err(f"{file_name} not found")
+        self.plays.append((time.perf_counter(), file_name))
+        return Ok(f"Playing {file_name}")
+
+    def remove_directory_or_file(self, dir_or_filename, processor=None):
+        self.filesystem(processor, dir_or_filename).pop(self._key(dir_or_filename), None)
+        return Ok(f"Removed {dir_or_filename}")
+
+    def _open(self, name, mode='r'):
+        # Scripts run on the main processor and only see its files
+        key = self._key(name)
+        if 'w' in mode:
+            return _StandInFile(self.main_files, key)
+        return io.BytesIO(self.main_files[key])
+
+
+def display_latency(sources, tmp, prioritized, kbps, chunk_size):
+    """Queue an upload of each source, then a display job every DISPLAY_INTERVAL until they finish.
+
+    Unprioritized runs every job as BULK with no worker kept for interactive
+    jobs, i.e. first come first served like the old scheduler. Returns each display's time from
+    submit to done, in seconds.
+    """
+    badge = StandInBadge(kbps=kbps)
+    badge.files["/images/slide.fwi"] = b"\0" * 24
+    scheduler = JobScheduler(workers=2, interactive_workers=1 if prioritized else 0)
+    latencies = []
+
+    def upload(job, index):
+        journal = UploadJournal(tmp / f"contend-{prioritized}-{index}.json")
+        ChunkedUploader(badge, journal, chunk_size=chunk_size, device_lock=scheduler.device_lock,
+                        verify_timeout=0, write_chunk=0).upload(sources[index], f"fpga/contend{index}.bin")
+
+    def display(job, submitted):
+        with scheduler.device_lock:
+            badge.show_gui_image("slide.fwi")
+        latencies.append(time.perf_counter() - submitted)
+
+    bulk = [scheduler.submit(f"Upload {i}", upload, i, priority=BULK) for i in range(len(sources))]
+    while any(job.state in (PENDING, RUNNING) for job in bulk):
+        time.sleep(DISPLAY_INTERVAL)
+        scheduler.submit("Display", display, time.perf_counter(),
+                         priority=INTERACTIVE if prioritized else BULK)
+    while any(job.state in (PENDING, RUNNING) for job in scheduler.jobs()):
+        time.sleep(0.01)
+    scheduler.shutdown()
+    return latencies
+
+
+def contend(args, source, tmp):
+    kbps = args.kbps or 200
+    part_time = args.chunk_size / (kbps * 1024)
+    # Distinct contents: parts are named after the file's digest. Main-processor
+    # targets, since only those are sent in parts
+    sources = []
+    for index in range(3):
+        sources.append(tmp / f"contend{index}.bin")
+        sources[-1].write_bytes(source.read_bytes() + bytes([index]))
+    print(f"3 uploads of {source.stat().st_size // 1024}KB at {kbps:.0f}KB/s, "
+          f"{args.chunk_size // 1024}KB parts ({part_time * 1000:.0f}ms each)")
+    worst = {}
+    for name, prioritized in (("first come ", False), ("prioritized", True)):
+        latencies = display_latency(sources, tmp, prioritized, kbps, args.chunk_size)
+        worst[prioritized] = max(latencies)
+        print(f"{name}: {len(latencies)} displays, median {statistics.median(latencies) * 1000:.0f}ms, "
+              f"longest {max(latencies) * 1000:.0f}ms from click to screen")
+    # One part already on the link, plus the display itself and some slack
+    return 0 if worst[True] <= part_time * 1.5 + DISPLAY_TIME else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exercise resumable uploads against a flaky stand-in badge")
+    parser.add_argument("file", nargs="?", help="File to upload (default: 150KB of random bytes)")
+    parser.add_argument("--target", default="fpga/harness.bin",
+                        help="Target on the badge; display targets (images/, sounds/) go whole")
+    parser.add_argument("--drop-rate", type=float, default=0.3, help="Chance a transfer loses the link")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--kbps", type=float, default=0, help="Simulated link speed (0 = unthrottled)")
+    parser.add_argument("--chunk-size", type=int, default=16384)
+    parser.add_argument("--max-attempts", type=int, default=50)
+    parser.add_argument("--contend", action="store_true", help="Measure display latency during an upload")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = pathlib.Path(tmp)
+        if args.file:
+            source = pathlib.Path(args.file)
+        else:
+            source = tmp / "payload.bin"
+            source.write_bytes(random.Random(args.seed).randbytes(150 * 1024))
+
+        if args.contend:
+            return contend(args, source, tmp)
+
+        badge = StandInBadge(drop_rate=args.drop_rate, seed=args.seed, kbps=args.kbps)
+        journal = UploadJournal(tmp / "journal.json")
+        result = None
+        for attempt in range(1, args.max_attempts + 1):
+            # A fresh uploader each time, as after a presenter restart; only the journal carries over
+            uploader = ChunkedUploader(badge, UploadJournal(journal.path), chunk_size=args.chunk_size,
+                                       verify_timeout=0, write_chunk=0)
+            try:
+                result = uploader.upload(source, args.target)
+                break
+            except UploadError as e:
+                print(f"attempt {attempt}: {e}")
+                badge.reconnect()
+
+        if result is None:
+            print(f"FAIL: not complete after {args.max_attempts} attempts")
+            return 1
+
+        data = source.read_bytes()
+        files = badge.filesystem(None, args.target)
+        ok = files.get("/" + args.target) == data
+        part_sends = [name for name, _ in badge.transfers if not name.endswith(".py") and name != "/" + args.target]
+        duplicates = len(part_sends) - len(set(part_sends))
+        leftovers = [name for fs in (badge.files, badge.main_files) for name in fs if name != "/" + args.target]
+
+        print(f"attempt {attempt}: {describe(result)}")
+        print(f"target matches source : {'yes' if ok else 'NO'}")
+        print(f"parts sent twice      : {duplicates}")
+        print(f"files left on badge   : {len(leftovers)}")
+        print(f"journal entries left  : {len(UploadJournal(journal.path).entries)}")
+        return 0 if ok and not duplicates and not leftovers else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Streaming Prompt Matcher
+
+Reading a menu response used to mean decoding everything received so far
+and searching it for one string, once per chunk. That is quadratic in the
+length of the response, which shows on long listings and boot logs, and it
+can wait for only one string. PromptMatcher watches for any number of
+prompts and error strings at once. It is an Aho-Corasick automaton compiled
+to a table of 256 next states per state, so each byte costs one lookup.
+Its state carries across chunks, so a prompt split between two reads is
+still found. Each match reports which pattern it was and its byte offsets
+from the start of the stream.
+
+Patterns are matched as UTF-8 bytes; nothing is decoded.
+
+Usage:
+    python3 prompt_match.py --bench [--chunk 64]   # against decode-and-search
+
+Other tools:
+    from prompt_match import PromptMatcher
+    matcher = PromptMatcher({"prompt": "Enter Letter:", "error": "Invalid"})
+    for match in matcher.feed(chunk):
+        print(match.name, match.start, match.end)
+
+    from badge_link_profile import read_match
+    response, match = read_match(ser, profile, {"prompt": "Enter Letter:", "error": "Invalid"})
+"""
+
+import argparse
+import functools
+import sys
+import time
+from collections import deque, namedtuple
+
+Match = namedtuple("Match", "name start end")
+
+
+@functools.lru_cache(maxsize=64)
+def compile_patterns(patterns):
+    """Transition table and outputs for a tuple of byte patterns; cached, since callers reuse a few sets"""
+    goto = [{}]
+    outputs = [[]]
+    for index, pattern in enumerate(patterns):
+        if not pattern:
+            raise ValueError("empty pattern")
+        state = 0
+        for byte in pattern:
+            if byte not in goto[state]:
+                goto.append({})
+                outputs.append([])
+                goto[state][byte] = len(goto) - 1
+            state = goto[state][byte]
+        outputs[state].append(index)
+
+    # Breadth first, so each state's fallback is complete before the states below it
+    table = [None] * len(goto)
+    table[0] = [goto[0].get(byte, 0) for byte in range(256)]
+    fail = [0] * len(goto)
+    order = deque(goto[0].values())
+    while order:
+        state = order.popleft()
+        row = list(table[fail[state]])
+        for byte, child in goto[state].items():
+            fail[child] = table[fail[state]][byte]
+            outputs[child] = outputs[child] + outputs[fail[child]]
+            row[byte] = child
+            order.append(child)
+        table[state] = row
+    return tuple(tuple(row) for row in table), tuple(tuple(found) for found in outputs)
+
+
+class PromptMatcher:
+    """Finds several patterns at once in a byte stream fed a chunk at a time.
+
+    patterns is a string, a list of strings (each its own name) or a dict
+    of name -> string.
+    """
+
+    def __init__(self, patterns):
+        if isinstance(patterns, (str, bytes)):
+            patterns = [patterns]
+        if not isinstance(patterns, dict):
+            patterns = {pattern: pattern for pattern in patterns}
+        self.names = list(patterns)
+        self.patterns = tuple(p.encode() if isinstance(p, str) else bytes(p) for p in patterns.values())
+        self._table, self._outputs = compile_patterns(self.patterns)
+        self.reset()
+
+    def reset(self):
+        self.state = 0
+        self.offset = 0
+
+    def feed(self, data):
+        """Matches that end in this chunk, in stream order; offsets count from the first byte fed"""
+        table, outputs = self._table, self._outputs
+        state = self.state
+        matches = []
+        for at, byte in enumerate(data):
+            state = table[state][byte]
+            if outputs[state]:
+                end = self.offset + at + 1
+                for index in outputs[state]:
+                    matches.append(Match(self.names[index], end - len(self.patterns[index]), end))
+        self.state = state
+        self.offset += len(data)
+        return matches
+
+
+def _decode_and_search(chunks, patterns):
+    """The old way: decode everything so far and search it for each pattern after every chunk"""
+    response = b""
+    for chunk in chunks:
+        response += chunk
+        text = response.decode('utf-8', errors='ignore')
+        for name, pattern in patterns.items():
+            if pattern in text:
+                return name
+    return None
+
+
+def benchmark(chunk_size):
+    patterns = {"prompt": "Enter Letter:", "text": "Enter Text To Display", "error": "Invalid",
+                "failed": "Failed", "busy": "Busy"}
+    print(f"{len(patterns)} patterns, prompt at the end of the response, {chunk_size} B reads")
+    print(f"{'response':>10}  {'decode+search':>14}  {'matcher':>10}  {'matcher rate':>12}")
+    for size in (4096, 16384, 65536, 262144):
+        line = b"  slide_0001.fwi                       20480\r\n"
+        listing = line * (size // len(line)) + b"\r\nEnter Letter: "
+        chunks = [listing[i:i + chunk_size] for i in range(0, len(listing), chunk_size)]
+
+        start = time.perf_counter()
+        old = _decode_and_search(chunks, patterns)
+        old_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        matcher = PromptMatcher(patterns)
+        found = None
+        for chunk in chunks:
+            matches = matcher.feed(chunk)
+            if matches:
+                found = matches[0]
+                break
+        new_time = time.perf_counter() - start
+
+        if old != "prompt" or found is None or found.name != "prompt" or found.end != len(listing) - 1:
+            print(f"✗ wrong match at {size} bytes: {old}, {found}")
+            return 1
+        print(f"{len(listing):>9}B  {old_time * 1000:>12.1f}ms  {new_time * 1000:>8.1f}ms  "
+              f"{len(listing) / new_time / 1e6:>8.1f} MB/s")
+
+    # A prompt split across two reads is still found
+    matcher = PromptMatcher(patterns)
+    split = matcher.feed(b"...Enter Let") + matcher.feed(b"ter: ")
+    ok = split == [Match("prompt", 3, 16)]
+    print(f"{'✓' if ok else '✗'} prompt split across reads found at {split[0].start if split else None}")
+    return 0 if ok else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-pattern matcher for serial responses")
+    parser.add_argument("--bench", action="store_true", help="Compare with decoding and searching per chunk")
+    parser.add_argument("--chunk", type=int, default=64, help="Read size in the benchmark")
+    args = parser.parse_args()
+    if args.bench:
+        return benchmark(args.chunk)
+    parser.print_help()
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
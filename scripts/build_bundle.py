@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Script Bundle Packager
+
+Builds the Python entries in menu.json into a versioned bundle and uploads
+only the scripts that changed.
+
+Each script is compiled to .mpy with mpy-cross when --mpy is given (the
+badge then skips compiling it on import). Otherwise it is minified:
+docstrings and comments removed, indentation reduced to one space. Minified
+output is checked to parse to the same code as the source.
+
+The bundle index (dist/bundle.json) records each script's hash and size, and
+a copy lives on the badge as /scripts/bundle.idx. An upload reads the
+badge's copy back first, so it only sends what is actually out of date there.
+
+Badge script names have to fit the firmware's 8.3 limit. Set "badge_name" on
+a menu entry to choose one; otherwise it is derived from the id.
+
+Usage:
+    python3 build_bundle.py             # build dist/ and report sizes
+    python3 build_bundle.py --upload    # build, then send what changed
+    python3 build_bundle.py --mpy       # compile with mpy-cross
+"""
+
+import argparse
+import ast
+import hashlib
+import json
+import pathlib
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+SCRIPTS_DIR = pathlib.Path(__file__).resolve().parent
+MENU_FILE = SCRIPTS_DIR / "menu.json"
+DIST_DIR = SCRIPTS_DIR / "dist"
+INDEX_NAME = "bundle.json"
+BADGE_INDEX = "/scripts/bundle.idx"
+
+
+def badge_name(entry, taken, suffix):
+    """8.3 name for a menu entry: its badge_name, or the id cut to 8 characters"""
+    if entry.get("badge_name"):
+        return entry["badge_name"]
+    stem = re.sub(r"[^a-z0-9_]", "", entry["id"].lower())[:8] or "script"
+    name = f"{stem}{suffix}"
+    counter = 1
+    while name in taken:
+        tail = str(counter)
+        name = f"{stem[:8 - len(tail)]}{tail}{suffix}"
+        counter += 1
+    return name
+
+
+class _StripDocstrings(ast.NodeTransformer):
+    def _strip(self, node):
+        self.generic_visit(node)
+        body = node.body
+        if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant) \
+                and isinstance(body[0].value.value, str):
+            body = body[1:] or [ast.Pass()]
+        node.body = body
+        return node
+
+    visit_Module = visit_FunctionDef = visit_AsyncFunctionDef = visit_ClassDef = _strip
+
+
+def minify(source):
+    """Source without docstrings or comments, indented by one space per level"""
+    tree = _StripDocstrings().visit(ast.parse(source))
+    code = ast.unparse(tree)
+    # unparse writes string literals with escapes, so every physical line is code
+    lines = []
+    for line in code.splitlines():
+        stripped = line.lstrip(" ")
+        lines.append(" " * ((len(line) - len(stripped)) // 4) + stripped)
+    minified = "\n".join(lines) + "\n"
+
+    expected = ast.dump(_StripDocstrings().visit(ast.parse(source)))
+    if ast.dump(ast.parse(minified)) != expected:
+        raise ValueError("minified script does not match the original")
+    return minified
+
+
+def compile_mpy(source_path):
+    """Bytes of an .mpy built by mpy-cross, or None if it isn't installed or fails"""
+    tool = shutil.which("mpy-cross")
+    if not tool:
+        return None
+    with tempfile.TemporaryDirectory() as tmp:
+        out = pathlib.Path(tmp) / "out.mpy"
+        result = subprocess.run([tool, "-o", str(out), str(source_path)], capture_output=True)
+        if result.returncode != 0:
+            print(f"  mpy-cross failed for {source_path.name}: {result.stderr.decode().strip()[:60]}")
+            return None
+        return out.read_bytes()
+
+
+def compile_time(source, runs=20):
+    """Host-side compile time, as a proxy for the badge compiling a .py on import"""
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        compile(source, "<script>", "exec")
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def load_index(path):
+    try:
+        return json.loads(pathlib.Path(path).read_text())
+    except (OSError, ValueError):
+        return {"version": 0, "scripts": {}}
+
+
+def build(use_mpy=False):
+    """Build every Python entry in menu.json into dist/; returns the new index"""
+    menu = json.loads(MENU_FILE.read_text())
+    previous = load_index(DIST_DIR / INDEX_NAME)
+    DIST_DIR.mkdir(exist_ok=True)
+
+    scripts = {}
+    taken = set()
+    print(f"{'script':<22} {'badge name':<13} {'source':>8} {'bundle':>8} {'saved':>6} "
+          f"{'compile':>9} {'after':>9}")
+    for entry in menu["scripts"]:
+        if entry.get("type") != "python":
+            continue
+        source_path = SCRIPTS_DIR / entry["file"]
+        source = source_path.read_text()
+
+        built = compile_mpy(source_path) if use_mpy else None
+        suffix = ".mpy" if built is not None else ".py"
+        if built is None:
+            built = minify(source).encode()
+        name = badge_name(entry, taken, suffix)
+        taken.add(name)
+        (DIST_DIR / name).write_bytes(built)
+
+        before = compile_time(source)
+        # An .mpy is already bytecode: nothing left to compile on the badge
+        after = 0.0 if suffix == ".mpy" else compile_time(built.decode())
+        saved = 1 - len(built) / len(source.encode())
+        print(f"{entry['id']:<22} {name:<13} {len(source.encode()):>7}B {len(built):>7}B {saved:>6.0%} "
+              f"{before * 1000:>7.2f}ms {after * 1000:>7.2f}ms")
+
+        scripts[entry["id"]] = {
+            "name": name,
+            "source": entry["file"],
+            "sha256": digest(built),
+            "size": len(built),
+            "source_size": len(source.encode()),
+        }
+
+    changed = scripts != previous.get("scripts")
+    index = {
+        "bundle": menu.get("name"),
+        "menu_version": menu.get("version"),
+        "version": previous.get("version", 0) + (1 if changed else 0),
+        "format": "mpy" if use_mpy else "py",
+        "scripts": scripts,
+    }
+    (DIST_DIR / INDEX_NAME).write_text(json.dumps(index, indent=2))
+    print(f"\nBundle v{index['version']}{' (unchanged)' if not changed else ''}: {len(scripts)} script(s) in {DIST_DIR}")
+    return index
+
+
+def upload(index):
+    """Send scripts whose hash differs from the badge's index, then the new index"""
+    from freewili.fw import FreeWili
+    from freewili.types import FreeWiliProcessorType
+
+    result = FreeWili.find_first()
+    if result.is_err():
+        print("✗ No badge found")
+        return 1
+    badge = result.unwrap()
+    main = FreeWiliProcessorType.Main
+
+    with tempfile.TemporaryDirectory() as tmp:
+        on_badge_path = pathlib.Path(tmp) / "bundle.idx"
+        fetched = badge.get_file(BADGE_INDEX, on_badge_path, main)
+        on_badge = load_index(on_badge_path)["scripts"] if fetched.is_ok() else {}
+
+    sent = skipped = 0
+    for script_id, info in index["scripts"].items():
+        if on_badge.get(script_id, {}).get("sha256") == info["sha256"]:
+            skipped += info["size"]
+            print(f"  = {info['name']:<13} unchanged")
+            continue
+        start = time.perf_counter()
+        result = badge.send_file(DIST_DIR / info["name"], f"/scripts/{info['name']}", main)
+        if result.is_err():
+            print(f"  ✗ {info['name']}: {result.unwrap_err()}")
+            return 1
+        sent += info["size"]
+        print(f"  ↑ {info['name']:<13} {info['size']}B in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    # The index goes last, so an interrupted upload is retried next time
+    result = badge.send_file(DIST_DIR / INDEX_NAME, BADGE_INDEX, main)
+    if result.is_err():
+        print(f"  ✗ index: {result.unwrap_err()}")
+        return 1
+    print(f"✓ Sent {sent}B, skipped {skipped}B already on the badge")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and upload the menu.json script bundle")
+    parser.add_argument("--mpy", action="store_true", help="Compile with mpy-cross (falls back to minified .py)")
+    parser.add_argument("--upload", action="store_true", help="Send changed scripts to the badge")
+    args = parser.parse_args()
+
+    index = build(use_mpy=args.mpy)
+    if args.upload:
+        return upload(index)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
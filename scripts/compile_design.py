@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""
+Badge Design Compiler
+
+The shield design used to be hand-coded three times (PIL preview, badge
+script, C++ firmware), each scaling 3450x3450 SVG coordinates at runtime.
+It now lives in one description, badge_design.json (an SVG works too), and
+this compiles it for each target's screen into constant draw tables. The
+generated code only loops over the table; every coordinate is already in
+pixels.
+
+While resolving, line segments that continue each other in a straight line
+are merged into one (the bottom curves are 10 steps on one slope each).
+Segments are merged when the joint is within a quarter pixel of straight at
+the target resolution.
+
+Targets, with the screen size read from each consumer's SCREEN_WIDTH and
+SCREEN_HEIGHT:
+    pil    display_badge_design.py   (table spliced between markers)
+    badge  badge_design_test.py      (table spliced between markers)
+    cpp    ../include/badge_design.h (for src/badge_design_test.cpp)
+
+SVG input understands line, polyline, polygon, path (M/L/H/V/Z only),
+circle, rect and text; <g id="..."> elements become named groups. Shapes
+with fill="none" are outlines, stroke-width is the line width, and text is
+centred on its x.
+
+Usage:
+    python3 compile_design.py                    # regenerate all targets
+    python3 compile_design.py --check            # fail if any target is stale
+    python3 compile_design.py --design shield.svg
+    python3 compile_design.py --backend cpp --size 320x240   # print only
+"""
+
+import argparse
+import json
+import math
+import pathlib
+import re
+import sys
+import xml.etree.ElementTree as ET
+
+SCRIPTS_DIR = pathlib.Path(__file__).resolve().parent
+REPO_DIR = SCRIPTS_DIR.parent
+DESIGN_FILE = SCRIPTS_DIR / "badge_design.json"
+
+# backend, generated file, file holding SCREEN_WIDTH/SCREEN_HEIGHT for that backend
+TARGETS = [
+    ("pil", SCRIPTS_DIR / "display_badge_design.py", SCRIPTS_DIR / "display_badge_design.py"),
+    ("badge", SCRIPTS_DIR / "badge_design_test.py", SCRIPTS_DIR / "badge_design_test.py"),
+    ("cpp", REPO_DIR / "include" / "badge_design.h", REPO_DIR / "src" / "badge_design_test.cpp"),
+]
+
+BEGIN_MARKER = "# BEGIN compile_design.py output - do not edit, regenerate with: python3 compile_design.py"
+END_MARKER = "# END compile_design.py output"
+
+# Segments whose joint is closer to straight than this (in target pixels) are merged
+MERGE_TOLERANCE = 0.25
+
+# TFT_eSPI built-in fonts loaded in platformio.ini, and their heights in pixels
+TFT_FONTS = ((1, 8), (2, 16), (4, 26), (6, 48), (8, 75))
+
+
+# --- Loading ---------------------------------------------------------------
+
+def load_design(path):
+    """Design as a dict: name, viewbox [w, h] and groups of shapes (the JSON format)"""
+    path = pathlib.Path(path)
+    if path.suffix.lower() == ".svg":
+        return load_svg(path)
+    return json.loads(path.read_text())
+
+
+def _svg_attrs(element):
+    """Element attributes with any style="a: b; ..." declarations folded in"""
+    attrs = dict(element.attrib)
+    for declaration in attrs.pop("style", "").split(";"):
+        if ":" in declaration:
+            key, value = declaration.split(":", 1)
+            attrs[key.strip()] = value.strip()
+    return attrs
+
+
+def _number(value, default=0.0):
+    if value is None:
+        return default
+    return float(re.match(r"[-+]?[\d.]+(?:e[-+]?\d+)?", value.strip()).group())
+
+
+def _path_points(d):
+    """Polylines of a path made of straight segments (M, L, H, V, Z and lowercase forms)"""
+    tokens = re.findall(r"[A-Za-z]|[-+]?(?:\d+\.?\d*|\.\d+)(?:e[-+]?\d+)?", d)
+    polylines, points = [], []
+    x = y = 0.0
+    command = None
+    i = 0
+    while i < len(tokens):
+        if tokens[i].isalpha():
+            command = tokens[i]
+            i += 1
+            if command in "Zz":
+                if points:
+                    points.append(points[0])
+                    x, y = points[0]
+                    polylines.append(points)
+                    points = []
+                continue
+        if command is None or command not in "MmLlHhVv":
+            raise ValueError(f"path command '{command}' is not supported; flatten curves to lines first")
+        relative = command.islower()
+        if command in "Hh":
+            x = float(tokens[i]) + (x if relative else 0)
+            i += 1
+        elif command in "Vv":
+            y = float(tokens[i]) + (y if relative else 0)
+            i += 1
+        else:
+            dx, dy = float(tokens[i]), float(tokens[i + 1])
+            i += 2
+            x, y = (x + dx, y + dy) if relative else (dx, dy)
+        if command in "Mm":
+            if len(points) > 1:
+                polylines.append(points)
+            points = []
+            # Further coordinate pairs after a moveto are linetos
+            command = "l" if relative else "L"
+        points.append((x, y))
+    if len(points) > 1:
+        polylines.append(points)
+    return polylines
+
+
+def _svg_shapes(element, shapes):
+    for child in element:
+        tag = child.tag.rsplit("}", 1)[-1]
+        attrs = _svg_attrs(child)
+        width = _number(attrs.get("stroke-width"), 1.0)
+        filled = attrs.get("fill", "black") != "none"
+        if tag == "g":
+            _svg_shapes(child, shapes)
+        elif tag == "line":
+            shapes.append({"type": "line", "width": width,
+                           "from": [_number(attrs.get("x1")), _number(attrs.get("y1"))],
+                           "to": [_number(attrs.get("x2")), _number(attrs.get("y2"))]})
+        elif tag in ("polyline", "polygon"):
+            values = [float(v) for v in re.findall(r"[-+]?[\d.]+(?:e[-+]?\d+)?", attrs.get("points", ""))]
+            points = [list(p) for p in zip(values[::2], values[1::2])]
+            if tag == "polygon" and points:
+                points.append(points[0])
+            shapes.append({"type": "polyline", "points": points, "width": width})
+        elif tag == "path":
+            for points in _path_points(attrs.get("d", "")):
+                shapes.append({"type": "polyline", "points": [list(p) for p in points], "width": width})
+        elif tag == "circle":
+            shapes.append({"type": "circle", "center": [_number(attrs.get("cx")), _number(attrs.get("cy"))],
+                           "r": _number(attrs.get("r")), "fill": filled, "width": width})
+        elif tag == "rect":
+            shapes.append({"type": "rect", "x": _number(attrs.get("x")), "y": _number(attrs.get("y")),
+                           "w": _number(attrs.get("width")), "h": _number(attrs.get("height")),
+                           "fill": filled, "width": width})
+        elif tag == "text":
+            shapes.append({"type": "text", "text": "".join(child.itertext()).strip(),
+                           "x": _number(attrs.get("x")), "y": _number(attrs.get("y")),
+                           "size": _number(attrs.get("font-size"), 16.0)})
+
+
+def load_svg(path):
+    """Design from an SVG file: each top-level <g> is a group, loose shapes share one"""
+    root = ET.parse(path).getroot()
+    if root.get("viewBox"):
+        viewbox = [float(v) for v in root.get("viewBox").replace(",", " ").split()[2:4]]
+    else:
+        viewbox = [_number(root.get("width")), _number(root.get("height"))]
+
+    groups = []
+    loose = {"name": pathlib.Path(path).stem, "shapes": []}
+    for child in root:
+        if child.tag.rsplit("}", 1)[-1] == "g":
+            name = child.get("id") or child.get("{http://www.inkscape.org/namespaces/inkscape}label") or "group"
+            group = {"name": name, "shapes": []}
+            _svg_shapes(child, group["shapes"])
+            groups.append(group)
+        else:
+            _svg_shapes([child], loose["shapes"])
+    if loose["shapes"]:
+        groups.insert(0, loose)
+    return {"name": pathlib.Path(path).stem, "viewbox": viewbox, "groups": groups}
+
+
+# --- Resolving -------------------------------------------------------------
+
+def merge_segments(segments, tolerance):
+    """Join segments of equal width that meet end to end in a straight line.
+
+    segments is a list of ((x1, y1), (x2, y2), width, order); a joint is
+    merged when exactly two such segments meet there and it lies within
+    tolerance of the line between their far ends. The merged segment keeps
+    the earlier one's order.
+    """
+    segments = [list(s) for s in segments]
+    merged = True
+    while merged:
+        merged = False
+        ends = {}
+        for index, (a, b, width, _) in enumerate(segments):
+            ends.setdefault((tuple(a), width), []).append(index)
+            ends.setdefault((tuple(b), width), []).append(index)
+        for (joint, width), touching in ends.items():
+            if len(touching) != 2 or touching[0] == touching[1]:
+                continue
+            first, second = (segments[i] for i in touching)
+            far_a = first[1] if tuple(first[0]) == joint else first[0]
+            far_b = second[1] if tuple(second[0]) == joint else second[0]
+            if _bends(far_a, joint, far_b, tolerance):
+                continue
+            segments[touching[0]] = [far_a, far_b, width, min(first[3], second[3])]
+            del segments[touching[1]]
+            merged = True
+            break
+    return [tuple(s) for s in segments]
+
+
+def _bends(a, joint, b, tolerance):
+    """True unless joint sits between a and b within tolerance of the line a-b"""
+    ax, ay = a[0] - joint[0], a[1] - joint[1]
+    bx, by = b[0] - joint[0], b[1] - joint[1]
+    if ax * bx + ay * by >= 0:
+        return True
+    length = math.hypot(b[0] - a[0], b[1] - a[1])
+    return abs(ax * by - ay * bx) / length > tolerance
+
+
+def resolve(design, size):
+    """Pixel-space draw list for a screen: (groups, stats).
+
+    Scaled to fit the width and centred vertically, the way the hand-written
+    versions placed it. Each group is (name, primitives) with primitives
+        ("line", x1, y1, x2, y2, width)
+        ("circle", cx, cy, r, filled, width)
+        ("rect", x0, y0, x1, y1, filled, width)
+        ("text", text, x, y, height)
+    """
+    screen_w, screen_h = size
+    view_w, view_h = design["viewbox"]
+    scale = min(screen_w / view_w, screen_h / view_h)
+    offset_x = (screen_w - round(view_w * scale)) // 2
+    offset_y = (screen_h - round(view_h * scale)) // 2
+
+    def sx(x):
+        return int(x * scale) + offset_x
+
+    def sy(y):
+        return int(y * scale) + offset_y
+
+    def ss(s):
+        return max(1, int(s * scale))
+
+    groups = []
+    stats = {"source": 0, "segments": 0, "merged": 0, "primitives": 0}
+    for group in design["groups"]:
+        segments, others = [], []
+        for order, shape in enumerate(group["shapes"]):
+            kind = shape["type"]
+            width = shape.get("width", 1)
+            if kind in ("line", "polyline"):
+                points = [shape["from"], shape["to"]] if kind == "line" else shape["points"]
+                steps = list(zip(points, points[1:]))
+                stats["source"] += len(steps)
+                segments.extend((tuple(a), tuple(b), width, order) for a, b in steps)
+                continue
+            stats["source"] += 1
+            if kind == "circle":
+                (cx, cy), r = shape["center"], shape["r"]
+                others.append((order, ("circle", sx(cx), sy(cy), ss(r), bool(shape.get("fill")), ss(width))))
+            elif kind == "rect":
+                x, y = shape["x"], shape["y"]
+                others.append((order, ("rect", sx(x), sy(y), sx(x + shape["w"]), sy(y + shape["h"]),
+                                       bool(shape.get("fill")), ss(width))))
+            elif kind == "text":
+                x = screen_w // 2 if shape.get("x") is None else sx(shape["x"])
+                others.append((order, ("text", shape["text"], x, sy(shape["y"]), ss(shape["size"]))))
+            else:
+                raise ValueError(f"unknown shape type '{kind}' in group '{group['name']}'")
+
+        stats["segments"] += len(segments)
+        lines = merge_segments(segments, MERGE_TOLERANCE / scale)
+        stats["merged"] += len(segments) - len(lines)
+        # Back in source order, minus anything that rounds to a duplicate
+        ordered = [(order, ("line", sx(x1), sy(y1), sx(x2), sy(y2), ss(width)))
+                   for (x1, y1), (x2, y2), width, order in lines]
+        primitives = []
+        for _, primitive in sorted(ordered + others, key=lambda item: item[0]):
+            if primitive not in primitives:
+                primitives.append(primitive)
+        stats["primitives"] += len(primitives)
+        groups.append((group["name"], primitives))
+    return groups, stats
+
+
+# --- Emitting --------------------------------------------------------------
+
+def _header(design, size, stats, comment):
+    return (f"{comment} Compiled for {size[0]}x{size[1]} from {design['name']}: "
+            f"{stats['primitives']} primitives from {stats['source']} source shapes "
+            f"({stats['merged']} collinear segments merged)")
+
+
+def emit_pil(design, size, groups, stats):
+    """DESIGN_SHAPES rows (method, xy, filled, width) for ImageDraw, and DESIGN_TEXT"""
+    out = [_header(design, size, stats, "#"), "DESIGN_SHAPES = ("]
+    texts = []
+    for name, primitives in groups:
+        rows = []
+        for p in primitives:
+            if p[0] == "line":
+                rows.append(f'("line", {p[1:5]}, False, {p[5]})')
+            elif p[0] == "circle":
+                _, cx, cy, r, filled, width = p
+                rows.append(f'("ellipse", {(cx - r, cy - r, cx + r, cy + r)}, {filled}, {width})')
+            elif p[0] == "rect":
+                rows.append(f'("rectangle", {p[1:5]}, {p[5]}, {p[6]})')
+            else:
+                texts.append(f"    ({p[1]!r}, {p[2]}, {p[3]}, {p[4]}),")
+        if rows:
+            out.append(f"    # {name}")
+            out.extend(f"    {row}," for row in rows)
+    out += [")", "DESIGN_TEXT = ("] + texts + [")"]
+    return "\n".join(out) + "\n"
+
+
+def emit_badge(design, size, groups, stats):
+    """DESIGN_SHAPES rows (display method, args...) for the badge display API, and DESIGN_TEXT"""
+    out = [_header(design, size, stats, "#"), "DESIGN_SHAPES = ("]
+    texts = []
+    for name, primitives in groups:
+        rows = []
+        for p in primitives:
+            if p[0] == "line":
+                rows.append(("line",) + p[1:5])
+            elif p[0] == "circle":
+                rows.append(("fill_circle" if p[4] else "circle",) + p[1:4])
+            elif p[0] == "rect":
+                _, x0, y0, x1, y1, filled, _ = p
+                rows.append(("fill_rect" if filled else "rect", x0, y0, x1 - x0, y1 - y0))
+            else:
+                # text_center sizes are multiples of the 8 px built-in font
+                texts.append(f"    ({p[1]!r}, {p[2]}, {p[3]}, {max(1, p[4] // 8)}),")
+        if rows:
+            out.append(f"    # {name}")
+            out.extend(f"    {row!r}," for row in rows)
+    out += [")", "DESIGN_TEXT = ("] + texts + [")"]
+    return "\n".join(out) + "\n"
+
+
+def tft_font(height):
+    """Smallest TFT_eSPI built-in font at least height pixels tall"""
+    for font, font_height in TFT_FONTS:
+        if font_height >= height:
+            return font
+    return TFT_FONTS[-1][0]
+
+
+def emit_cpp(design, size, groups, stats):
+    """Header with BADGE_DESIGN (op, a, b, c, d) and BADGE_DESIGN_TEXT tables"""
+    ops = {("line", False): "DESIGN_LINE", ("circle", False): "DESIGN_CIRCLE",
+           ("circle", True): "DESIGN_FILL_CIRCLE", ("rect", False): "DESIGN_RECT",
+           ("rect", True): "DESIGN_FILL_RECT"}
+    out = [
+        _header(design, size, stats, "//"),
+        "// Generated by scripts/compile_design.py - do not edit",
+        "#ifndef BADGE_DESIGN_H",
+        "#define BADGE_DESIGN_H",
+        "",
+        "#include <stdint.h>",
+        "",
+        f"#define BADGE_DESIGN_WIDTH {size[0]}",
+        f"#define BADGE_DESIGN_HEIGHT {size[1]}",
+        "",
+        "enum DesignOp : uint8_t {",
+        "    DESIGN_LINE,         // x1, y1, x2, y2",
+        "    DESIGN_CIRCLE,       // x, y, r",
+        "    DESIGN_FILL_CIRCLE,  // x, y, r",
+        "    DESIGN_RECT,         // x, y, w, h",
+        "    DESIGN_FILL_RECT,    // x, y, w, h",
+        "};",
+        "",
+        "struct DesignShape {",
+        "    DesignOp op;",
+        "    int16_t a, b, c, d;",
+        "};",
+        "",
+        "struct DesignText {",
+        "    const char *text;",
+        "    int16_t x, y;",
+        "    uint8_t font;  // TFT_eSPI built-in font number",
+        "};",
+        "",
+        "static const DesignShape BADGE_DESIGN[] = {",
+    ]
+    texts = []
+    for name, primitives in groups:
+        rows = []
+        for p in primitives:
+            if p[0] == "line":
+                rows.append((ops["line", False],) + p[1:5])
+            elif p[0] == "circle":
+                rows.append((ops["circle", p[4]],) + p[1:4] + (0,))
+            elif p[0] == "rect":
+                _, x0, y0, x1, y1, filled, _ = p
+                rows.append((ops["rect", filled], x0, y0, x1 - x0, y1 - y0))
+            else:
+                texts.append(f"    {{{json.dumps(p[1])}, {p[2]}, {p[3]}, {tft_font(p[4])}}},")
+        if rows:
+            out.append(f"    // {name}")
+            out.extend(f"    {{{', '.join(str(v) for v in row)}}}," for row in rows)
+    out += ["};", "", "static const DesignText BADGE_DESIGN_TEXT[] = {"] + texts + ["};", "",
+            "#endif // BADGE_DESIGN_H"]
+    return "\n".join(out) + "\n"
+
+
+EMITTERS = {"pil": emit_pil, "badge": emit_badge, "cpp": emit_cpp}
+
+
+def screen_size(path):
+    """(SCREEN_WIDTH, SCREEN_HEIGHT) as defined in a Python or C++ source file"""
+    text = pathlib.Path(path).read_text()
+    values = []
+    for name in ("SCREEN_WIDTH", "SCREEN_HEIGHT"):
+        match = re.search(rf"^\s*(?:#define\s+)?{name}\s*=?\s*(\d+)", text, re.MULTILINE)
+        if not match:
+            raise ValueError(f"{name} not found in {path}")
+        values.append(int(match.group(1)))
+    return tuple(values)
+
+
+def splice(text, generated):
+    """Replace the marked generated block in a Python file"""
+    start = text.find(BEGIN_MARKER)
+    end = text.find(END_MARKER)
+    if start < 0 or end < start:
+        raise ValueError("generated-code markers not found")
+    return text[:start] + BEGIN_MARKER + "\n" + generated + text[end:]
+
+
+def render(backend, output, design, size):
+    """Full new contents of a target file"""
+    groups, stats = resolve(design, size)
+    generated = EMITTERS[backend](design, size, groups, stats)
+    if output.suffix == ".py":
+        return splice(output.read_text(), generated), stats
+    return generated, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the badge design into pre-scaled draw tables")
+    parser.add_argument("--design", default=str(DESIGN_FILE), help="Design file (.json or .svg)")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if a generated target is out of date")
+    parser.add_argument("--backend", choices=sorted(EMITTERS), help="Print one backend's table instead of writing")
+    parser.add_argument("--size", help="Screen size for --backend, e.g. 240x320")
+    args = parser.parse_args()
+
+    design = load_design(args.design)
+
+    if args.backend:
+        size = tuple(int(v) for v in args.size.lower().split("x")) if args.size else (240, 320)
+        groups, stats = resolve(design, size)
+        print(EMITTERS[args.backend](design, size, groups, stats), end="")
+        return 0
+
+    stale = 0
+    for backend, output, size_source in TARGETS:
+        size = screen_size(size_source)
+        contents, stats = render(backend, output, design, size)
+        current = output.read_text() if output.exists() else None
+        state = "up to date" if contents == current else ("stale" if args.check else "written")
+        if contents != current:
+            stale += 1
+            if not args.check:
+                output.write_text(contents)
+        print(f"{backend:<6} {size[0]}x{size[1]:<4} {stats['source']:>3} shapes -> {stats['primitives']:>3} primitives "
+              f"({stats['merged']} merged)  {output.relative_to(REPO_DIR)}: {state}")
+    return 1 if args.check and stale else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,7 +7,7 @@ by communicating with the badge's Display Processor via USB serial.
 Author: David Broggy
 
 Requirements:
-    pip install freewili pillow
+    pip install freewili pillow numpy
 
 Usage:
     python display_badge_design.py
@@ -15,11 +15,11 @@ Usage:
 
 import sys
 from pathlib import Path
-from freewili import find_freewilis
-from freewili.fw import FreeWili
-from result import Ok, Err
 from PIL import Image, ImageDraw, ImageFont
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "presenter"))
+from fwi_encoder import encode_fwi
+
 # Display configuration - ICS Village Badge
 SCREEN_WIDTH = 240
 SCREEN_HEIGHT = 320
@@ -27,6 +27,71 @@ SCREEN_HEIGHT = 320
 # Color - Microsoft Azure Blue
 AZURE_BLUE_RGB = (0, 164, 239)  # #00A4EF
 
+# Design tables from badge_design.json
+# BEGIN compile_design.py output - do not edit, regenerate with: python3 compile_design.py
+# Compiled for 240x320 from MVP Security Badge: 36 primitives from 54 source shapes (18 collinear segments merged)
+DESIGN_SHAPES = (
+    # Main shield outline
+    ("line", (194, 165, 194, 81), False, 2),
+    ("line", (194, 81, 120, 53), False, 2),
+    ("line", (120, 53, 45, 81), False, 2),
+    ("line", (45, 81, 45, 165), False, 2),
+    # Bottom curves
+    ("line", (45, 165, 184, 234), False, 2),
+    ("line", (194, 165, 55, 234), False, 2),
+    # Circuit traces - vertical
+    ("line", (69, 88, 69, 193), False, 1),
+    ("line", (97, 95, 97, 206), False, 1),
+    ("line", (142, 95, 142, 206), False, 1),
+    ("line", (170, 88, 170, 193), False, 1),
+    # Circuit traces - horizontal
+    ("line", (62, 109, 177, 109), False, 1),
+    ("line", (66, 130, 173, 130), False, 1),
+    ("line", (69, 172, 170, 172), False, 1),
+    # Circuit pads
+    ("ellipse", (68, 108, 70, 110), True, 1),
+    ("ellipse", (82, 108, 84, 110), True, 1),
+    ("ellipse", (155, 108, 157, 110), True, 1),
+    ("ellipse", (169, 108, 171, 110), True, 1),
+    # Central lock
+    ("rectangle", (111, 140, 128, 161), False, 2),
+    ("ellipse", (115, 131, 125, 141), False, 2),
+    ("line", (114, 136, 114, 140), False, 2),
+    ("line", (125, 136, 125, 140), False, 2),
+    # Keyhole
+    ("ellipse", (118, 147, 122, 151), True, 1),
+    ("rectangle", (118, 149, 121, 155), True, 1),
+    # Unlocked key
+    ("ellipse", (144, 149, 148, 153), False, 2),
+    ("line", (148, 151, 156, 151), False, 2),
+    # Corner circuit elements
+    ("ellipse", (60, 93, 64, 97), True, 1),
+    ("ellipse", (175, 93, 179, 97), True, 1),
+    # Diagonal circuit traces
+    ("line", (62, 95, 69, 109), False, 1),
+    ("line", (177, 95, 170, 109), False, 1),
+    # Top antenna
+    ("ellipse", (118, 51, 122, 55), True, 1),
+    ("line", (120, 56, 120, 60), False, 2),
+    # Side connection points
+    ("ellipse", (192, 121, 196, 125), True, 1),
+    ("ellipse", (43, 121, 47, 125), True, 1),
+)
+DESIGN_TEXT = (
+    ('MVP SUMMIT', 120, 220, 20),
+    ('2026', 120, 234, 20),
+    ('01010011 01000101 01000011', 120, 245, 8),
+)
+# END compile_design.py output
+
+
+def load_font(size):
+    """Helvetica at size pixels, or PIL's default font if it isn't installed"""
+    try:
+        return ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", size)
+    except OSError:
+        return ImageFont.load_default()
+
 
 def create_badge_design_image():
     """Create the MVP Security Badge design as a PIL Image."""
@@ -34,131 +99,31 @@ def create_badge_design_image():
     img = Image.new('RGB', (SCREEN_WIDTH, SCREEN_HEIGHT), color=(0, 0, 0))
     draw = ImageDraw.Draw(img)
 
-    # Calculate scaling factors to fit 3450x3450 SVG into 240x320 display
-    scale = SCREEN_WIDTH / 3450.0
-    offset_x = 0
-    offset_y = (SCREEN_HEIGHT - int(3450 * scale)) // 2
-
-    # Helper functions to scale coordinates
-    def sx(x):
-        return int(x * scale) + offset_x
-
-    def sy(y):
-        return int(y * scale) + offset_y
-
-    def ss(s):
-        return max(1, int(s * scale))
-
-    # Draw main shield outline
-    draw.line([sx(1725), sy(200), sx(2800), sy(600)], fill=AZURE_BLUE_RGB, width=2)
-    draw.line([sx(2800), sy(600), sx(2800), sy(1800)], fill=AZURE_BLUE_RGB, width=2)
-    draw.line([sx(1725), sy(200), sx(650), sy(600)], fill=AZURE_BLUE_RGB, width=2)
-    draw.line([sx(650), sy(600), sx(650), sy(1800)], fill=AZURE_BLUE_RGB, width=2)
-
-    # Draw bottom curves (approximated with lines)
-    for i in range(10):
-        x1 = 650 + i * 200
-        y1 = 1800 + i * 100
-        x2 = 650 + (i + 1) * 200
-        y2 = 1800 + (i + 1) * 100
-        draw.line([sx(x1), sy(y1), sx(x2), sy(y2)], fill=AZURE_BLUE_RGB, width=2)
-
-    for i in range(10):
-        x1 = 2800 - i * 200
-        y1 = 1800 + i * 100
-        x2 = 2800 - (i + 1) * 200
-        y2 = 1800 + (i + 1) * 100
-        draw.line([sx(x1), sy(y1), sx(x2), sy(y2)], fill=AZURE_BLUE_RGB, width=2)
-
-    # Draw circuit traces - vertical lines
-    draw.line([sx(1000), sy(700), sx(1000), sy(2200)], fill=AZURE_BLUE_RGB, width=1)
-    draw.line([sx(1400), sy(800), sx(1400), sy(2400)], fill=AZURE_BLUE_RGB, width=1)
-    draw.line([sx(2050), sy(800), sx(2050), sy(2400)], fill=AZURE_BLUE_RGB, width=1)
-    draw.line([sx(2450), sy(700), sx(2450), sy(2200)], fill=AZURE_BLUE_RGB, width=1)
-
-    # Draw circuit traces - horizontal connections
-    draw.line([sx(900), sy(1000), sx(2550), sy(1000)], fill=AZURE_BLUE_RGB, width=1)
-    draw.line([sx(950), sy(1300), sx(2500), sy(1300)], fill=AZURE_BLUE_RGB, width=1)
-    draw.line([sx(1000), sy(1900), sx(2450), sy(1900)], fill=AZURE_BLUE_RGB, width=1)
-
-    # Draw circuit pads (small circles)
-    r = ss(25)
-    draw.ellipse([sx(1000)-r, sy(1000)-r, sx(1000)+r, sy(1000)+r], fill=AZURE_BLUE_RGB)
-    r = ss(20)
-    draw.ellipse([sx(1200)-r, sy(1000)-r, sx(1200)+r, sy(1000)+r], fill=AZURE_BLUE_RGB)
-    draw.ellipse([sx(2250)-r, sy(1000)-r, sx(2250)+r, sy(1000)+r], fill=AZURE_BLUE_RGB)
-    r = ss(25)
-    draw.ellipse([sx(2450)-r, sy(1000)-r, sx(2450)+r, sy(1000)+r], fill=AZURE_BLUE_RGB)
-
-    # Draw central lock icon
-    draw.rectangle([sx(1600), sy(1450), sx(1850), sy(1750)], outline=AZURE_BLUE_RGB, width=2)
-    r = ss(80)
-    draw.ellipse([sx(1725)-r, sy(1380)-r, sx(1725)+r, sy(1380)+r], outline=AZURE_BLUE_RGB, width=2)
-    draw.line([sx(1645), sy(1380), sx(1645), sy(1450)], fill=AZURE_BLUE_RGB, width=2)
-    draw.line([sx(1805), sy(1380), sx(1805), sy(1450)], fill=AZURE_BLUE_RGB, width=2)
-
-    # Draw keyhole
-    r = ss(30)
-    draw.ellipse([sx(1725)-r, sy(1580)-r, sx(1725)+r, sy(1580)+r], fill=AZURE_BLUE_RGB)
-    draw.rectangle([sx(1710), sy(1580), sx(1740), sy(1660)], fill=AZURE_BLUE_RGB)
-
-    # Draw unlocked key
-    r = ss(35)
-    draw.ellipse([sx(2100)-r, sy(1600)-r, sx(2100)+r, sy(1600)+r], outline=AZURE_BLUE_RGB, width=2)
-    draw.line([sx(2135), sy(1600), sx(2250), sy(1600)], fill=AZURE_BLUE_RGB, width=2)
-
-    # Draw corner circuit elements
-    r = ss(30)
-    draw.ellipse([sx(900)-r, sy(800)-r, sx(900)+r, sy(800)+r], fill=AZURE_BLUE_RGB)
-    draw.ellipse([sx(2550)-r, sy(800)-r, sx(2550)+r, sy(800)+r], fill=AZURE_BLUE_RGB)
-
-    # Draw diagonal circuit traces
-    draw.line([sx(900), sy(800), sx(1000), sy(1000)], fill=AZURE_BLUE_RGB, width=1)
-    draw.line([sx(2550), sy(800), sx(2450), sy(1000)], fill=AZURE_BLUE_RGB, width=1)
-
-    # Draw top antenna
-    r = ss(40)
-    draw.ellipse([sx(1725)-r, sy(200)-r, sx(1725)+r, sy(200)+r], fill=AZURE_BLUE_RGB)
-    draw.line([sx(1725), sy(240), sx(1725), sy(300)], fill=AZURE_BLUE_RGB, width=2)
-
-    # Draw side connection points
-    r = ss(35)
-    draw.ellipse([sx(2800)-r, sy(1200)-r, sx(2800)+r, sy(1200)+r], fill=AZURE_BLUE_RGB)
-    draw.ellipse([sx(650)-r, sy(1200)-r, sx(650)+r, sy(1200)+r], fill=AZURE_BLUE_RGB)
-
-    # Draw text
-    try:
-        # Try to use a nice font, fall back to default if not available
-        font_large = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 20)
-        font_small = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 12)
-        font_tiny = ImageFont.truetype("/System/Library/Fonts/Helvetica.ttc", 8)
-    except:
-        font_large = ImageFont.load_default()
-        font_small = ImageFont.load_default()
-        font_tiny = ImageFont.load_default()
-
-    # Center text
-    text1 = "MVP SUMMIT"
-    text2 = "2026"
-    text3 = "01010011 01000101 01000011"  # SEC in binary
-
-    bbox1 = draw.textbbox((0, 0), text1, font=font_large)
-    bbox2 = draw.textbbox((0, 0), text2, font=font_large)
-    bbox3 = draw.textbbox((0, 0), text3, font=font_tiny)
-
-    w1 = bbox1[2] - bbox1[0]
-    w2 = bbox2[2] - bbox2[0]
-    w3 = bbox3[2] - bbox3[0]
-
-    draw.text(((SCREEN_WIDTH - w1) // 2, sy(2600)), text1, fill=AZURE_BLUE_RGB, font=font_large)
-    draw.text(((SCREEN_WIDTH - w2) // 2, sy(2800)), text2, fill=AZURE_BLUE_RGB, font=font_large)
-    draw.text(((SCREEN_WIDTH - w3) // 2, sy(2950)), text3, fill=AZURE_BLUE_RGB, font=font_tiny)
+    # Coordinates are pre-scaled by compile_design.py; nothing to compute here
+    for method, xy, filled, width in DESIGN_SHAPES:
+        if method == "line":
+            draw.line(xy, fill=AZURE_BLUE_RGB, width=width)
+        elif filled:
+            getattr(draw, method)(xy, fill=AZURE_BLUE_RGB)
+        else:
+            getattr(draw, method)(xy, outline=AZURE_BLUE_RGB, width=width)
+
+    # Text is centred on x
+    for text, x, y, size in DESIGN_TEXT:
+        font = load_font(size)
+        bbox = draw.textbbox((0, 0), text, font=font)
+        draw.text((x - (bbox[2] - bbox[0]) // 2, y), text, fill=AZURE_BLUE_RGB, font=font)
 
     return img
 
 
 def main():
     """Main entry point."""
+    # Only needed to talk to the badge, so render_badges.py can import the design without them
+    from freewili import find_freewilis
+    from freewili.fw import FreeWili
+    from result import Ok, Err
+
     print("=" * 50)
     print("MVP Security Badge - Display Badge Design")
     print("=" * 50)
@@ -182,24 +147,13 @@ def main():
     print("\n[2/4] Creating badge design image...")
     img = create_badge_design_image()
 
-    # Save temporarily
-    temp_image = Path("/tmp/badge_design.png")
-    img.save(temp_image)
     print(f"Image created: {SCREEN_WIDTH}x{SCREEN_HEIGHT}")
 
-    # Convert to FREE-WILi format
+    # Encode straight to FREE-WILi format, no temporary PNG
     print("\n[3/4] Converting to FREE-WILi format...")
     temp_fwi = Path("/tmp/badge_design.fwi")
-
-    from freewili.image import convert
-    result = convert(temp_image, temp_fwi)
-
-    match result:
-        case Ok(msg):
-            print(f"Success: {msg}")
-        case Err(msg):
-            print(f"ERROR: {msg}")
-            return 1
+    temp_fwi.write_bytes(encode_fwi(img, size=None))
+    print(f"Success: {temp_fwi.stat().st_size} bytes")
 
     # Display on badge
     print("\n[4/4] Sending to badge display...")
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+MVP Security Badge - Batch Personalized Badge Images
+
+Renders one badge image per attendee: the shield from
+display_badge_design.py with the attendee's name (and an optional second
+line, e.g. company) underneath. The shield is drawn once. Each badge only
+draws its name band, the rows below the design, and appends them to the
+shield's already encoded RGB565 rows. Attendees are split into chunks
+across a process pool. Each worker writes its FWI files straight into the
+output directory. manifest.json lists every badge with its size and CRC32.
+
+CSV columns (header row, case-insensitive): name (required), plus
+optionally id (used for the file name) and the --subtitle column.
+
+Author: David Broggy
+
+Usage:
+    python render_badges.py attendees.csv out/ [--subtitle company] [--workers 4] [--font font.ttf]
+    python render_badges.py --bench [--count 5000]      # synthetic attendees
+"""
+
+import argparse
+import csv
+import functools
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import unicodedata
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from display_badge_design import (AZURE_BLUE_RGB, SCREEN_HEIGHT, SCREEN_WIDTH, create_badge_design_image,
+                                  load_font)
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "presenter"))
+from fwi_encoder import fwi_header, rgb565  # noqa: E402
+
+# Name band: the rows below the design's text, redrawn for each attendee
+BAND_TOP = 258
+NAME_Y = 264
+NAME_SIZE = 26
+MIN_NAME_SIZE = 12
+SUBTITLE_Y = 294
+SUBTITLE_SIZE = 14
+MAX_TEXT_WIDTH = SCREEN_WIDTH - 12
+CHUNK = 100
+TARGET_SECONDS = 60
+MANIFEST = "manifest.json"
+
+# Per worker: the shield encoded down to the band, the band's background and the font
+_shield = None
+
+
+@functools.lru_cache(maxsize=None)
+def name_font(size, path=None):
+    """A scalable font: path, else display_badge_design's font, else PIL's built-in one at size"""
+    if path:
+        return ImageFont.truetype(path, size)
+    font = load_font(size)
+    # load_font's fallback is load_default(), a FreeTypeFont fixed at 10 px on Pillow >= 10.1
+    if getattr(font, "size", None) == size:
+        return font
+    return ImageFont.load_default(size)
+
+
+def fit_text(text, size, font_path=None):
+    """(text, font) shrunk until it fits MAX_TEXT_WIDTH, cut with '...' below MIN_NAME_SIZE"""
+    while True:
+        font = name_font(size, font_path)
+        if font.getlength(text) <= MAX_TEXT_WIDTH:
+            return text, font
+        if size <= MIN_NAME_SIZE:
+            break
+        size = max(MIN_NAME_SIZE, size - 2)
+    while len(text) > 1 and font.getlength(text + "...") > MAX_TEXT_WIDTH:
+        text = text[:-1]
+    return text.rstrip() + "...", font
+
+
+def shield_layer(image=None):
+    """(FWI bytes above the band, band background pixels) for the shield"""
+    pixels = np.asarray(image or create_badge_design_image())
+    above = fwi_header(SCREEN_WIDTH, SCREEN_HEIGHT) + rgb565(pixels[:BAND_TOP]).tobytes()
+    return above, pixels[BAND_TOP:].copy()
+
+
+def _init_worker(layer, font_path):
+    global _shield
+    _shield = layer + (font_path,)
+
+
+def render_badge(name, subtitle=""):
+    """FWI bytes of one personalized badge (the worker's shield must be set)"""
+    above, background, font_path = _shield
+    band = Image.fromarray(background)
+    draw = ImageDraw.Draw(band)
+    for text, y, size in ((name, NAME_Y, NAME_SIZE), (subtitle, SUBTITLE_Y, SUBTITLE_SIZE)):
+        if not text:
+            continue
+        text, font = fit_text(text, size, font_path)
+        draw.text((SCREEN_WIDTH // 2, y - BAND_TOP), text, fill=AZURE_BLUE_RGB, font=font, anchor="mt")
+    return above + rgb565(np.asarray(band)).tobytes()
+
+
+def render_chunk(out_dir, rows):
+    """Render and write a chunk of (file, name, subtitle) rows; returns their manifest entries"""
+    entries = []
+    for file_name, name, subtitle in rows:
+        data = render_badge(name, subtitle)
+        (Path(out_dir) / file_name).write_bytes(data)
+        entries.append({"file": file_name, "name": name, "subtitle": subtitle,
+                        "bytes": len(data), "crc32": zlib.crc32(data)})
+    return entries
+
+
+def file_stem(text, taken):
+    """A file-name-safe, unique stem for an attendee"""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    stem = re.sub(r"[^a-z0-9]+", "_", text.lower()).strip("_")[:24] or "badge"
+    unique, n = stem, 2
+    while unique in taken:
+        unique, n = f"{stem}_{n}", n + 1
+    taken.add(unique)
+    return unique
+
+
+def read_attendees(csv_path, subtitle=None):
+    """[(file, name, subtitle)] from a CSV with a name column"""
+    rows = []
+    taken = set()
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        for record in csv.DictReader(f):
+            record = {(key or "").strip().lower(): (value or "").strip() for key, value in record.items()}
+            if "name" not in record:
+                raise ValueError(f"{csv_path} has no 'name' column")
+            if not record["name"]:
+                continue
+            stem = file_stem(record.get("id") or record["name"], taken)
+            rows.append((stem + ".fwi", record["name"], record.get(subtitle, "") if subtitle else ""))
+    return rows
+
+
+def render_all(rows, out_dir, workers=None, font_path=None, progress=None):
+    """Render every row into out_dir and write the manifest; returns the manifest"""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    layer = shield_layer()
+    chunks = [rows[i:i + CHUNK] for i in range(0, len(rows), CHUNK)]
+    workers = workers or os.cpu_count() or 1
+    entries = []
+    if workers == 1:
+        _init_worker(layer, font_path)
+        results = (render_chunk(out_dir, chunk) for chunk in chunks)
+        executor = None
+    else:
+        executor = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(layer, font_path))
+        results = executor.map(render_chunk, [str(out_dir)] * len(chunks), chunks)
+    try:
+        for chunk_entries in results:
+            entries.extend(chunk_entries)
+            if progress:
+                progress(len(entries), len(rows))
+    finally:
+        if executor:
+            executor.shutdown()
+    manifest = {
+        "size": [SCREEN_WIDTH, SCREEN_HEIGHT],
+        "count": len(entries),
+        "seconds": round(time.perf_counter() - start, 2),
+        "badges": entries,
+    }
+    (out_dir / MANIFEST).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def one_at_a_time(name, subtitle, font_path=None):
+    """The old way, for comparison: reload fonts, redraw the whole design, add the name, encode it all"""
+    from fwi_encoder import encode_fwi
+
+    name_font.cache_clear()
+    img = create_badge_design_image()
+    draw = ImageDraw.Draw(img)
+    for text, y, size in ((name, NAME_Y, NAME_SIZE), (subtitle, SUBTITLE_Y, SUBTITLE_SIZE)):
+        if text:
+            text, font = fit_text(text, size, font_path)
+            draw.text((SCREEN_WIDTH // 2, y), text, fill=AZURE_BLUE_RGB, font=font, anchor="mt")
+    return encode_fwi(img, size=None)
+
+
+def benchmark(count, workers, font_path):
+    first = ["Ada", "Grace", "Linus", "Margaret", "Dennis", "Barbara", "Ken", "Radia", "Bjarne", "Frances"]
+    last = ["Lovelace", "Hopper", "Torvalds", "Hamilton", "Ritchie", "Liskov", "Thompson", "Perlman",
+            "Stroustrup-Van Der Berg", "Allen"]
+    companies = ["Contoso", "Fabrikam", "Northwind Traders", "Adventure Works", "Tailspin Toys"]
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        csv_path = tmp / "attendees.csv"
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["name", "company"])
+            for i in range(count):
+                writer.writerow([f"{first[i % 10]} {last[i // 10 % 10]}", companies[i % 5]])
+        rows = read_attendees(csv_path, "company")
+
+        sample = min(20, count)
+        start = time.perf_counter()
+        for _, name, subtitle in rows[:sample]:
+            one_at_a_time(name, subtitle, font_path)
+        old_each = (time.perf_counter() - start) / sample
+
+        workers = workers or os.cpu_count() or 1
+        manifest = render_all(rows, tmp / "out", workers, font_path)
+        seconds = manifest["seconds"]
+        written = sum(1 for _ in (tmp / "out").glob("*.fwi"))
+
+        # Splicing the band in has to give the same bytes as drawing the whole badge
+        same = all((tmp / "out" / file_name).read_bytes() == one_at_a_time(name, subtitle, font_path)
+                   for file_name, name, subtitle in rows[:sample])
+
+    print(f"{count} badges, {workers} worker(s)")
+    print(f"one at a time       {old_each * 1000:6.1f} ms per badge (~{old_each * count:.0f} s for all)")
+    print(f"batch               {seconds / count * 1000:6.1f} ms per badge ({seconds:.1f} s, "
+          f"{count / seconds:.0f} badges/s)")
+    ok = written == count and same and seconds < TARGET_SECONDS
+    print(f"{'✓' if ok else '✗'} {written} FWI files and a manifest in {seconds:.1f} s "
+          f"(target {TARGET_SECONDS} s)")
+    return 0 if ok else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render personalized badge images from an attendee CSV")
+    parser.add_argument("csv", nargs="?", help="Attendee CSV with a name column")
+    parser.add_argument("out", nargs="?", help="Output directory for the FWI files and manifest.json")
+    parser.add_argument("--subtitle", help="CSV column for the second line (e.g. company)")
+    parser.add_argument("--workers", type=int, help="Processes (default: one per CPU)")
+    parser.add_argument("--font", help="TrueType font for the names")
+    parser.add_argument("--bench", action="store_true", help="Render synthetic attendees and time it")
+    parser.add_argument("--count", type=int, default=5000, help="Attendees for --bench")
+    args = parser.parse_args()
+
+    if args.bench:
+        return benchmark(args.count, args.workers, args.font)
+    if not (args.csv and args.out):
+        parser.print_help()
+        return 1
+    try:
+        rows = read_attendees(args.csv, args.subtitle and args.subtitle.lower())
+    except (OSError, ValueError) as e:
+        print(f"ERROR: {e}")
+        return 1
+
+    def progress(done, total):
+        print(f"\r  {done}/{total}", end="", flush=True)
+
+    manifest = render_all(rows, args.out, args.workers, args.font, progress)
+    print(f"\nRendered {manifest['count']} badges in {manifest['seconds']:.1f} s")
+    print(f"Manifest: {Path(args.out) / MANIFEST}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
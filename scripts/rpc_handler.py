@@ -0,0 +1,195 @@
+"""
+MVP Security Badge - Framed Command Handler
+Answers framed binary requests from the host (badge_rpc.py in the repo root)
+
+Start it with badge_rpc.py --start, so the host knows to send frames. It
+serves requests on the USB console until the host sends QUIT, then returns
+to the menu. Anything that
+is not a frame is ignored, so stray menu keystrokes do no harm.
+
+Request (little-endian):
+    ESC 'R', uint16 id, uint8 op, uint16 length, payload, uint32 CRC32 of id..payload
+Reply:
+    ESC 'r', uint16 id, uint8 status, uint16 length, payload, uint32 CRC32 of id..payload
+
+Keep the constants in step with badge_rpc.py.
+
+Author: David Broggy
+"""
+
+import os
+import struct
+import sys
+
+REQUEST_MAGIC = b"\x1bR"
+REPLY_MAGIC = b"\x1br"
+HEADER = "<HBH"
+HEADER_SIZE = 5
+MAX_PAYLOAD = 4096
+
+# Operations
+PING, LIST, STAT, READ, CRC, QUIT = 0, 1, 2, 3, 4, 5
+
+# Reply status
+OK, BAD_CRC, UNKNOWN_OP, NOT_FOUND, FAILED = 0, 1, 2, 3, 4
+
+try:
+    from binascii import crc32
+except ImportError:
+    crc32 = None
+
+if crc32 is None:
+    _TABLE = []
+    for _n in range(256):
+        _c = _n
+        for _ in range(8):
+            _c = (_c >> 1) ^ 0xEDB88320 if _c & 1 else _c >> 1
+        _TABLE.append(_c)
+
+    def crc32(data, crc=0):
+        crc ^= 0xFFFFFFFF
+        for byte in data:
+            crc = _TABLE[(crc ^ byte) & 0xFF] ^ (crc >> 8)
+        return crc ^ 0xFFFFFFFF
+
+
+def read_exact(stream, count):
+    """count bytes from stream, or b'' once it is closed"""
+    data = b""
+    while len(data) < count:
+        chunk = stream.read(count - len(data))
+        if not chunk:
+            return b""
+        data += chunk
+    return data
+
+
+def reply(out, request_id, status, payload=b""):
+    body = struct.pack(HEADER, request_id, status, len(payload)) + payload
+    out.write(REPLY_MAGIC + body + struct.pack("<I", crc32(body) & 0xFFFFFFFF))
+    if hasattr(out, "flush"):
+        out.flush()
+
+
+def join(root, path):
+    return root.rstrip("/") + "/" + path.lstrip("/")
+
+
+def is_dir(path):
+    try:
+        return os.stat(path)[0] & 0x4000 != 0
+    except OSError:
+        return False
+
+
+def file_size(path):
+    return os.stat(path)[6]
+
+
+def handle(op, payload, root):
+    """(status, reply payload) for one request"""
+    if op == PING:
+        return OK, payload
+    if op == QUIT:
+        return OK, b""
+    if op == READ:
+        offset, count = struct.unpack("<IH", payload[:6])
+        path = join(root, payload[6:].decode())
+    else:
+        path = join(root, payload.decode())
+    try:
+        if op == LIST:
+            lines = []
+            for name in sorted(os.listdir(path)):
+                full = join(path, name)
+                if is_dir(full):
+                    lines.append(name + "/\t-1")
+                else:
+                    lines.append(name + "\t" + str(file_size(full)))
+            return OK, "\n".join(lines).encode()
+        if op == STAT:
+            return OK, struct.pack("<I", file_size(path))
+        if op == READ:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                return OK, f.read(min(count, MAX_PAYLOAD))
+        if op == CRC:
+            crc = 0
+            with open(path, "rb") as f:
+                while True:
+                    block = f.read(1024)
+                    if not block:
+                        break
+                    crc = crc32(block, crc)
+            return OK, struct.pack("<I", crc & 0xFFFFFFFF)
+    except OSError as e:
+        if e.args and e.args[0] == 2:
+            return NOT_FOUND, path.encode()
+        return FAILED, str(e).encode()
+    return UNKNOWN_OP, b""
+
+
+def serve(inp, out, root="/"):
+    """Answer requests in order until QUIT or the input closes; returns the number served"""
+    served = 0
+    while True:
+        # Hunt for the start of a frame
+        byte = inp.read(1)
+        if not byte:
+            return served
+        if byte != REQUEST_MAGIC[:1]:
+            continue
+        byte = inp.read(1)
+        if byte != REQUEST_MAGIC[1:]:
+            continue
+        header = read_exact(inp, HEADER_SIZE)
+        if not header:
+            return served
+        request_id, op, length = struct.unpack(HEADER, header)
+        if length > MAX_PAYLOAD:
+            reply(out, request_id, BAD_CRC)
+            continue
+        rest = read_exact(inp, length + 4)
+        if not rest:
+            return served
+        payload = rest[:length]
+        if struct.unpack("<I", rest[length:])[0] != crc32(header + payload) & 0xFFFFFFFF:
+            reply(out, request_id, BAD_CRC)
+            continue
+        status, data = handle(op, payload, root)
+        reply(out, request_id, status, data)
+        served += 1
+        if op == QUIT:
+            return served
+
+
+def run(inp, out, root="/", console=None):
+    """serve() with the console's Ctrl-C turned off, and back on afterwards.
+
+    Ids, lengths and CRCs contain 0x03, which the REPL console would take
+    as Ctrl-C and stop the script with KeyboardInterrupt. console is the
+    micropython module (anything with kbd_intr); None imports it if there
+    is one.
+    """
+    if console is None:
+        try:
+            import micropython as console
+        except ImportError:
+            console = None
+    if console:
+        console.kbd_intr(-1)
+    try:
+        return serve(inp, out, root)
+    finally:
+        if console:
+            console.kbd_intr(3)
+
+
+def main():
+    inp = getattr(sys.stdin, "buffer", sys.stdin)
+    out = getattr(sys.stdout, "buffer", sys.stdout)
+    run(inp, out)
+
+
+if __name__ == "__main__":
+    main()
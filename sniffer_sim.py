@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+WiFiSniffer Table Replay Simulator
+
+The firmware's WiFiSniffer (include/wifi_sniffer.h) keeps at most
+MAX_NETWORKS entries and finds a BSSID by scanning them in order. Nothing
+says what happens once the table is full. This replays a beacon stream
+through Python models of addOrUpdateNetwork/findNetwork and of the channel
+hopper, so table designs and sizes can be compared before choosing one for
+the badge.
+
+Beacons come from a pcap (802.11 or radiotap link type, e.g. from
+`airodump-ng -w` or `tcpdump -I`) or from a synthetic conference hall:
+hundreds of access points crowded onto channels 1/6/11 plus phone hotspots
+that come and go. The hopper only hears a beacon if it is on that channel
+at that moment, using the hop settings in include/config.h.
+
+Table designs are an index and a policy for when the table is full:
+    linear    scan the entries in order (the current firmware)
+    hash      open-addressed index of 2x the capacity, linear probing
+    drop      ignore new networks (what the current code implies)
+    lru       replace the network heard least recently
+    rssi      replace the weakest network, if the new one is stronger
+
+For each design and size it reports BSSID comparisons per beacon, evictions
+(and re-admissions of networks evicted earlier), and coverage: how many of
+the networks heard were ever in the table, how many heard in the last 30 s
+are in it at the end, and how many of the 20 strongest.
+
+Usage:
+    python3 sniffer_sim.py                              # synthetic hall, default sizes and designs
+    python3 sniffer_sim.py --aps 600 --seconds 300 --sizes 64 100 200
+    python3 sniffer_sim.py --pcap hall.pcap [--no-hop]  # --no-hop: the capture already hopped
+    python3 sniffer_sim.py --save-pcap hall.pcap        # write the synthetic stream out
+"""
+
+import argparse
+import pathlib
+import re
+import struct
+import sys
+from collections import namedtuple
+
+import numpy as np
+
+CONFIG_H = pathlib.Path(__file__).resolve().parent / "include" / "config.h"
+
+Beacon = namedtuple("Beacon", "time bssid ssid channel rssi")
+Result = namedtuple("Result", "design size beacons heard mean_cost max_cost evictions readmitted "
+                              "rejected discovered live strongest memory")
+
+# sizeof(WiFiNetwork) on a 32-bit target: 33+6+1+1+1 bytes, padded to 44, three uint32, a bool, padded
+ENTRY_BYTES = 60
+LIVE_WINDOW = 30.0
+STRONGEST = 20
+SENSITIVITY = -92
+BEACON_INTERVAL = 0.1024
+DESIGNS = ("linear+drop", "hash+drop", "hash+lru", "hash+rssi", "linear+rssi")
+SIZES = (50, 100, 200)
+
+PCAP_MAGIC = {b"\xd4\xc3\xb2\xa1": ("<", 1e6), b"\xa1\xb2\xc3\xd4": (">", 1e6),
+              b"\x4d\x3c\xb2\xa1": ("<", 1e9), b"\xa1\xb2\x3c\x4d": (">", 1e9)}
+LINKTYPE_80211 = 105
+LINKTYPE_RADIOTAP = 127
+# Radiotap fields before the antenna signal: (size, alignment) for present bits 0-4
+RADIOTAP_FIELDS = [(8, 8), (1, 1), (1, 1), (4, 2), (2, 2)]
+
+
+def hop_config(path=CONFIG_H):
+    """(channels, seconds per channel) from the firmware's config.h"""
+    text = pathlib.Path(path).read_text()
+    values = {}
+    for name in ("START_CHANNEL", "END_CHANNEL", "CHANNEL_HOP_INTERVAL_MS"):
+        match = re.search(rf"^\s*#define\s+{name}\s+(\d+)", text, re.MULTILINE)
+        if not match:
+            raise ValueError(f"{name} not found in {path}")
+        values[name] = int(match.group(1))
+    channels = list(range(values["START_CHANNEL"], values["END_CHANNEL"] + 1))
+    return channels, values["CHANNEL_HOP_INTERVAL_MS"] / 1000
+
+
+def hopper_hears(times, channels, hop_channels, dwell):
+    """Mask of beacons sent on the channel the hopper is tuned to at that moment"""
+    tuned = np.asarray(hop_channels)[(np.asarray(times) // dwell).astype(int) % len(hop_channels)]
+    return tuned == np.asarray(channels)
+
+
+# --- Beacon sources -------------------------------------------------------
+
+def synthetic_hall(aps=300, seconds=120.0, hotspots=0.3, seed=1):
+    """Beacons from a crowded hall, time-ordered.
+
+    Fixed access points sit mostly on channels 1, 6 and 11 at 5-80 m. A share
+    of `hotspots` of them are phones that appear and vanish during the run.
+    """
+    rng = np.random.default_rng(seed)
+    channel_weights = np.full(13, 0.02)
+    channel_weights[[0, 5, 10]] = 0.26
+    channel_weights /= channel_weights.sum()
+
+    times, owners = [], []
+    ap_channels = rng.choice(np.arange(1, 14), size=aps, p=channel_weights)
+    distance = rng.uniform(5, 80, size=aps)
+    # Log-distance path loss, exponent 3 indoors
+    base_rssi = -40 - 30 * np.log10(distance)
+    for ap in range(aps):
+        if rng.random() < hotspots:
+            start = rng.uniform(0, seconds)
+            stop = min(seconds, start + rng.uniform(10, 60))
+        else:
+            start, stop = 0.0, seconds
+        first = start + rng.uniform(0, BEACON_INTERVAL)
+        sent = np.arange(first, stop, BEACON_INTERVAL)
+        times.append(sent)
+        owners.append(np.full(len(sent), ap))
+    times = np.concatenate(times)
+    owners = np.concatenate(owners)
+    order = np.argsort(times, kind="stable")
+    times, owners = times[order], owners[order]
+    rssi = np.clip(base_rssi[owners] + rng.normal(0, 4, size=len(owners)), -100, -20).round()
+
+    bssids = [bytes([0x02, 0x00]) + struct.pack(">I", 0x1000 + ap * 7919) for ap in range(aps)]
+    ssids = [f"Hall-{ap % 40}" if ap % 3 else f"Phone-{ap}" for ap in range(aps)]
+    return [Beacon(float(t), bssids[ap], ssids[ap], int(ap_channels[ap]), int(r))
+            for t, ap, r in zip(times.tolist(), owners.tolist(), rssi.tolist())]
+
+
+def parse_beacon(frame):
+    """(bssid, ssid, channel or None) from an 802.11 beacon or probe response, else None"""
+    if len(frame) < 36 or frame[0] not in (0x80, 0x50):
+        return None
+    bssid = bytes(frame[16:22])
+    ssid, channel = "", None
+    at = 36
+    while at + 2 <= len(frame):
+        element, length = frame[at], frame[at + 1]
+        value = frame[at + 2:at + 2 + length]
+        if element == 0:
+            ssid = value.decode("utf-8", errors="replace")
+        elif element == 3 and length == 1:
+            channel = value[0]
+        at += 2 + length
+    return bssid, ssid, channel
+
+
+def parse_radiotap(packet):
+    """(header length, dBm signal or None, channel or None) of a radiotap header"""
+    length = struct.unpack_from("<H", packet, 2)[0]
+    present = [struct.unpack_from("<I", packet, 4)[0]]
+    offset = 8
+    while present[-1] & 0x80000000:
+        present.append(struct.unpack_from("<I", packet, offset)[0])
+        offset += 4
+    signal = channel = None
+    for bit, (size, align) in enumerate(RADIOTAP_FIELDS + [(1, 1)]):
+        if not present[0] & (1 << bit):
+            continue
+        offset = -(-offset // align) * align
+        if bit == 3:
+            frequency = struct.unpack_from("<H", packet, offset)[0]
+            channel = 14 if frequency == 2484 else (frequency - 2407) // 5 if 2412 <= frequency < 2484 else None
+        if bit == 5:
+            signal = struct.unpack_from("<b", packet, offset)[0]
+        offset += size
+    return length, signal, channel
+
+
+def read_pcap(path):
+    """Beacons in a classic pcap file; times relative to the first packet"""
+    data = pathlib.Path(path).read_bytes()
+    if data[:4] not in PCAP_MAGIC:
+        raise ValueError(f"{path} is not a pcap file (pcapng is not supported; convert with editcap -F pcap)")
+    endian, ticks = PCAP_MAGIC[data[:4]]
+    linktype = struct.unpack_from(f"{endian}I", data, 20)[0]
+    if linktype not in (LINKTYPE_80211, LINKTYPE_RADIOTAP):
+        raise ValueError(f"{path} has link type {linktype}; need 802.11 (105) or radiotap (127)")
+    record = struct.Struct(f"{endian}IIII")
+    beacons = []
+    offset = 24
+    start = None
+    while offset + record.size <= len(data):
+        seconds, fraction, captured, _ = record.unpack_from(data, offset)
+        packet = data[offset + record.size:offset + record.size + captured]
+        offset += record.size + captured
+        t = seconds + fraction / ticks
+        start = t if start is None else start
+        signal = tap_channel = None
+        if linktype == LINKTYPE_RADIOTAP:
+            header, signal, tap_channel = parse_radiotap(packet)
+            packet = packet[header:]
+        parsed = parse_beacon(packet)
+        if not parsed or (parsed[2] or tap_channel) is None:
+            continue
+        bssid, ssid, channel = parsed
+        beacons.append(Beacon(t - start, bssid, ssid, channel or tap_channel, signal if signal is not None else -70))
+    return beacons
+
+
+def write_pcap(path, beacons):
+    """Radiotap pcap of the beacons (signal and channel in the radiotap header)"""
+    out = [struct.pack("<IHHiIII", 0xa1b2c3d4, 2, 4, 0, 0, 65535, LINKTYPE_RADIOTAP)]
+    for beacon in beacons:
+        # Present: flags (1), channel (3), antenna signal (5)
+        frequency = 2484 if beacon.channel == 14 else 2407 + 5 * beacon.channel
+        radiotap = struct.pack("<BBHIBBHHb", 0, 0, 15, 0b101010, 0, 0, frequency, 0x00a0, beacon.rssi)
+        ssid = beacon.ssid.encode()[:32]
+        frame = (b"\x80\x00\x00\x00" + b"\xff" * 6 + beacon.bssid + beacon.bssid + b"\x00\x00"
+                 + bytes(8) + struct.pack("<HH", 100, 0x0411)
+                 + bytes([0, len(ssid)]) + ssid + bytes([3, 1, beacon.channel]))
+        packet = radiotap + frame
+        seconds = int(beacon.time)
+        out.append(struct.pack("<IIII", seconds, int((beacon.time - seconds) * 1e6), len(packet), len(packet)))
+        out.append(packet)
+    pathlib.Path(path).write_bytes(b"".join(out))
+
+
+# --- Table models ---------------------------------------------------------
+
+class NetworkTable:
+    """Model of WiFiSniffer's network table, counting BSSID comparisons.
+
+    index is "linear" (findNetwork as declared) or "hash"; policy is what a
+    new network does to a full table: "drop", "lru" or "rssi".
+    """
+
+    def __init__(self, capacity, index="linear", policy="drop"):
+        self.capacity = capacity
+        self.index = index
+        self.policy = policy
+        self.entries = []
+        self.slots = [None] * (2 * capacity) if index == "hash" else None
+        self.compares = 0
+        self.evictions = 0
+        self.readmitted = 0
+        self.rejected = 0
+        self.admitted = set()
+        self._evicted = set()
+
+    def memory(self):
+        # The hash index holds one uint8/uint16 entry number per slot
+        slot_bytes = 1 if self.capacity < 255 else 2
+        return self.capacity * ENTRY_BYTES + (len(self.slots) * slot_bytes if self.slots else 0)
+
+    def _home(self, bssid):
+        return int.from_bytes(bssid[3:], "little") * 2654435761 % len(self.slots)
+
+    def find(self, bssid):
+        """Entry number or -1, as findNetwork"""
+        if self.index == "linear":
+            for i, entry in enumerate(self.entries):
+                self.compares += 1
+                if entry["bssid"] == bssid:
+                    return i
+            return -1
+        slot = self._home(bssid)
+        while self.slots[slot] is not None:
+            self.compares += 1
+            if self.entries[self.slots[slot]]["bssid"] == bssid:
+                return self.slots[slot]
+            slot = (slot + 1) % len(self.slots)
+        return -1
+
+    def _index(self, number):
+        slot = self._home(self.entries[number]["bssid"])
+        while self.slots[slot] is not None:
+            slot = (slot + 1) % len(self.slots)
+        self.slots[slot] = number
+
+    def _unindex(self, number):
+        slot = self._home(self.entries[number]["bssid"])
+        while self.slots[slot] != number:
+            slot = (slot + 1) % len(self.slots)
+        # Backward-shift deletion keeps probe chains intact without tombstones
+        empty = slot
+        slot = (slot + 1) % len(self.slots)
+        while self.slots[slot] is not None:
+            home = self._home(self.entries[self.slots[slot]]["bssid"])
+            if (slot - home) % len(self.slots) >= (slot - empty) % len(self.slots):
+                self.slots[empty] = self.slots[slot]
+                self.slots[slot] = None
+                empty = slot
+            slot = (slot + 1) % len(self.slots)
+        self.slots[empty] = None
+
+    def _victim(self, rssi):
+        # A scan of every entry on the badge as well
+        self.compares += len(self.entries)
+        if self.policy == "lru":
+            return min(range(len(self.entries)), key=lambda i: self.entries[i]["last_seen"])
+        weakest = min(range(len(self.entries)), key=lambda i: self.entries[i]["rssi"])
+        return weakest if self.entries[weakest]["rssi"] < rssi else None
+
+    def add_or_update(self, beacon):
+        """addOrUpdateNetwork; returns True if the network is in the table afterwards"""
+        number = self.find(beacon.bssid)
+        if number >= 0:
+            entry = self.entries[number]
+            entry.update(rssi=beacon.rssi, channel=beacon.channel, last_seen=beacon.time)
+            entry["frame_count"] += 1
+            return True
+
+        entry = {"bssid": beacon.bssid, "ssid": beacon.ssid, "channel": beacon.channel, "rssi": beacon.rssi,
+                 "first_seen": beacon.time, "last_seen": beacon.time, "frame_count": 1}
+        if len(self.entries) < self.capacity:
+            self.entries.append(entry)
+            number = len(self.entries) - 1
+        else:
+            number = None if self.policy == "drop" else self._victim(beacon.rssi)
+            if number is None:
+                self.rejected += 1
+                return False
+            self.evictions += 1
+            self._evicted.add(self.entries[number]["bssid"])
+            if self.slots:
+                self._unindex(number)
+            self.entries[number] = entry
+        if self.slots:
+            self._index(number)
+        if beacon.bssid in self._evicted:
+            self.readmitted += 1
+        self.admitted.add(beacon.bssid)
+        return True
+
+    def bssids(self):
+        return {entry["bssid"] for entry in self.entries}
+
+
+def replay(beacons, capacity, design):
+    """Run heard beacons through one table design; returns a Result"""
+    index, policy = design.split("+")
+    table = NetworkTable(capacity, index, policy)
+    worst = 0
+    for beacon in beacons:
+        before = table.compares
+        table.add_or_update(beacon)
+        worst = max(worst, table.compares - before)
+
+    heard = {beacon.bssid for beacon in beacons}
+    end = beacons[-1].time if beacons else 0.0
+    recent = {}
+    for beacon in beacons:
+        if beacon.time >= end - LIVE_WINDOW:
+            recent.setdefault(beacon.bssid, []).append(beacon.rssi)
+    strongest = sorted(recent, key=lambda bssid: -np.mean(recent[bssid]))[:STRONGEST]
+    present = table.bssids()
+
+    def share(group):
+        return sum(bssid in present for bssid in group) / len(group) if group else 1.0
+
+    return Result(design, capacity, len(beacons), len(heard), table.compares / max(1, len(beacons)), worst,
+                  table.evictions, table.readmitted, table.rejected,
+                  len(table.admitted) / max(1, len(heard)), share(recent), share(strongest), table.memory())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay beacons through WiFiSniffer table designs")
+    parser.add_argument("--pcap", help="Replay a capture instead of a synthetic hall")
+    parser.add_argument("--no-hop", action="store_true", help="Keep every beacon (capture already hopped)")
+    parser.add_argument("--aps", type=int, default=300, help="Access points in the synthetic hall")
+    parser.add_argument("--seconds", type=float, default=120.0, help="Length of the synthetic capture")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--designs", nargs="+", default=list(DESIGNS), help="index+policy, e.g. hash+lru")
+    parser.add_argument("--save-pcap", help="Write the synthetic beacons to a pcap and exit")
+    args = parser.parse_args()
+
+    for design in args.designs:
+        index, _, policy = design.partition("+")
+        if index not in ("linear", "hash") or policy not in ("drop", "lru", "rssi"):
+            print(f"✗ Unknown design '{design}' (index linear|hash, policy drop|lru|rssi)")
+            return 1
+
+    if args.pcap:
+        try:
+            beacons = read_pcap(args.pcap)
+        except (OSError, ValueError, struct.error) as e:
+            print(f"✗ {e}")
+            return 1
+        source = f"{args.pcap}: {len(beacons)} beacons"
+    else:
+        beacons = synthetic_hall(args.aps, args.seconds, seed=args.seed)
+        source = f"synthetic hall: {args.aps} APs, {args.seconds:.0f} s, {len(beacons)} beacons"
+    if args.save_pcap:
+        write_pcap(args.save_pcap, beacons)
+        print(f"✓ Wrote {len(beacons)} beacons to {args.save_pcap}")
+        return 0
+
+    beacons = [beacon for beacon in beacons if beacon.rssi >= SENSITIVITY]
+    if not args.no_hop and beacons:
+        hop_channels, dwell = hop_config()
+        heard = hopper_hears([b.time for b in beacons], [b.channel for b in beacons], hop_channels, dwell)
+        beacons = [beacon for beacon, keep in zip(beacons, heard.tolist()) if keep]
+        source += f"; hopping {hop_channels[0]}-{hop_channels[-1]} at {dwell * 1000:.0f} ms hears {len(beacons)}"
+    if not beacons:
+        print("✗ No beacons to replay")
+        return 1
+    print(source)
+    print(f"{len({b.bssid for b in beacons})} distinct networks heard\n")
+
+    print(f"{'design':<12} {'size':>4} {'memory':>7} {'cmp/beacon':>10} {'worst':>5} {'evicted':>7} "
+          f"{'re-adm':>6} {'rejected':>8} {'ever in':>7} {'live':>5} {'top20':>5}")
+    for size in args.sizes:
+        for design in args.designs:
+            r = replay(beacons, size, design)
+            print(f"{r.design:<12} {r.size:>4} {r.memory / 1024:>6.1f}K {r.mean_cost:>10.1f} {r.max_cost:>5} "
+                  f"{r.evictions:>7} {r.readmitted:>6} {r.rejected:>8} {r.discovered:>7.0%} "
+                  f"{r.live:>5.0%} {r.strongest:>5.0%}")
+        print()
+    print(f"cmp: BSSID comparisons per beacon, including any eviction scan. ever in: share of networks "
+          f"heard that made it into the table.\nlive / top20: share of the networks heard in the last "
+          f"{LIVE_WINDOW:.0f} s / the {STRONGEST} strongest of them that are in the table at the end.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,11 +6,15 @@
 #include "config.h"
 #include "wifi_sniffer.h"
 #include "display_3d.h"
+#include "frame_stream.h"
+#include "telemetry.h"
 
 // Global objects
 TFT_eSPI tft = TFT_eSPI();
 WiFiSniffer* sniffer;
 Display3D* display3d;
+FrameStreamReceiver* frameStream;
+Telemetry* telemetry;
 
 // State variables
 bool scanning = false;
@@ -60,6 +64,14 @@ void setup() {
     display3d->begin();
     display3d->setMode(displayMode);
 
+    // Frames streamed from the host (frame_stream.py)
+    frameStream = new FrameStreamReceiver(&tft);
+    frameStream->begin();
+
+    // Battery and sensor queries from telemetry.py arrive on the same port
+    telemetry = new Telemetry(readBatteryVoltage);
+    frameStream->onCommand('T', [](uint8_t mask) { telemetry->answer(mask); });
+
     // Setup buttons
     setupButtons();
 
@@ -82,6 +94,11 @@ void loop() {
         lastButtonCheck = currentMillis;
     }
 
+    // Streamed frames own the screen while they keep arriving
+    if (frameStream->poll()) {
+        return;
+    }
+
     // Update scanner if active
     if (scanning) {
         sniffer->update();
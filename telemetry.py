@@ -0,0 +1,493 @@
+#!/usr/bin/env python3
+"""
+Badge Telemetry Poller
+
+Samples battery voltage and sensor readings at a rate per field. Fields that
+are due at about the same time are asked for in one query, so each poll is a
+single round trip however many fields it carries. The badge firmware
+(include/telemetry.h, built into src/main.cpp) answers the queries.
+
+Samples go into fixed-size ring buffers, one per field per badge, held in
+preallocated arrays so memory stays flat however long the poller runs.
+series() returns a time window downsampled to a number of points, each the
+mean, min and max of its bucket.
+
+Polls are spaced so telemetry uses at most LINK_BUDGET (5%) of the link,
+counting both the bytes sent and the time the port is busy. Under
+badge_daemon.py the queries wait behind client requests, so a display
+command is held up by at most one query's round trip.
+
+Query:
+    ESC 'T', uint8 field mask
+Reply (little-endian):
+    ESC 't', uint8 mask, float32 per field in the mask (bit order), uint32 CRC32 of the rest
+A field the badge has no sensor for comes back as NaN and is not asked for again.
+
+Usage:
+    python3 telemetry.py --bench                 # stand-in badge, no hardware needed
+    python3 telemetry.py --watch [--port PORT] [--every battery=10 temperature=5]
+    python3 badge_daemon.py serve --telemetry    # poll inside the daemon instead
+
+Other tools:
+    from telemetry import TelemetryPoller, TelemetryStore
+    store = TelemetryStore()
+    TelemetryPoller(SerialQuery(ser), "badge", store).start()
+    store.series("badge", "battery", seconds=600, points=20)
+"""
+
+import argparse
+import math
+import os
+import select
+import statistics
+import struct
+import sys
+import threading
+import time
+import zlib
+from array import array
+from collections import namedtuple
+
+import numpy as np
+
+Field = namedtuple("Field", "name bit unit interval")
+
+# Default intervals in seconds; battery voltage changes slowly
+FIELDS = (
+    Field("battery", 0x01, "V", 10.0),
+    Field("temperature", 0x02, "°C", 5.0),
+    Field("humidity", 0x04, "%", 30.0),
+    Field("pressure", 0x08, "hPa", 30.0),
+)
+FIELDS_BY_NAME = {field.name: field for field in FIELDS}
+
+QUERY_MAGIC = b"\x1bT"
+REPLY_MAGIC = b"\x1bt"
+QUERY = struct.Struct("<2sB")
+REPLY_TIMEOUT = 0.5
+HISTORY = 4096
+LINK_BUDGET = 0.05
+# A field due within this share of its interval rides along with the current poll
+COALESCE = 0.5
+
+PollStats = namedtuple("PollStats", "polls fields failures bytes busy elapsed link_share")
+
+
+def fields_in(mask):
+    return [field for field in FIELDS if mask & field.bit]
+
+
+def reply_size(mask):
+    return len(REPLY_MAGIC) + 1 + 4 * len(fields_in(mask)) + 4
+
+
+def pack_reply(mask, values):
+    """Reply for a query; values maps field name to a float (missing ones go as NaN)"""
+    body = REPLY_MAGIC + bytes([mask]) + b"".join(
+        struct.pack("<f", values.get(field.name, math.nan)) for field in fields_in(mask))
+    return body + struct.pack("<I", zlib.crc32(body))
+
+
+def unpack_reply(data, mask):
+    """{field name: value} from a reply, or ValueError if it is not the answer to mask"""
+    if len(data) != reply_size(mask) or data[:2] != REPLY_MAGIC or data[2] != mask:
+        raise ValueError("telemetry reply does not match the query")
+    (crc,) = struct.unpack_from("<I", data, len(data) - 4)
+    if crc != zlib.crc32(data[:-4]):
+        raise ValueError("telemetry reply failed its CRC")
+    return {field.name: struct.unpack_from("<f", data, 3 + 4 * i)[0] for i, field in enumerate(fields_in(mask))}
+
+
+class SerialQuery:
+    """One telemetry round trip on an open serial port: query(mask) -> {field: value}"""
+
+    def __init__(self, ser, timeout=REPLY_TIMEOUT):
+        self.ser = ser
+        self.timeout = timeout
+
+    def __call__(self, mask):
+        self.ser.write(QUERY.pack(QUERY_MAGIC, mask))
+        return unpack_reply(read_reply(self.ser, mask, self.timeout), mask)
+
+
+def read_reply(ser, mask, timeout=REPLY_TIMEOUT):
+    """Bytes of the reply to mask, skipping anything the badge printed before it"""
+    deadline = time.perf_counter() + timeout
+    data = b""
+    while time.perf_counter() < deadline:
+        data += ser.read(max(1, reply_size(mask) - len(data)))
+        start = data.find(REPLY_MAGIC)
+        if start < 0:
+            data = data[-1:]
+        elif len(data) - start >= reply_size(mask):
+            return data[start:start + reply_size(mask)]
+    raise TimeoutError("no telemetry reply")
+
+
+class RingBuffer:
+    """The last `capacity` (time, value) samples of one field, in two preallocated arrays"""
+
+    def __init__(self, capacity=HISTORY):
+        self.capacity = capacity
+        self.times = array('d', bytes(8 * capacity))
+        self.values = array('d', bytes(8 * capacity))
+        self.count = 0
+        self._next = 0
+
+    def __len__(self):
+        return self.count
+
+    def append(self, t, value):
+        self.times[self._next] = t
+        self.values[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def latest(self):
+        if not self.count:
+            return None
+        i = (self._next - 1) % self.capacity
+        return self.times[i], self.values[i]
+
+    def samples(self):
+        """(times, values) as numpy arrays, oldest first"""
+        times = np.frombuffer(self.times, dtype=np.float64)
+        values = np.frombuffer(self.values, dtype=np.float64)
+        if self.count < self.capacity:
+            return times[:self.count].copy(), values[:self.count].copy()
+        return np.roll(times, -self._next), np.roll(values, -self._next)
+
+    def series(self, seconds=None, points=60, now=None):
+        """[(time, mean, min, max)] over the last `seconds`, at most `points` buckets"""
+        times, values = self.samples()
+        if seconds is not None:
+            keep = times >= (time.time() if now is None else now) - seconds
+            times, values = times[keep], values[keep]
+        if len(times) <= points:
+            return [(t, v, v, v) for t, v in zip(times.tolist(), values.tolist())]
+
+        # Equal-width time buckets; empty ones are left out
+        edges = np.linspace(times[0], times[-1], points + 1)[:-1]
+        starts = np.unique(np.searchsorted(times, edges))
+        counts = np.diff(np.append(starts, len(times)))
+        means = np.add.reduceat(values, starts) / counts
+        lows = np.minimum.reduceat(values, starts)
+        highs = np.maximum.reduceat(values, starts)
+        mids = np.add.reduceat(times, starts) / counts
+        return list(zip(mids.tolist(), means.tolist(), lows.tolist(), highs.tolist()))
+
+
+class TelemetryStore:
+    """Ring buffers per badge and field, shared by any number of pollers"""
+
+    def __init__(self, capacity=HISTORY):
+        self.capacity = capacity
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def record(self, badge, t, values):
+        with self._lock:
+            for name, value in values.items():
+                if badge not in self._buffers:
+                    self._buffers[badge] = {}
+                if name not in self._buffers[badge]:
+                    self._buffers[badge][name] = RingBuffer(self.capacity)
+                self._buffers[badge][name].append(t, value)
+
+    def badges(self):
+        with self._lock:
+            return {badge: sorted(fields) for badge, fields in self._buffers.items()}
+
+    def latest(self, badge, field):
+        with self._lock:
+            buffer = self._buffers.get(badge, {}).get(field)
+            return buffer.latest() if buffer else None
+
+    def series(self, badge, field, seconds=None, points=60):
+        with self._lock:
+            buffer = self._buffers.get(badge, {}).get(field)
+            return buffer.series(seconds, points) if buffer else []
+
+
+class TelemetryPoller:
+    """Polls one badge on a background thread and records into a TelemetryStore.
+
+    query(mask) does one round trip and returns {field: value}; it may raise
+    on a timeout or bad reply, which counts as a failure and is retried at
+    the next poll. intervals maps field names to seconds (default: FIELDS).
+    link_rate is the bytes/s the badge takes in (the profile's link_rate,
+    not the host's write rate), used for the LINK_BUDGET check.
+    """
+
+    def __init__(self, query, badge, store, intervals=None, link_rate=11520, budget=LINK_BUDGET):
+        self.query = query
+        self.badge = badge
+        self.store = store
+        self.intervals = dict(intervals or {field.name: field.interval for field in FIELDS})
+        self.link_rate = link_rate
+        self.budget = budget
+        self.unsupported = set()
+        self._next_due = {name: 0.0 for name in self.intervals}
+        self._polls = self._fields = self._failures = self._bytes = 0
+        self._busy = 0.0
+        self._started = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+        return self.stats()
+
+    def stats(self):
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        # Whichever is larger: share of the bytes the link could carry, or of the time it was held
+        share = max(self._bytes / (self.link_rate * elapsed), self._busy / elapsed) if elapsed else 0.0
+        return PollStats(self._polls, self._fields, self._failures, self._bytes, self._busy, elapsed, share)
+
+    def poll_once(self, now=None):
+        """Query every field that is due or nearly due; returns seconds until the next poll"""
+        now = time.perf_counter() if now is None else now
+        due = [name for name, at in self._next_due.items()
+               if at - now <= self.intervals[name] * COALESCE]
+        if not any(self._next_due[name] <= now for name in due):
+            return min(self._next_due.values()) - now if self._next_due else 1.0
+
+        mask = sum(FIELDS_BY_NAME[name].bit for name in due)
+        start = time.perf_counter()
+        try:
+            values = self.query(mask)
+        except (OSError, ValueError, RuntimeError) as e:
+            self._failures += 1
+            values = None
+            print(f"  telemetry: {e}", file=sys.stderr)
+        busy = time.perf_counter() - start
+        self._polls += 1
+        self._busy += busy
+        self._bytes += QUERY.size + reply_size(mask)
+
+        if values is not None:
+            supported = {name: value for name, value in values.items() if not math.isnan(value)}
+            for name in set(values) - set(supported):
+                self.unsupported.add(name)
+                self._next_due.pop(name, None)
+            self.store.record(self.badge, time.time(), supported)
+            self._fields += len(supported)
+
+        for name in due:
+            if name in self._next_due:
+                self._next_due[name] = now + self.intervals[name]
+        # Space polls so this one's bytes and port time stay within budget; time spent
+        # queued behind other commands counts, so a busy link is polled less
+        floor = max((QUERY.size + reply_size(mask)) / (self.link_rate * self.budget), busy / self.budget)
+        for name in self._next_due:
+            self._next_due[name] = max(self._next_due[name], now + floor)
+        return min(self._next_due.values()) - now if self._next_due else 1.0
+
+    def _run(self):
+        while not self._stop.is_set() and self._next_due:
+            wait = self.poll_once()
+            self._stop.wait(max(0.0, wait))
+
+
+class StandInBadge:
+    """Local stand-in: a pty that answers telemetry queries and echoes other lines.
+
+    rate is the link's byte rate. An echoed line (a stand-in for a menu
+    command such as show_gui_image) takes command_time on the badge.
+    """
+
+    def __init__(self, rate=11520, command_time=0.02):
+        import pty
+        import tty
+
+        self.rate = rate
+        self.command_time = command_time
+        self.queries = 0
+        self._master, self._slave = pty.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._started = time.time()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join()
+        os.close(self._master)
+        os.close(self._slave)
+
+    def readings(self):
+        t = time.time() - self._started
+        # A battery slowly draining and a board warming up; no humidity or pressure sensor
+        return {"battery": 4.1 - t * 0.001, "temperature": 24.0 + 3 * math.sin(t / 20)}
+
+    def _write(self, data):
+        time.sleep(len(data) / self.rate)
+        os.write(self._master, data)
+
+    def _run(self):
+        buffer = b""
+        while not self._stop.is_set():
+            if not select.select([self._master], [], [], 0.05)[0]:
+                continue
+            chunk = os.read(self._master, 4096)
+            time.sleep(len(chunk) / self.rate)
+            buffer += chunk
+            while buffer:
+                if buffer.startswith(QUERY_MAGIC):
+                    if len(buffer) < QUERY.size:
+                        break
+                    _, mask = QUERY.unpack_from(buffer)
+                    buffer = buffer[QUERY.size:]
+                    self.queries += 1
+                    self._write(pack_reply(mask, self.readings()))
+                elif b"\n" in buffer:
+                    line, _, buffer = buffer.partition(b"\n")
+                    time.sleep(self.command_time)
+                    self._write(line + b"\n")
+                else:
+                    break
+
+
+def command_latencies(ser, lock, seconds, every=0.1):
+    """Send a short command line every `every` seconds; returns each round trip in seconds"""
+    latencies = []
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        with lock:
+            ser.write(b"l images/slide.fwi\n")
+            ser.read_until(b"\n")
+        latencies.append(time.perf_counter() - start)
+        time.sleep(every)
+    return latencies
+
+
+class _LockedQuery:
+    def __init__(self, query, lock):
+        self.query = query
+        self.lock = lock
+
+    def __call__(self, mask):
+        with self.lock:
+            return self.query(mask)
+
+
+def benchmark(rate, seconds, speedup):
+    import serial
+
+    print(f"Stand-in link {rate} B/s, {seconds:.0f} s per run, intervals divided by {speedup:g}")
+    intervals = {field.name: field.interval / speedup for field in FIELDS}
+    results = {}
+    for polling in (False, True):
+        badge = StandInBadge(rate=rate)
+        ser = serial.Serial(badge.port, timeout=REPLY_TIMEOUT)
+        lock = threading.Lock()
+        store = TelemetryStore()
+        poller = TelemetryPoller(_LockedQuery(SerialQuery(ser), lock), "stand-in", store,
+                                 intervals=intervals, link_rate=rate)
+        if polling:
+            poller.start()
+        latencies = command_latencies(ser, lock, seconds)
+        stats = poller.stop() if polling else None
+        ser.close()
+        badge.close()
+        results[polling] = latencies
+        if stats:
+            print(f"telemetry  : {stats.polls} polls, {stats.fields} samples "
+                  f"({stats.fields / max(1, stats.polls):.1f} per round trip), {stats.failures} failed, "
+                  f"{stats.link_share:.1%} of the link")
+            print(f"unsupported: {', '.join(sorted(poller.unsupported)) or 'none'}")
+            for name in store.badges().get("stand-in", []):
+                points = store.series("stand-in", name, points=5)
+                means = ", ".join(f"{mean:.3f}" for _, mean, _, _ in points)
+                print(f"  {name:<12} {len(points)} points: {means}")
+
+    for polling, latencies in results.items():
+        print(f"commands {'with' if polling else 'without':<7}: median {statistics.median(latencies) * 1000:.1f}ms, "
+              f"longest {max(latencies) * 1000:.1f}ms over {len(latencies)}")
+    return 0
+
+
+def parse_intervals(specs):
+    intervals = {field.name: field.interval for field in FIELDS}
+    for spec in specs or []:
+        name, _, seconds = spec.partition("=")
+        if name not in FIELDS_BY_NAME or not seconds:
+            raise ValueError(f"expected field=seconds with field one of {', '.join(FIELDS_BY_NAME)}: {spec}")
+        intervals[name] = float(seconds)
+    return {name: seconds for name, seconds in intervals.items() if seconds > 0}
+
+
+def watch(port, intervals):
+    import serial
+
+    from badge_link_profile import load_profile
+    from badge_ports import MAIN, find_port
+
+    port = port or find_port(MAIN)
+    if not port:
+        print("✗ No badge found on USB")
+        return 1
+    profile = load_profile(port)
+    # Set DTR/RTS before opening so the port never pulses them (a pulse can reset the badge)
+    ser = serial.Serial()
+    ser.port = port
+    ser.baudrate = profile.baudrate
+    ser.timeout = 0.05
+    ser.dtr = True
+    ser.rts = True
+    ser.open()
+
+    store = TelemetryStore()
+    poller = TelemetryPoller(SerialQuery(ser), port, store, intervals, link_rate=profile.link_rate).start()
+    print(f"Polling {port} (Ctrl+C to stop)...")
+    try:
+        while True:
+            time.sleep(min(intervals.values()))
+            latest = [(name, store.latest(port, name)) for name in intervals if name not in poller.unsupported]
+            print("  ".join(f"{name} {sample[1]:.2f}{FIELDS_BY_NAME[name].unit}"
+                            for name, sample in latest if sample))
+    except KeyboardInterrupt:
+        pass
+    stats = poller.stop()
+    ser.close()
+    print(f"✓ {stats.polls} polls, {stats.failures} failed, {stats.link_share:.2%} of the link")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Poll badge battery and sensor telemetry")
+    parser.add_argument("--bench", action="store_true", help="Benchmark against a local stand-in badge")
+    parser.add_argument("--watch", action="store_true", help="Poll the badge and print readings")
+    parser.add_argument("--port", help="Serial port for --watch (default: main processor)")
+    parser.add_argument("--every", nargs="*", metavar="FIELD=SECONDS", help="Poll intervals (0 turns a field off)")
+    parser.add_argument("--rate", type=int, default=11520, help="Stand-in link rate in bytes/s")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Length of each benchmark run")
+    parser.add_argument("--speedup", type=float, default=10.0, help="Divide intervals by this in the benchmark")
+    args = parser.parse_args()
+
+    if args.bench:
+        return benchmark(args.rate, args.seconds, args.speedup)
+    if args.watch:
+        try:
+            intervals = parse_intervals(args.every)
+        except ValueError as e:
+            print(f"✗ {e}")
+            return 1
+        return watch(args.port, intervals)
+    parser.print_help()
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,9 +8,14 @@ import sys
 import pexpect
 import time
 
+from badge_ports import DISPLAY, find_port
+
 def main():
-    # Use Display Processor port
-    port = "/dev/cu.usbmodem214201"
+    # Use Display Processor port (cached, so no USB enumeration on repeat runs)
+    port = sys.argv[1] if len(sys.argv) > 1 else find_port(DISPLAY)
+    if not port:
+        print("✗ No display processor port found")
+        return 1
 
     print(f"Connecting to Display Processor: {port}...")
     print("=" * 60)
@@ -10,37 +10,36 @@ Uses the interactive menu system discovered in the terminal session.
 import sys
 import time
 import serial
-import serial.tools.list_ports
+
+from badge_link_profile import load_profile, read_match
+from badge_ports import DISPLAY, find_port
+
+# Watched for alongside the expected text, so a refused command doesn't wait out the timeout.
+# The menu prints its refusals at the start of a line; file names and log text
+# that merely contain these words are indented or mid-line, so they don't match.
+MENU_ERRORS = ("\nInvalid", "\nFailed")
+# The badge needs this long after a DTR/RTS toggle; the link profile doesn't measure resets
+RESET_WAIT = 0.5
 
 def find_badge_port():
-    """Find the badge USB serial port"""
-    ports = serial.tools.list_ports.comports()
-    for port in ports:
-        if 'usbmodem' in port.device:
-            return port.device
-    return None
-
-def send_command(ser, command, wait=2.0, expect=None):
-    """Send a command and wait for response"""
+    """Find the badge USB serial port (the menu runs on the display processor)"""
+    return find_port(DISPLAY) or find_port()
+
+def send_command(ser, profile, command, wait=2.0, expect=None):
+    """Send a command and read until the expected text, an error (or the link goes quiet)"""
     print(f"\nSending: {repr(command)}")
     ser.write(command.encode())
 
-    # Wait and collect response
-    time.sleep(0.2)  # Initial wait for data to arrive
-    response = b""
-    timeout = time.time() + wait
-
-    while time.time() < timeout:
-        if ser.in_waiting:
-            chunk = ser.read(ser.in_waiting)
-            response += chunk
-            print(chunk.decode('utf-8', errors='ignore'), end='', flush=True)
-
-            # If we got expected response, we can continue
-            if expect and expect in response.decode('utf-8', errors='ignore'):
-                print(f"\n✓ Got expected response: {repr(expect)}")
-                break
-        time.sleep(0.1)
+    # Returns as soon as the badge is done; wait is only the upper bound
+    patterns = {f"error: {text.strip()}": text for text in MENU_ERRORS}
+    if expect:
+        patterns["expected"] = expect
+    response, match = read_match(ser, profile, patterns if expect else None, timeout=wait)
+    print(response.decode('utf-8', errors='ignore'), end='', flush=True)
+    if match and match.name == "expected":
+        print(f"\n✓ Got expected response: {repr(expect)}")
+    elif match:
+        print(f"\n✗ Badge reported an {match.name} (at byte {match.start})")
 
     print()  # Newline after response
     return response
@@ -59,12 +58,17 @@ def main():
 
     print(f"✓ Found badge on {port}")
 
+    # Measured timings from badge_link_profile.py, or the old fixed ones
+    profile = load_profile(port)
+    if profile.measured:
+        print(f"✓ Link profile from {profile.measured}: round trip {profile.rtt * 1000:.0f} ms")
+
     # Open serial connection
     print("\n[2/4] Opening serial connection...")
     try:
         ser = serial.Serial(
             port=port,
-            baudrate=115200,
+            baudrate=profile.baudrate,
             timeout=2,
             write_timeout=2,
             rtscts=False,
@@ -75,10 +79,10 @@ def main():
         # Try to wake up the badge
         ser.setDTR(False)
         ser.setRTS(False)
-        time.sleep(0.5)
+        time.sleep(RESET_WAIT)
         ser.setDTR(True)
         ser.setRTS(True)
-        time.sleep(0.5)
+        time.sleep(RESET_WAIT)
 
         # Clear any existing data
         ser.reset_input_buffer()
@@ -89,33 +93,33 @@ def main():
         print(f"✗ ERROR: {e}")
         return 1
 
-    time.sleep(1)  # Let connection stabilize
-
-    # Send several newlines to wake up menu
+    # Send newlines until the menu answers with its prompt, not just an echo
     print("\nWaking up badge...")
     for i in range(3):
         ser.write(b"\n")
-        time.sleep(0.3)
+        response, match = read_match(ser, profile, expect="Enter Letter:")
+        if match:
+            break
 
     # Navigate to Display Functions -> GUI Functions -> Show Text Display
     print("\n[3/4] Navigating menu...")
 
     # Press Enter to wake up menu and wait for main menu
-    send_command(ser, "\n", wait=2, expect="Enter Letter:")
+    send_command(ser, profile, "\n", wait=2, expect="Enter Letter:")
 
     # Press 'g' for Display Functions
-    send_command(ser, "g", wait=2, expect="Display Functions")
+    send_command(ser, profile, "g", wait=2, expect="Display Functions")
 
     # Press 'g' again for GUI Functions
-    send_command(ser, "g", wait=2, expect="GUI Functions")
+    send_command(ser, profile, "g", wait=2, expect="GUI Functions")
 
     # Press 'p' for Show Text Display
-    send_command(ser, "p", wait=2, expect="Enter Text To Display")
+    send_command(ser, profile, "p", wait=2, expect="Enter Text To Display")
 
     # Send test text
     print("\n[4/4] Sending test text...")
     test_text = "MVP Summit 2026\nSecurity Badge Test"
-    send_command(ser, test_text + "\n", wait=2)
+    send_command(ser, profile, test_text + "\n", wait=2)
 
     print("\n" + "=" * 60)
     print("CHECK YOUR BADGE DISPLAY!")
@@ -8,8 +8,13 @@ import subprocess
 import time
 import sys
 
+from badge_ports import DISPLAY, find_port
+
 def main():
-    port = "/dev/cu.usbmodem214201"
+    port = sys.argv[1] if len(sys.argv) > 1 else find_port(DISPLAY)
+    if not port:
+        print("No display processor port found")
+        return 1
 
     print(f"Connecting to {port} using 'cu' command...")
     print("Will send commands and capture output")
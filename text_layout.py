@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Text Layout for the Badge Display
+
+show_text_display takes one line of input (a newline would end it and the
+rest would be read as menu keys), and the firmware wraps and clips it on a
+320x240 screen. This lays text out on the host first: word wrap by glyph
+width, then truncate or paginate so every page fits the screen and goes out
+in a single command.
+
+Font metrics default to a character grid. Its size can be measured once
+against the real badge with --calibrate and is saved to ~/.badge_font.json.
+A TrueType font can be modelled instead (FontMetrics.truetype); glyph
+widths are cached either way.
+
+Usage:
+    python3 text_layout.py "Some long message..." --preview
+    python3 text_layout.py --file talk_notes.txt --send
+    python3 text_layout.py --calibrate
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import sys
+from fractions import Fraction
+
+SCREEN_SIZE = (320, 240)
+FONT_FILE = pathlib.Path(os.environ.get("BADGE_FONT", pathlib.Path.home() / ".badge_font.json"))
+
+# Until calibrated: a cell size that leaves room on a 320x240 screen
+DEFAULT_CELL = (12, 24)
+ELLIPSIS = "..."
+
+
+class FontMetrics:
+    """Glyph widths and line height, with a per-glyph width cache"""
+
+    def __init__(self, glyph_width, line_height, monospace=False):
+        self._glyph_width = glyph_width
+        self.line_height = line_height
+        self.monospace = monospace
+        self._cache = {}
+
+    @classmethod
+    def grid(cls, cell_width, line_height):
+        return cls(lambda ch: cell_width, line_height, monospace=True)
+
+    @classmethod
+    def truetype(cls, path, size):
+        """Proportional font; PIL measures each glyph once"""
+        from PIL import ImageFont
+
+        font = ImageFont.truetype(str(path), size)
+        ascent, descent = font.getmetrics()
+        return cls(font.getlength, ascent + descent)
+
+    @classmethod
+    def cells(cls, columns, rows, screen=SCREEN_SIZE):
+        """Grid of exactly columns x rows on the screen; exact fractions, so no cell is lost to rounding"""
+        return cls.grid(Fraction(screen[0], columns), Fraction(screen[1], rows))
+
+    @classmethod
+    def load(cls, path=FONT_FILE):
+        """Calibrated grid from disk, or the default grid"""
+        if path.exists():
+            try:
+                saved = json.loads(path.read_text())
+                if "columns" in saved:
+                    return cls.cells(int(saved["columns"]), int(saved["rows"]))
+                # Saved before calibration kept whole counts: recover them from the cell size
+                return cls.cells(round(SCREEN_SIZE[0] / saved["cell_width"]),
+                                 round(SCREEN_SIZE[1] / saved["line_height"]))
+            except (OSError, ValueError, KeyError, ZeroDivisionError):
+                pass
+        return cls.grid(*DEFAULT_CELL)
+
+    def glyph(self, ch):
+        width = self._cache.get(ch)
+        if width is None:
+            width = self._cache[ch] = self._glyph_width(ch)
+        return width
+
+    def width(self, text):
+        return sum(self.glyph(ch) for ch in text)
+
+
+class Layout:
+    def __init__(self, metrics=None, screen=SCREEN_SIZE, margin=0):
+        self.metrics = metrics or FontMetrics.load()
+        self.width = screen[0] - 2 * margin
+        self.rows = max(1, int((screen[1] - 2 * margin) // self.metrics.line_height))
+
+    def wrap(self, text):
+        """Word-wrap to the screen width; words wider than a line are split"""
+        lines = []
+        for paragraph in text.splitlines() or [""]:
+            line = ""
+            for word in paragraph.split():
+                candidate = f"{line} {word}" if line else word
+                if self.metrics.width(candidate) <= self.width:
+                    line = candidate
+                    continue
+                if line:
+                    lines.append(line)
+                line = ""
+                while self.metrics.width(word) > self.width:
+                    cut = self._fit(word, self.width)
+                    lines.append(word[:cut])
+                    word = word[cut:]
+                line = word
+            lines.append(line)
+        return lines
+
+    def truncate(self, text):
+        """As much as fits on one screen, ending in an ellipsis if anything was cut"""
+        lines = self.wrap(text)
+        if len(lines) <= self.rows:
+            return self.encode(lines)
+        kept = lines[:self.rows]
+        room = self.width - self.metrics.width(ELLIPSIS)
+        kept[-1] = kept[-1][:self._fit(kept[-1], room)].rstrip() + ELLIPSIS
+        return self.encode(kept)
+
+    def paginate(self, text, numbered=True):
+        """Every page of the text, each ready to send in one command"""
+        lines = self.wrap(text)
+        rows = self.rows
+        if numbered and len(lines) > rows and rows > 1:
+            # The last row of each page holds the page number
+            rows -= 1
+        chunks = [lines[i:i + rows] for i in range(0, len(lines), rows)] or [[]]
+        if len(chunks) == 1:
+            return [self.encode(chunks[0])]
+        pages = []
+        for number, chunk in enumerate(chunks, 1):
+            if numbered:
+                chunk = chunk + [""] * (rows - len(chunk)) + [f"{number}/{len(chunks)}".rjust(self._columns())]
+            pages.append(self.encode(chunk))
+        return pages
+
+    def encode(self, lines):
+        """Join lines into the single input line the firmware accepts.
+
+        On a grid font each line is padded with spaces to the full width, so
+        the firmware's own wrapping breaks exactly where we did.
+        """
+        if not self.metrics.monospace:
+            return " ".join(lines)
+        columns = self._columns()
+        return "".join(line.ljust(columns) for line in lines[:-1]) + (lines[-1] if lines else "")
+
+    def preview(self, page):
+        """ASCII picture of how a page lands on the screen"""
+        if self.metrics.monospace:
+            columns = self._columns()
+            rows = [page[i:i + columns] for i in range(0, len(page), columns)] or [""]
+        else:
+            columns = max(len(line) for line in self.wrap(page))
+            rows = self.wrap(page)
+        border = "+" + "-" * columns + "+"
+        return "\n".join([border] + [f"|{row.ljust(columns)}|" for row in rows] + [border])
+
+    def _columns(self):
+        return max(1, int(self.width // self.metrics.glyph("M")))
+
+    def _fit(self, text, width):
+        """Number of leading characters of text that fit in width (at least 1)"""
+        total = 0
+        for i, ch in enumerate(text):
+            total += self.metrics.glyph(ch)
+            if total > width:
+                return max(1, i)
+        return len(text)
+
+
+class Pager:
+    """Precomputed pages of a long message, flipped with one command per page"""
+
+    def __init__(self, show, pages):
+        self.show = show
+        self.pages = pages
+        self.index = None
+
+    @classmethod
+    def for_text(cls, show, text, layout=None, numbered=True):
+        return cls(show, (layout or Layout()).paginate(text, numbered=numbered))
+
+    def __len__(self):
+        return len(self.pages)
+
+    def goto(self, index):
+        index = max(0, min(index, len(self.pages) - 1))
+        if index == self.index:
+            # Already on screen: no command at all
+            return None
+        result = self.show(self.pages[index])
+        self.index = index
+        return result
+
+    def next(self):
+        return self.goto(0 if self.index is None else self.index + 1)
+
+    def prev(self):
+        return self.goto(0 if self.index is None else self.index - 1)
+
+
+def calibrate(badge):
+    """Show a ruler and ask how much of it fits, then save the cell size"""
+    ruler = "".join(str(i % 10) for i in range(1, 61))
+    badge.show_text_display(ruler * 3)
+    print("The badge shows the digits 1234567890 repeated.")
+    columns = int(input("How many characters fit on the first line? "))
+    rows = int(input("How many full lines are visible? "))
+    # Whole counts; FontMetrics.cells() turns them into exact cell sizes
+    FONT_FILE.write_text(json.dumps({"columns": columns, "rows": rows}, indent=2))
+    print(f"✓ {columns} x {rows} characters, saved to {FONT_FILE}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lay out and paginate text for the badge display")
+    parser.add_argument("text", nargs="?", help="Text to lay out")
+    parser.add_argument("--file", help="Read the text from a file")
+    parser.add_argument("--truncate", action="store_true", help="One screen, cut with an ellipsis")
+    parser.add_argument("--preview", action="store_true", help="Print the pages instead of sending")
+    parser.add_argument("--send", action="store_true", help="Show on the badge; Enter flips pages")
+    parser.add_argument("--calibrate", action="store_true", help="Measure the badge's text grid")
+    args = parser.parse_args()
+
+    if args.calibrate or args.send:
+        from freewili.fw import FreeWili
+
+        result = FreeWili.find_first()
+        if result.is_err():
+            print("✗ No badge found")
+            return 1
+        badge = result.unwrap()
+        if args.calibrate:
+            calibrate(badge)
+            return 0
+
+    text = pathlib.Path(args.file).read_text() if args.file else args.text
+    if text is None:
+        parser.error("give text or --file")
+
+    layout = Layout()
+    pages = [layout.truncate(text)] if args.truncate else layout.paginate(text)
+    print(f"{len(pages)} page(s), {layout._columns()} columns x {layout.rows} rows")
+
+    if not args.send:
+        for page in pages:
+            print(layout.preview(page))
+        return 0
+
+    pager = Pager(badge.show_text_display, pages)
+    pager.next()
+    while pager.index < len(pager) - 1:
+        if input(f"Page {pager.index + 1}/{len(pager)} - Enter for next, q to stop: ").strip() == "q":
+            break
+        pager.next()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())